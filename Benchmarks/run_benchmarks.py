@@ -0,0 +1,192 @@
+"""
+Benchmarks for the reduction pipeline on synthetic sorties (see synthetic_sortie.py).
+Each scale multiplies the DIS and airspeed sample rates of the generated sortie (scale 1 is 5 Hz DIS, 20 Hz DAS).
+For every scale the harness times brute_force_merge_airspeed, altitude_deviation, is_within_cone and the full
+SHADOW.py scenario loop (reduce_flight_data), and reports the best time, throughput (rows/s) and peak memory.
+Results can be saved as a baseline and later runs compared against it to catch regressions.
+
+Run from the repository root:
+    python -m Benchmarks.run_benchmarks
+    python -m Benchmarks.run_benchmarks --scales 1 4 16 --save-baseline
+    python -m Benchmarks.run_benchmarks --compare --threshold 0.25
+"""
+
+# import libraries
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+from SHADOW import reduce_flight_data
+from Utils.DataReduction import brute_force_merge_airspeed, altitude_deviation, is_within_cone
+from Utils.FlightCache import read_table
+from Utils.FlightIndex import FlightIndex
+from Benchmarks.synthetic_sortie import generate_sortie, write_sortie
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+def load_sortie(scale, seed=0):
+    """
+    Generate a synthetic sortie at the given scale and load it the way SHADOW does (CSV -> typed tables).
+    Returns (flight_data, lead_airspeed_data, wing_airspeed_data, tasking_data, input_data).
+    """
+    tables = generate_sortie(dis_rate_hz=5.0 * scale, airspeed_rate_hz=20.0 * scale, seed=seed)
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_sortie(tables, root, 'Bench', 1)
+        flight_data = read_table(paths['flight'], 'flight')
+        lead_airspeed_data = read_table(paths['lead_airspeed'], 'airspeed')
+        wing_airspeed_data = read_table(paths['wing_airspeed'], 'airspeed')
+        tasking_data = read_table(paths['tasking'], 'tasking')
+        input_data = pd.read_csv(paths['inputs'])
+    return flight_data, lead_airspeed_data, wing_airspeed_data, tasking_data, input_data
+
+
+def scenario_cases(flight_data, input_data):
+    """(ScenarioView, assigned altitudes, CM EntIds) for each scenario of a sortie whose airspeed is already merged."""
+    flight_index = FlightIndex(flight_data)
+    cases = []
+    for _, row in input_data.iterrows():
+        view = flight_index.scenario(row['Scenario'], row['Configuration'])
+        alts = {'Lead': view.marking('AMBUSH51')['Altitude'].iloc[0], 'Wingman': view.marking('HAWK11')['Altitude'].iloc[0]}
+        # columns reduce_scenario adds before scoring intercepts
+        view.data = view.data.assign(CM_Altitude_Lead=alts['Lead'], CM_Altitude_Wing=alts['Wingman'], CM_Airspeed=150)
+        cases.append((view, alts, view.entity_ids('JASSM')))
+    return cases
+
+
+def benchmark_cases(sortie):
+    """
+    The benchmarked calls for one sortie. Returns a dict mapping benchmark name to (rows processed, callable).
+    Inputs the calls need (the merged table, scenario slices) are prepared here so only the call itself is timed.
+    """
+    flight_data, lead_airspeed_data, wing_airspeed_data, tasking_data, input_data = sortie
+    merged = brute_force_merge_airspeed(flight_data.copy(), lead_airspeed_data, wing_airspeed_data)
+    cases = scenario_cases(merged, input_data)
+
+    def merge_airspeed():
+        brute_force_merge_airspeed(flight_data.copy(), lead_airspeed_data, wing_airspeed_data)
+
+    def deviation():
+        for view, alts, _ in cases:
+            for role, marking in (('Lead', 'AMBUSH51'), ('Wingman', 'HAWK11')):
+                altitude_deviation(view.marking(marking), role, int(alts[role]))
+
+    def within_cone():
+        for view, alts, cm_ids in cases:
+            for cm_id in cm_ids:
+                for role in ('Lead', 'Wingman'):
+                    is_within_cone(view.data, cm_id, role, alts[role], tasking_data)
+
+    def scenario_loop():
+        reduce_flight_data(flight_data.copy(), lead_airspeed_data, wing_airspeed_data, tasking_data, input_data,
+                           'Bench', 1)
+
+    aircraft_rows = sum(len(view.marking('AMBUSH51')) + len(view.marking('HAWK11')) for view, _, _ in cases)
+    cm_rows = sum(len(view.marking('JASSM')) for view, _, _ in cases)
+    return {
+        'brute_force_merge_airspeed': (len(flight_data), merge_airspeed),
+        'altitude_deviation': (aircraft_rows, deviation),
+        'is_within_cone': (2 * cm_rows, within_cone),
+        'scenario_loop': (len(flight_data), scenario_loop),
+    }
+
+
+def time_call(func, repeat=3, min_time=1.0):
+    """
+    Best wall time of the timed calls (s) and the peak traced memory of one extra call (MB). Calls are repeated at
+    least repeat times and until min_time seconds have been spent, so millisecond benchmarks are not just noise.
+    SHADOW's prints are muted.
+    """
+    best, spent, runs = np.inf, 0.0, 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while runs < repeat or (spent < min_time and runs < 1000):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best, spent, runs = min(best, elapsed), spent + elapsed, runs + 1
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def run_benchmarks(scales=(1, 4), repeat=3, names=None):
+    """Run every benchmark (or only names) at each scale. Returns a DataFrame with one row per benchmark and scale."""
+    results = []
+    for scale in scales:
+        sortie = load_sortie(scale)
+        for name, (rows, func) in benchmark_cases(sortie).items():
+            if names and name not in names:
+                continue
+            seconds, peak_mb = time_call(func, repeat)
+            results.append({'benchmark': name, 'scale': scale, 'rows': rows, 'seconds': seconds,
+                            'rows_per_s': rows / seconds, 'peak_mb': peak_mb})
+            print('{:<28}{:>6g}{:>10}{:>10.3f} s{:>14,.0f} rows/s{:>9.1f} MB'.format(
+                name, scale, rows, seconds, rows / seconds, peak_mb))
+    return pd.DataFrame(results)
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'processor': platform.processor() or platform.machine()}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """Write the results (and the environment they were measured in) as the baseline JSON."""
+    baseline = {'environment': environment(), 'results': results.to_dict(orient='records')}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+
+def compare_baseline(results, path=BASELINE_PATH, threshold=0.2):
+    """
+    Compare results with the saved baseline. A benchmark regresses when its throughput drops by more than threshold
+    (0.2 = 20 % slower) or its peak memory grows by more than threshold.
+    Returns a DataFrame of the matched benchmarks with the ratios to the baseline and a 'regression' flag.
+    """
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline['environment'] != environment():
+        print(f"Note: baseline was measured on {baseline['environment']}, this run is on {environment()}")
+    base = pd.DataFrame(baseline['results'])
+    compared = results.merge(base, on=['benchmark', 'scale'], suffixes=('', '_baseline'))
+    compared['speed_ratio'] = compared['rows_per_s'] / compared['rows_per_s_baseline']
+    compared['memory_ratio'] = compared['peak_mb'] / compared['peak_mb_baseline']
+    compared['regression'] = (compared['speed_ratio'] < 1 - threshold) | (compared['memory_ratio'] > 1 + threshold)
+    return compared[['benchmark', 'scale', 'rows_per_s', 'rows_per_s_baseline', 'speed_ratio', 'peak_mb',
+                     'peak_mb_baseline', 'memory_ratio', 'regression']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the SHADOW reduction on synthetic sorties.')
+    parser.add_argument('--scales', type=float, nargs='*', default=[1, 4], help='sample-rate multipliers of the synthetic sortie')
+    parser.add_argument('--repeat', type=int, default=3, help='timed repeats per benchmark (the best is kept)')
+    parser.add_argument('--only', nargs='*', default=None, help='only run these benchmarks')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='save this run as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare this run with the baseline; exit 1 on a regression')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed fractional slowdown / memory growth')
+    args = parser.parse_args()
+
+    print('{:<28}{:>6}{:>10}{:>12}{:>21}{:>12}'.format('benchmark', 'scale', 'rows', 'best', 'throughput', 'peak'))
+    results = run_benchmarks(args.scales, args.repeat, args.only)
+
+    if args.compare:
+        compared = compare_baseline(results, args.baseline, args.threshold)
+        print('\n' + compared.to_string(index=False, float_format='{:.3g}'.format))
+        if compared['regression'].any():
+            print(f"\n{compared['regression'].sum()} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f'\nSaved baseline to {args.baseline}')
@@ -0,0 +1,250 @@
+"""
+Synthetic sortie generator. Produces DIS-shaped flight data (AMBUSH51/HAWK11 tracks, JASSM tracks, SAMs),
+DAS airspeed streams, Tasking REQUEST/KILL PDUs, Trust/Workload streams and the matching Inputs row set,
+so the reduction pipeline can be exercised and timed without real flight test data (see run_benchmarks.py).
+"""
+
+# import libraries
+import os
+import numpy as np
+import pandas as pd
+
+# WGS-84 constants
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
+FT_PER_M = 3.28084
+MPS_PER_KT = 0.514444
+M_PER_NM = 1852.0
+
+BULLSEYE_LAT = 41.38494111111111
+BULLSEYE_LON = -91.24627944444444
+
+DEFAULT_SCENARIOS = [('B', 'HH'), ('C', 'HA'), ('D', 'AA'), ('C', 'AH')]
+
+
+def lla_to_ecef(lat, lon, alt_ft):
+    """Convert geodetic latitude/longitude (deg) and altitude (ft) to ECEF (m)."""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    alt_m = np.asarray(alt_ft) / FT_PER_M
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat_r)**2)
+    x = (n + alt_m) * np.cos(lat_r) * np.cos(lon_r)
+    y = (n + alt_m) * np.cos(lat_r) * np.sin(lon_r)
+    z = (n * (1 - WGS84_E2) + alt_m) * np.sin(lat_r)
+    return x, y, z
+
+
+def enu_to_ecef_velocity(lat, lon, v_east, v_north, v_up):
+    """Rotate a local ENU velocity (m/s) into ECEF."""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    vx = -np.sin(lon_r) * v_east - np.sin(lat_r) * np.cos(lon_r) * v_north + np.cos(lat_r) * np.cos(lon_r) * v_up
+    vy = np.cos(lon_r) * v_east - np.sin(lat_r) * np.sin(lon_r) * v_north + np.cos(lat_r) * np.sin(lon_r) * v_up
+    vz = np.cos(lat_r) * v_north + np.sin(lat_r) * v_up
+    return vx, vy, vz
+
+
+def _offset_latlon(lat0, lon0, north_nm, east_nm):
+    """Flat-earth offset of a reference point by north/east distances in nm."""
+    lat = lat0 + north_nm / 60.0
+    lon = lon0 + east_nm / (60.0 * np.cos(np.radians(lat0)))
+    return lat, lon
+
+
+def _sample_times(t_start, t_end, rate_hz, rng):
+    """Sample times (s) between t_start and t_end at rate_hz with a little jitter."""
+    n = max(int((t_end - t_start) * rate_hz), 1)
+    t = t_start + np.arange(n) / rate_hz + rng.uniform(0, 0.2 / rate_hz, n)
+    return t
+
+
+def _entity_frame(t, marking, ent_id, site, lat, lon, alt_ft, heading, speed_kt, roll, scenario, config):
+    """Assemble DIS entity-state rows for one entity."""
+    v = speed_kt * MPS_PER_KT
+    h = np.radians(heading)
+    vx, vy, vz = enu_to_ecef_velocity(lat, lon, v * np.sin(h), v * np.cos(h), np.zeros_like(t))
+    x, y, z = lla_to_ecef(lat, lon, alt_ft)
+    return pd.DataFrame({
+        't': t, 'Configuration': config, 'Scenario': scenario, 'MarkingTxt': marking, 'EntId': ent_id,
+        'Site': site, 'ECEF_X': x, 'ECEF_Y': y, 'ECEF_Z': z, 'LinVelX': vx, 'LinVelY': vy, 'LinVelZ': vz,
+        'Latitude': lat, 'Longitude': lon, 'Altitude': alt_ft, 'Heading': heading, 'Pitch': 0.0, 'Roll': roll,
+    })
+
+
+def generate_sortie(scenarios=None, dis_rate_hz=5.0, airspeed_rate_hz=20.0, cms_per_scenario=5,
+                    sams_per_scenario=5, scenario_duration_s=420, transit_s=60, seed=0,
+                    date='2025-09-09', start_time='14:30:00'):
+    """
+    Generate one synthetic sortie. Inputs are:
+    scenarios: list of (Scenario, Configuration) tuples flown in order
+    dis_rate_hz: DIS entity-state rate per entity
+    cms_per_scenario / sams_per_scenario: JASSM and SAM counts per scenario
+    scenario_duration_s: scenario length (Delta scenarios run 60 s longer to exercise the 7:15 cap)
+    Returns a dict of DataFrames keyed by 'flight', 'lead_airspeed', 'wing_airspeed', 'tasking',
+    'inputs', 'trust' and 'workload'.
+    """
+    rng = np.random.default_rng(seed)
+    scenarios = scenarios or DEFAULT_SCENARIOS
+    t0 = pd.Timestamp(f'{date} {start_time}')
+
+    frames = []
+    kills = []
+    requests = []
+    input_rows = []
+    lead_alt_base, wing_alt_base = 9000.0, 11000.0
+    idle_lat, idle_lon = _offset_latlon(BULLSEYE_LAT, BULLSEYE_LON, 20.0, 20.0)
+    cm_id = 101
+    sam_id = 201
+    request_id = 1
+    t_cursor = 0.0
+    segments = []  # (t_start, t_end, scenario, config) for aircraft tracks
+
+    for scenario_num, (scenario, config) in enumerate(scenarios, start=1):
+        duration = scenario_duration_s + (60 if scenario == 'D' else 0)
+        s_start, s_end = t_cursor + transit_s, t_cursor + transit_s + duration
+        segments.append((t_cursor, s_start, np.nan, np.nan))
+        segments.append((s_start, s_end, scenario, config))
+        t_cursor = s_end
+
+        # aircraft pursuit plan for this scenario, filled as CMs are laid out
+        plan = {'Lead': [], 'Wingman': []}
+        n_cms = cms_per_scenario + (1 if scenario == 'D' else 0)
+        spacing = (duration - 60) / max(n_cms, 1)
+        for k in range(n_cms):
+            role = 'Lead' if k % 2 == 0 else 'Wingman'
+            spawn = s_start + 10 + k * spacing
+            life = min(2 * spacing - 5, duration - (spawn - s_start) - 5)
+            kill = spawn + 0.8 * life
+            heading = rng.uniform(0, 360)
+            lat0, lon0 = _offset_latlon(BULLSEYE_LAT, BULLSEYE_LON, rng.uniform(-10, 10), rng.uniform(-10, 10))
+            t = _sample_times(spawn, kill + 1.0, dis_rate_hz, rng)
+            dist_nm = 150.0 * (t - spawn) / 3600.0
+            lat, lon = _offset_latlon(lat0, lon0, dist_nm * np.cos(np.radians(heading)), dist_nm * np.sin(np.radians(heading)))
+            frames.append(_entity_frame(t, 'JASSM', cm_id, 76, lat, lon, np.full_like(t, 10000.0), np.full_like(t, heading),
+                                        150.0, np.zeros_like(t), scenario, config))
+            plan[role].append((spawn, kill, lat0, lon0, heading))
+            # KILL PDU - mostly a clean target match, sometimes logged without the target entity
+            site = 48 if role == 'Lead' else 73
+            target = cm_id if k % 3 != 2 else 0
+            kills.append((kill, scenario, config, site, target))
+            cm_id += 1
+
+        # aircraft tracks
+        for role, marking, ent_id, site, alt_base in [('Lead', 'AMBUSH51', 1, 48, lead_alt_base),
+                                                       ('Wingman', 'HAWK11', 2, 73, wing_alt_base)]:
+            t = _sample_times(s_start, s_end, dis_rate_hz, rng)
+            lat = np.full_like(t, idle_lat)
+            lon = np.full_like(t, idle_lon)
+            heading = np.zeros_like(t)
+            speed = np.full_like(t, 200.0)
+            for spawn, kill, lat0, lon0, cm_heading in plan[role]:
+                m = (t >= spawn + 10) & (t <= kill)
+                cm_nm = 150.0 * (t[m] - spawn) / 3600.0
+                frac = np.clip((t[m] - spawn - 10) / max(kill - spawn - 40, 1.0), 0, 1)
+                trail_nm = 4.0 - 3.2 * frac
+                along = cm_nm - trail_nm
+                h = np.radians(cm_heading)
+                lat[m], lon[m] = _offset_latlon(lat0, lon0, along * np.cos(h) + 0.05, along * np.sin(h))
+                heading[m] = cm_heading + rng.normal(0, 2, m.sum())
+            alt = alt_base + 150 * np.sin((t - s_start) / 40.0) + rng.normal(0, 20, len(t))
+            # a couple of altitude busts per scenario
+            for bust in rng.uniform(s_start, s_end, 2):
+                alt += np.where(np.abs(t - bust) < 8, 700.0, 0.0)
+            roll = rng.normal(0, 5, len(t))
+            frames.append(_entity_frame(t, marking, ent_id, site, lat, lon, alt, heading, speed, roll, scenario, config))
+
+        # SAMs
+        sam_id_times = []
+        for k in range(sams_per_scenario):
+            spawn = s_start + 20 + k * (duration - 60) / max(sams_per_scenario, 1)
+            t = _sample_times(spawn, s_end, max(dis_rate_hz / 5.0, 0.2), rng)
+            lat, lon = _offset_latlon(BULLSEYE_LAT, BULLSEYE_LON, rng.uniform(-15, 15), rng.uniform(-15, 15))
+            frames.append(_entity_frame(t, 'SAM', sam_id, 80, np.full_like(t, lat), np.full_like(t, lon), np.zeros_like(t),
+                                        np.zeros_like(t), 0.0, np.zeros_like(t), scenario, config))
+            if k % 3 != 2:
+                sam_id_times.append(spawn + rng.uniform(2, 40))
+            sam_id += 1
+
+        # Tasking REQUEST PDUs (with repeated RequestID/RequestStatus pairs, as the real logs have)
+        for k in range(8):
+            t_req = s_start + rng.uniform(0, duration)
+            status = np.nan if k % 2 == 0 else float(k % 5)
+            for repeat in range(2):
+                requests.append((t_req + repeat * 0.1, scenario, config, 73 if k % 3 else 48, request_id, status))
+            request_id += 1
+
+        row = {'Scenario_Num': scenario_num, 'Lead_Pilot': 'Synthetic', 'Flight_Number': 1, 'Scenario': scenario,
+               'Configuration': config, 'Correct_Acquistion': 'Y', 'Tac_Comms': int(rng.integers(10, 30)),
+               'SAMS_ID': len(sam_id_times)}
+        for i, t_id in enumerate(sam_id_times, start=1):
+            local = t0 + pd.Timedelta(seconds=t_id) - pd.Timedelta(hours=5)  # inputs are stamped in local time
+            row[f'SAM_{i}_ID_Time_s'] = local.strftime('%H:%M:%S')
+        input_rows.append(row)
+
+    # transit rows between scenarios for both aircraft
+    for seg_start, seg_end, scenario, config in segments:
+        if isinstance(scenario, str):
+            continue
+        for marking, ent_id, site in [('AMBUSH51', 1, 48), ('HAWK11', 2, 73)]:
+            t = _sample_times(seg_start, seg_end, dis_rate_hz, rng)
+            frames.append(_entity_frame(t, marking, ent_id, site, np.full_like(t, idle_lat), np.full_like(t, idle_lon),
+                                        np.full_like(t, 9500.0), np.zeros_like(t), 200.0, np.zeros_like(t), np.nan, np.nan))
+
+    flight = pd.concat(frames, ignore_index=True).sort_values('t', kind='stable').reset_index(drop=True)
+    flight = _stamp(flight, t0)
+
+    airspeed = {}
+    for key in ['lead_airspeed', 'wing_airspeed']:
+        t = _sample_times(0, t_cursor + 30, airspeed_rate_hz, rng)
+        airspeed[key] = _stamp(pd.DataFrame({'t': t, 'Calibrated_Airspeed': 200 + 20 * np.sin(t / 60.0) + rng.normal(0, 2, len(t))}), t0)
+
+    kill_df = pd.DataFrame(kills, columns=['t', 'Scenario', 'Configuration', 'FiringEntityID_Site', 'TargetEntityID_Entity'])
+    kill_df['PduType'] = 'KILL'
+    req_df = pd.DataFrame(requests, columns=['t', 'Scenario', 'Configuration', 'ReceivingEntityID_Site', 'RequestID', 'RequestStatus'])
+    req_df['PduType'] = 'REQUEST'
+    tasking = pd.concat([req_df, kill_df], ignore_index=True).sort_values('t', kind='stable').reset_index(drop=True)
+    tasking = _stamp(tasking, t0)
+    tasking_cols = ['Timestamp', 'SampleDate', 'SampleTime', 'Configuration', 'Scenario', 'PduType', 'ReceivingEntityID_Site',
+                    'RequestID', 'RequestStatus', 'FiringEntityID_Site', 'TargetEntityID_Entity']
+    tasking = tasking.reindex(columns=tasking_cols)
+
+    t = _sample_times(0, t_cursor, 2.0, rng)
+    trust = _stamp(pd.DataFrame({'t': t, 'RatingValue': np.clip(50 + np.cumsum(rng.normal(0, 0.5, len(t))), 0, 100),
+                                 'RatingType': 'Trust'}), t0)
+    t = _sample_times(0, t_cursor, 1.0, rng)
+    workload = _stamp(pd.DataFrame({'t': t, 'ITPV': rng.uniform(50, 400, len(t)), 'LogWorkload': rng.uniform(5, 9, len(t))}), t0)
+
+    return {'flight': flight, 'lead_airspeed': airspeed['lead_airspeed'], 'wing_airspeed': airspeed['wing_airspeed'],
+            'tasking': tasking, 'inputs': pd.DataFrame(input_rows), 'trust': trust, 'workload': workload}
+
+
+def _stamp(df, t0):
+    """Replace the relative time column 't' with DIS-style Timestamp/SampleDate/SampleTime columns."""
+    times = t0 + pd.to_timedelta(df['t'], unit='s')
+    stamped = pd.DataFrame({
+        'Timestamp': (times.astype('int64') // 100).values,  # DIS loggers record 100 ns ticks
+        'SampleDate': times.dt.strftime('%Y-%m-%d').values,
+        'SampleTime': times.dt.strftime('%H:%M:%S.%f').str[:-3].values,
+    })
+    return pd.concat([stamped, df.drop(columns='t').reset_index(drop=True)], axis=1)
+
+
+def write_sortie(tables, root, pilot, flight_number):
+    """Write a generated sortie into a SHADOW-style directory tree under root. Returns the path of each table."""
+    paths = {
+        'flight': f'Data/Lead/Lead_{pilot}_{flight_number}.csv',
+        'lead_airspeed': f'Data/Lead/Lead_{pilot}_{flight_number}_Airspeed.csv',
+        'wing_airspeed': f'Data/Wingman/Wing_{pilot}_{flight_number}_Airspeed.csv',
+        'tasking': f'Data/Tasking/Tasking_{pilot}_{flight_number}.csv',
+        'trust': f'Data/Trust/Trust_{pilot}_{flight_number}.csv',
+        'workload': f'Data/Workload/Workload_{pilot}_{flight_number}.csv',
+        'inputs': f'Inputs/Input_{pilot}_{flight_number}.csv',
+    }
+    paths = {key: os.path.join(root, rel_path) for key, rel_path in paths.items()}
+    for key, path in paths.items():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df = tables[key]
+        if key == 'inputs':
+            df = df.assign(Lead_Pilot=pilot, Flight_Number=flight_number)
+        df.to_csv(path, index=False)
+    return paths
@@ -6,44 +6,165 @@ Here is what must be done prior to running this script:
 """
 
 # import libraries
+import os
 import numpy as np
 import pandas as pd
 from Utils.DataReduction import *
+from Utils.Campaign import flight_paths
+from Utils.FlightCache import load_table, parse_sample_times
+from Utils.FlightIndex import FlightIndex
+from Utils.Streaming import stream_scenario_windows, time_window
+from Utils.Exclusions import load_exclusions, apply_exclusions
+from Utils.TaskingIndex import TaskingIndex
+from Utils.SensorStreams import sensor_stream_mops
+from Utils.MOPStore import MOPStore, wide_row
+from Utils.Telemetry import RunReport, stage, scenario as report_scenario, timed_iter
 pd.options.mode.chained_assignment = None
 
-if __name__ == "__main__":
-    # Define file paths
-    input_file_path = 'Data/'
-    data_threads = {'comm':'Communications', 'CM':'CruiseMissiles', 'L':'Lead',
-                    'W':'Wingman', 'ST':'SurfaceThreats', 'W':'Workload'}
-    output_file_path = 'Output'
+# assumed CM airspeed, used for the airspeed difference at intercept
+CM_AIRSPEED_KT = 150
 
-    # request input from user for the Lead pilot's name and the flight number
-    lead_pilot = input("Enter Lead pilot's name (Chan, Grimmer, Jacob): ")
-    flight_number = input("Enter flight number: ")
 
-    # Load data
-    flight_data = pd.read_csv('Data/Lead/Lead_{}_{}.csv'.format(lead_pilot, flight_number), low_memory=False)
-    lead_airspeed_data = pd.read_csv('Data/Lead/Lead_{}_{}_Airspeed.csv'.format(lead_pilot, flight_number), low_memory=False)
-    wing_airpseed_data = pd.read_csv('Data/Wingman/Wing_{}_{}_Airspeed.csv'.format(lead_pilot, flight_number), low_memory=False)
-    tasking_data = pd.read_csv('Data/Tasking/Tasking_{}_{}.csv'.format(lead_pilot, flight_number), low_memory=False)
+def load_flight(lead_pilot, flight_number, root='.'):
+    """
+    Load the DIS, airspeed, tasking and input tables for a sortie.
+    The data tables come through the columnar cache (Utils/FlightCache.py), so only the first run on a sortie
+    parses the CSVs, and the sortie's exclusion windows (Inputs/Exclusions_<pilot>_<flight>.csv) are dropped.
+    Returns (flight_data, lead_airspeed_data, wing_airspeed_data, tasking_data, input_data).
+    """
+    with stage('load'):
+        paths = flight_paths(lead_pilot, flight_number, root)
+        windows = load_exclusions(lead_pilot, flight_number, root)
+        flight_data = apply_exclusions(load_table(paths['flight'], 'flight'), windows)
+        lead_airspeed_data = apply_exclusions(load_table(paths['lead_airspeed'], 'airspeed'), windows)
+        wing_airpseed_data = apply_exclusions(load_table(paths['wing_airspeed'], 'airspeed'), windows)
+        tasking_data = apply_exclusions(load_table(paths['tasking'], 'tasking'), windows)
+
+        # Load Inputs
+        input_data = pd.read_csv(paths['input'], low_memory=False)
+    return flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data, input_data
+
+
+def reduce_flight(lead_pilot, flight_number, root='.', scenarios=None, traces=None, store=None):
+    """
+    Load a sortie from disk and reduce it to a DataFrame of MOPs, one row per scenario.
+    scenarios: optional scenario numbers to reduce (default: every scenario in the Inputs file)
+    traces: optional TraceArchive that receives each scenario's intercept traces (Utils/TraceArchive.py)
+    store: optional MOPStore that receives the scenario, intercept and SAM rows (Utils/MOPStore.py)
+    """
+    flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data, input_data = load_flight(lead_pilot, flight_number, root)
+    mops_df = reduce_flight_data(flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data, input_data,
+                                 lead_pilot, flight_number, scenarios, traces, store)
+    return add_sensor_stream_mops(mops_df, root)
+
+
+def add_sensor_stream_mops(mops_df, root='.'):
+    """Append the Trust and Workload MOPs of each scenario window (Utils/SensorStreams.py) to a flight's MOPs."""
+    with stage('sensor_streams'):
+        return pd.concat([mops_df, sensor_stream_mops(mops_df, root)], axis=1)
+
+
+def prepare_inputs(input_data):
+    """Keep the rows of an Input_<pilot>_<flight>.csv table that describe a scenario, with integer Scenario_Num."""
+    input_data = input_data[input_data['Scenario_Num'].notna()]
+    input_data['Scenario_Num'] = input_data['Scenario_Num'].astype(int)
+    return input_data
 
-    # Load Inputs
-    input_data = pd.read_csv('Inputs/Input_{}_{}.csv'.format(lead_pilot, flight_number), low_memory=False)
+
+def reduce_flight_streaming(lead_pilot, flight_number, root='.', chunksize=200000, scenarios=None, traces=None,
+                            store=None):
+    """
+    Streaming version of reduce_flight for long sorties and full-rate DIS logs. The DIS CSV is read in chunks
+    and its rows routed to their scenario window; each window gets the airspeed join, index and scenario
+    reduction as soon as it is complete and is then released, so peak memory is about one scenario window
+    instead of the whole flight. The airspeed, tasking and input tables are small and are loaded whole.
+    Returns the same DataFrame of MOPs as reduce_flight (only the given scenario numbers if scenarios is set).
+    """
+    with stage('load'):
+        paths = flight_paths(lead_pilot, flight_number, root)
+        windows = load_exclusions(lead_pilot, flight_number, root)
+        lead_airspeed_data = apply_exclusions(load_table(paths['lead_airspeed'], 'airspeed'), windows)
+        wing_airpseed_data = apply_exclusions(load_table(paths['wing_airspeed'], 'airspeed'), windows)
+        lead_airspeed_data = lead_airspeed_data.sort_values('SampleTime', kind='stable')
+        wing_airpseed_data = wing_airpseed_data.sort_values('SampleTime', kind='stable')
+        tasking_data = apply_exclusions(load_table(paths['tasking'], 'tasking'), windows)
+        input_data = prepare_inputs(pd.read_csv(paths['input'], low_memory=False))
+    with stage('index'):
+        tasking_index = TaskingIndex(tasking_data)
+    num_scenarios = input_data['Scenario_Num'].max()
+    print(f"Detected {num_scenarios} scenarios in the input data.")
+
+    # scenario numbers flown in each (Scenario, Configuration) window
+    scenarios = range(1, num_scenarios + 1) if scenarios is None else sorted(scenarios)
+    window_scenarios = {}
+    for scenario in scenarios:
+        scenario_inputs = input_data[input_data['Scenario_Num'] == scenario]
+        key = (scenario_inputs['Scenario'].values[0], scenario_inputs['Configuration'].values[0])
+        window_scenarios.setdefault(key, []).append(scenario)
+
+    scenario_rows = {}
+    # reading the DIS chunks (and routing them to their window) is reported as the load stage
+    for key, window in timed_iter('load', stream_scenario_windows(paths['flight'], keys=window_scenarios, chunksize=chunksize)):
+        with stage('load'):
+            window = apply_exclusions(window, windows)
+        if window.empty:
+            continue
+        with stage('airspeed_merge'):
+            start_time, end_time = window['SampleTime'].min(), window['SampleTime'].max()
+            window = brute_force_merge_airspeed(window, time_window(lead_airspeed_data, start_time, end_time),
+                                                time_window(wing_airpseed_data, start_time, end_time))
+        with stage('index'):
+            scenario_view = FlightIndex(window).scenario(*key)
+        for scenario in window_scenarios[key]:
+            print(f"Processing scenario {scenario} of {num_scenarios}...")
+            scenario_inputs = input_data[input_data['Scenario_Num'] == scenario]
+            with report_scenario(scenario):
+                scenario_rows[scenario] = reduce_scenario(scenario_view, scenario, scenario_inputs, tasking_index,
+                                                          lead_pilot, flight_number, traces)
+
+    missing = [scenario for scenario in scenarios if scenario not in scenario_rows]
+    if missing:
+        raise ValueError(f"No DIS data found for scenario(s) {missing} of {lead_pilot} flight {flight_number}")
+    # windows finish out of scenario order, so the rows are stored once they are all in
+    store = MOPStore() if store is None else store
+    first_row = len(store)
+    for scenario in scenarios:
+        store.add_scenario(*scenario_rows[scenario])
+    return add_sensor_stream_mops(store.wide(first_row), root)
+
+
+def reduce_flight_data(flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data, input_data, lead_pilot, flight_number,
+                       scenarios=None, traces=None, store=None):
+    """
+    Reduce already-loaded sortie tables into the pre-defined MOPs. Inputs are:
+    flight_data: DIS entity state table for the sortie
+    lead_airspeed_data / wing_airpseed_data: DAS airspeed tables for each aircraft
+    tasking_data: DIS tasking PDUs for the sortie
+    input_data: rows of Inputs/Input_<pilot>_<flight>.csv
+    scenarios: optional scenario numbers to reduce (default: all of them)
+    traces: optional TraceArchive that receives each scenario's intercept traces
+    store: optional MOPStore that receives the scenario, intercept and SAM rows (a new one by default)
+    Returns a DataFrame with one row of MOPs per scenario (the wide view of the store's rows for this flight).
+    """
+    # Make sure the time columns are in datetime format (already done if loaded through the cache)
+    with stage('parse_times'):
+        for table in (flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data):
+            parse_sample_times(table)
 
     # Merge airspeed data into flight_data
     print('Merging airspeed data into DIS data...')
-    flight_data = brute_force_merge_airspeed(flight_data, lead_airspeed_data, wing_airpseed_data) # this line takes a minute ...
+    with stage('airspeed_merge'):
+        flight_data = brute_force_merge_airspeed(flight_data, lead_airspeed_data, wing_airpseed_data)
 
     # Query the user to understand how many scenarios were flown in the flight
     # num_scenarios = len(input_data)
-    input_data = input_data[input_data['Scenario_Num'].notna()]
-    input_data['Scenario_Num'] = input_data['Scenario_Num'].astype(int)
+    input_data = prepare_inputs(input_data)
     num_scenarios = input_data['Scenario_Num'].max()
     print(f"Detected {num_scenarios} scenarios in the input data.")
 
-    # generate a blank dataframe to hold the MOPs
-    mops_df = pd.DataFrame()
+    # the scenario, intercept and SAM rows are appended to the store; the wide MOP table is built once at the end
+    store = MOPStore() if store is None else store
+    first_row = len(store)
 
     # define sortie_df to hold all the data from the flight
     Altitude_Col = 'Altitude'
@@ -52,150 +173,200 @@ if __name__ == "__main__":
     cols_CMs = ['Timestamp', 'SampleDate', 'SampleTime', 'Configuration', 'Scenario', 'MarkingTxt',
                 'EntId', 'Latitude', 'Longitude', 'Heading']
 
-    # Make sure Timestamp is sorted and in datetime format
-    flight_data['Timestamp'] = pd.to_datetime(flight_data['Timestamp'])
-    flight_data['SampleTime'] = pd.to_datetime(flight_data['SampleTime'])
-    flight_data['SampleDate'] = pd.to_datetime(flight_data['SampleDate'])
+    # index the sortie once - scenarios, markings and entities become contiguous slices of flight_index.data
+    with stage('index'):
+        flight_index = FlightIndex(flight_data)
+        flight_data = flight_index.data  # keep only the re-ordered copy alive
+        tasking_index = TaskingIndex(tasking_data)
+
+    for scenario in range(1, num_scenarios + 1):
+        if scenarios is not None and scenario not in scenarios:
+            continue
+        print(f"Processing scenario {scenario} of {num_scenarios}...")
+        scenario_inputs = input_data[input_data['Scenario_Num'] == scenario]
+        with report_scenario(scenario):
+            with stage('scenario_slice'):
+                scenario_view = flight_index.scenario(scenario_inputs['Scenario'].values[0], scenario_inputs['Configuration'].values[0])
+            store.add_scenario(*reduce_scenario(scenario_view, scenario, scenario_inputs, tasking_index, lead_pilot,
+                                                flight_number, traces))
+
+    return store.wide(first_row)
+
+
+def sam_id_times(scenario_inputs, scenario_start_time):
+    """SAM ID times stamped in the CR for a scenario (local times in the Inputs file), as Zulu timestamps on the scenario's date."""
+    SAM_ID_Times = []
+    for i in range(1, int(scenario_inputs['SAMS_ID'].values[0]) + 1):
+        clean_time = scenario_inputs[f'SAM_{i}_ID_Time_s'].values[0]
+        SAM_ID_Times.append(pd.to_datetime(f"{scenario_start_time.date()} {clean_time}", errors="coerce") + pd.DateOffset(hours=5)) # convert to Zulu
+    return SAM_ID_Times
+
+
+def scored_scenario(scenario_view, scenario_type):
+    """
+    The scenario as it is scored, shared by reduce_scenario and the threshold sweep (SHADOW_Sweep.py).
+    Delta scenarios are capped at 7 minutes 15 seconds, each aircraft's assigned altitude is its first altitude in
+    the scenario, at most 6 CMs count in a Delta scenario, and the CM altitude/airspeed columns the intercept
+    scoring reads are added to the scenario rows.
+    Returns (scenario_view, scenario_end_time, lead_alt, wing_alt, CM_EntIds, num_CMs).
+    """
+    scenario_end_time = scenario_view.end_time
+    if scenario_type == 'D':
+        scenario_end_time = scenario_view.start_time + pd.DateOffset(minutes=7, second=15)  # Cap Delta scenarios at 7 minutes 15 seconds
+        scenario_view = scenario_view.until(scenario_end_time)
+    scenario_data = scenario_view.data
 
     # OPL Naming Convention - Black is AMBUSH51, Blue is HAWK11
     # OPL Gouge - Black jet (AMBUSH51) DIS data is best.
     # OPL Convo - LinVels are in ECEF and m/s
-    lead_data = flight_data[flight_data['MarkingTxt'] == 'AMBUSH51']
-    wing_data = flight_data[flight_data['MarkingTxt'] == 'HAWK11']
-    cruise_data = flight_data[flight_data['MarkingTxt'] == 'JASSM']
-    sam_data = flight_data[flight_data['MarkingTxt'] == 'SAM']
+    # record the first lead_alt and wing_alt in the defined scenario
+    lead_alt = scenario_view.marking('AMBUSH51')['Altitude'].iloc[0]
+    wing_alt = scenario_view.marking('HAWK11')['Altitude'].iloc[0]
+    
+    CM_EntIds = scenario_view.entity_ids('JASSM')
+    num_CMs = len(CM_EntIds)
+    if scenario_type == 'D' and num_CMs > 6:
+        num_CMs = 6
+    
+    scenario_data['CM_Altitude_Lead'] = lead_alt
+    scenario_data['CM_Altitude_Wing'] = wing_alt
+    scenario_data['CM_Airspeed'] = CM_AIRSPEED_KT
+    return scenario_view, scenario_end_time, lead_alt, wing_alt, CM_EntIds, num_CMs
 
-    for scenario in range(1, num_scenarios + 1):
-        print(f"Processing scenario {scenario} of {num_scenarios}...")
 
-        scenario_type = input_data[input_data['Scenario_Num'] == scenario]['Scenario'].values[0]
-        autonomy_config = input_data[input_data['Scenario_Num'] == scenario]['Configuration'].values[0]
-        correct_sort = input_data[input_data['Scenario_Num'] == scenario]['Correct_Acquistion'].values[0]
-        num_tac_comms = input_data[input_data['Scenario_Num'] == scenario]['Tac_Comms'].values[0]
-
-        CM_airspeed = 150
-
-        scenario_data = flight_data[(flight_data['Scenario'] == scenario_type) & (flight_data['Configuration'] == autonomy_config)].copy()
-        scenario_start_time = scenario_data['SampleTime'].min()
-        scenario_end_time = scenario_data['SampleTime'].max()
-        print('Scenario Type: {}, Start Time: {}, End Time: {}'.format(scenario_type, scenario_start_time, scenario_end_time))
-        if scenario_type == 'D':
-            scenario_end_time = scenario_start_time + pd.DateOffset(minutes=7, second=15)  # Cap Delta scenarios at 7 minutes 15 seconds
-            scenario_data = scenario_data[scenario_data['SampleTime'] <= scenario_end_time]
-        # record the first lead_alt and wing_alt in the defined scenario
-        lead_alt = scenario_data[scenario_data['MarkingTxt'] == 'AMBUSH51']['Altitude'].iloc[0]
-        wing_alt = scenario_data[scenario_data['MarkingTxt'] == 'HAWK11']['Altitude'].iloc[0]
-        
-        num_CMs = scenario_data[scenario_data['MarkingTxt'] == 'JASSM']['EntId'].nunique()
-        if scenario_type == 'D' and num_CMs > 6:
-            num_CMs = 6
-        CM_EntIds = scenario_data[scenario_data['MarkingTxt'] == 'JASSM']['EntId'].unique()
-        
-        scenario_data['CM_Altitude_Lead'] = lead_alt
-        scenario_data['CM_Altitude_Wing'] = wing_alt
-        scenario_data['CM_Airspeed'] = CM_airspeed
-
-        # --- Generate MOPs for this scenario ---
-        scenario_mops = {}
-        scenario_mops['Flight_Number'] = flight_number
-        scenario_mops['Lead_Pilot'] = lead_pilot
-        scenario_mops['Scenario_within_flight'] = scenario
-        scenario_mops['Scenario_Type'] = scenario_type
-        scenario_mops['Autonomy_Config'] = autonomy_config
-        if autonomy_config in ['HH', 'AH']:
-            scenario_mops['Num_Tactical_Comms'] = num_tac_comms
-        if autonomy_config in ['AA', 'HA']:
-            scenario_mops['Num_Tactical_Comms'] = 0
-        scenario_mops['Correct_Sort'] = correct_sort
-        scenario_mops['Num_CMs'] = num_CMs
-        scenario_mops['Lead_Altitude_MSL_ft'] = lead_alt
-        scenario_mops['Wingman_Altitude_MSL_ft'] = wing_alt
-        scenario_mops['CM_Airspeed_kt'] = CM_airspeed
-        scenario_mops['Scenario_Start_Time'] = scenario_start_time
-
-        # --- Altitude Deviation MOPs ---      
-        alt_devs_lead = altitude_deviation(scenario_data, role='Lead', assigned_alt=int(lead_alt), alt_block_radius=500)
-        alt_devs_wing = altitude_deviation(scenario_data, role='Wingman', assigned_alt=int(wing_alt), alt_block_radius=500)
-
-        scenario_mops['Lead_Altitude_Deviation_Count'] = alt_devs_lead[0]
-        scenario_mops['Wingman_Altitude_Deviation_Count'] = alt_devs_wing[0]
-        scenario_mops['Lead_Altitude_Deviation_Integrated_ft_s'] = alt_devs_lead[1]
-        scenario_mops['Wingman_Altitude_Deviation_Integrated_ft_s'] = alt_devs_wing[1]
-
-        # --- Cruise Missile Intercept MOPs ---
-        CM_time_to_intercept_dict = {}
-        for cm_ID in CM_EntIds:
-            # if within_cone is not empty:
-            if is_within_cone(scenario_data, cm_index=cm_ID, role='Lead', scenario_alt=lead_alt, pbu_data=tasking_data) is not None:
-                intercept_mops = is_within_cone(scenario_data, cm_index=cm_ID, role='Lead', scenario_alt=lead_alt, pbu_data=tasking_data)
-                CM_time_to_intercept_dict[cm_ID] = intercept_mops['Time_to_Intercept_s_from_start']
-            elif is_within_cone(scenario_data, cm_index=cm_ID, role='Wingman', scenario_alt=wing_alt, pbu_data=tasking_data) is not None:
-                intercept_mops = is_within_cone(scenario_data, cm_index=cm_ID, role='Wingman', scenario_alt=wing_alt, pbu_data=tasking_data)
-                CM_time_to_intercept_dict[cm_ID] = intercept_mops['Time_to_Intercept_s_from_start']
-        
-        CM_time_to_intercept_dict = dict(sorted(CM_time_to_intercept_dict.items(), key=lambda item: item[1]))
-        total_CMs_intercepted = len(CM_time_to_intercept_dict)
-        prop_CMs_intercepted = total_CMs_intercepted / num_CMs if num_CMs > 0 else 0
-        scenario_mops['Total_CMs_Intercepted'] = total_CMs_intercepted
-        scenario_mops['Proportion_CMs_Intercepted'] = prop_CMs_intercepted
-        # iterate through the cm_s in order of time to intercept
-        most_recent_lead_int_time = None
-        most_recent_wing_int_time = None
-        for i, (cm_ID, time_to_intercept) in enumerate(CM_time_to_intercept_dict.items(), start=1):
-            if is_within_cone(scenario_data, cm_index=cm_ID, role='Lead', scenario_alt=lead_alt, pbu_data=tasking_data) is not None:
-                intercept_mops = is_within_cone(scenario_data, cm_index=cm_ID, role='Lead', scenario_alt=lead_alt, pbu_data=tasking_data, previous_int_time=most_recent_lead_int_time, pilot=lead_pilot, flight_num=flight_number, scenario=scenario, config=autonomy_config)
-                scenario_mops[f'CM{i}_EntId'] = cm_ID
-                scenario_mops[f'CM{i}_Interceptor Role'] = intercept_mops['Interceptor Role']
-                scenario_mops[f'CM{i}_Time_to_Intercept_s_from_start'] = intercept_mops['Time_to_Intercept_s_from_start']
-                scenario_mops[f'CM{i}_MOP_Time_to_Intercept_s'] = intercept_mops['MOP_Time_to_Intercept_s']
-                scenario_mops[f'CM{i}_MOP_Time_to_Consent_s'] = intercept_mops['Time_to_Consent_s']
-                scenario_mops[f'CM{i}_Airspeed_at_Intercept_kt'] = intercept_mops['Airspeed_at_Intercept_kt']
-                scenario_mops[f'CM{i}_Airspeed_Diff_at_Intercept_kt'] = intercept_mops['Airspeed_Diff_at_Intercept_kt']
-                scenario_mops[f'CM{i}_Heading_at_Intercept_deg'] = intercept_mops['Heading_at_Intercept_deg']
-                scenario_mops[f'CM{i}_CM_Heading_at_Intercept_deg'] = intercept_mops['CM_Heading_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Heading_Diff_at_Intercept_deg'] = intercept_mops['Heading_Diff_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Altitude_at_Intercept_ft'] = intercept_mops['Altitude_at_Intercept_ft']
-                scenario_mops[f'CM{i}_Altitude_Offset_at_Intercept_ft'] = intercept_mops['Altitude_Offset_at_Intercept_ft']
-                scenario_mops[f'CM{i}_Bank_Angle_at_Intercept_deg'] = intercept_mops['Bank_Angle_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Distance_from_CM_at_Intercept_nm'] = intercept_mops['Distance_from_CM_at_Intercept_nm']
-                scenario_mops[f'CM{i}_Aspect_at_MELD_Range_deg'] = intercept_mops['Aspect_Angle_at_MELD_Entry_deg']
-                most_recent_lead_int_time = intercept_mops['CM_Int_Time']
-
-
-            elif is_within_cone(scenario_data, cm_index=cm_ID, role='Wingman', scenario_alt=wing_alt, pbu_data=tasking_data) is not None:
-                intercept_mops = is_within_cone(scenario_data, cm_index=cm_ID, role='Wingman', scenario_alt=wing_alt, previous_int_time=most_recent_wing_int_time, pbu_data=tasking_data, pilot=lead_pilot, flight_num=flight_number)
-                scenario_mops[f'CM{i}_EntId'] = cm_ID
-                scenario_mops[f'CM{i}_Interceptor Role'] = intercept_mops['Interceptor Role']
-                scenario_mops[f'CM{i}_Time_to_Intercept_s_from_start'] = intercept_mops['Time_to_Intercept_s_from_start']
-                scenario_mops[f'CM{i}_MOP_Time_to_Intercept_s'] = intercept_mops['MOP_Time_to_Intercept_s']
-                scenario_mops[f'CM{i}_MOP_Time_to_Consent_s'] = intercept_mops['Time_to_Consent_s']
-                scenario_mops[f'CM{i}_Airspeed_at_Intercept_kt'] = intercept_mops['Airspeed_at_Intercept_kt']
-                scenario_mops[f'CM{i}_Airspeed_Diff_at_Intercept_kt'] = intercept_mops['Airspeed_Diff_at_Intercept_kt']
-                scenario_mops[f'CM{i}_Heading_at_Intercept_deg'] = intercept_mops['Heading_at_Intercept_deg']
-                scenario_mops[f'CM{i}_CM_Heading_at_Intercept_deg'] = intercept_mops['CM_Heading_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Heading_Diff_at_Intercept_deg'] = intercept_mops['Heading_Diff_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Altitude_at_Intercept_ft'] = intercept_mops['Altitude_at_Intercept_ft']
-                scenario_mops[f'CM{i}_Altitude_Offset_at_Intercept_ft'] = intercept_mops['Altitude_Offset_at_Intercept_ft']
-                scenario_mops[f'CM{i}_Bank_Angle_at_Intercept_deg'] = intercept_mops['Bank_Angle_at_Intercept_deg']
-                scenario_mops[f'CM{i}_Distance_from_CM_at_Intercept_nm'] = intercept_mops['Distance_from_CM_at_Intercept_nm']
-                scenario_mops[f'CM{i}_Aspect_at_MELD_Range_deg'] = intercept_mops['Aspect_Angle_at_MELD_Entry_deg']
-                most_recent_wing_int_time = intercept_mops['CM_Int_Time']
-
-        # --- Define Scenario End Time, make it robust to terminate after picture is clean --- 
-        max_cm_time = scenario_data[scenario_data['MarkingTxt'] == 'JASSM']['SampleTime'].max()
-        if pd.notna(max_cm_time) and max_cm_time < scenario_end_time:
-            scenario_end_time = max_cm_time
-        scenario_duration = (scenario_end_time - scenario_start_time).total_seconds()
-        scenario_mops['Scenario_End_Time'] = scenario_end_time
-        scenario_mops['Scenario_Duration_s'] = scenario_duration
-
-        # --- SAM Identification MOPs ---
-        SAM_data = scenario_data[(scenario_data['MarkingTxt'] == 'SAM') & (scenario_data['SampleTime'] <= scenario_end_time) & (scenario_data['SampleTime'] >= scenario_start_time)]
+def intercept_events(intercepts, CM_EntIds, num_CMs):
+    """
+    Cruise missile intercept MOPs of a scenario, with the intercepted CMs sequenced by time to intercept.
+    intercepts is the scenario's ScenarioIntercepts (or anything with the same interceptor_role/evaluate/event).
+    Returns (mops, events): a dict of Total/Proportion_CMs_Intercepted and one dict of the CM_FIELDS per intercepted CM.
+    """
+    mops = {}
+    events = []
+    CM_time_to_intercept_dict = {}
+    CM_interceptor_role = {}
+    for cm_ID in CM_EntIds:
+        role = intercepts.interceptor_role(cm_ID)
+        if role is not None:
+            CM_interceptor_role[cm_ID] = role
+            CM_time_to_intercept_dict[cm_ID] = intercepts.evaluate(cm_ID, role)['Time_to_Intercept_s_from_start']
+    
+    CM_time_to_intercept_dict = dict(sorted(CM_time_to_intercept_dict.items(), key=lambda item: item[1]))
+    total_CMs_intercepted = len(CM_time_to_intercept_dict)
+    prop_CMs_intercepted = total_CMs_intercepted / num_CMs if num_CMs > 0 else 0
+    mops['Total_CMs_Intercepted'] = total_CMs_intercepted
+    mops['Proportion_CMs_Intercepted'] = prop_CMs_intercepted
+    # iterate through the cm_s in order of time to intercept
+    most_recent_int_time = {'Lead': None, 'Wingman': None}
+    for i, (cm_ID, time_to_intercept) in enumerate(CM_time_to_intercept_dict.items(), start=1):
+        role = CM_interceptor_role[cm_ID]
+        intercept_mops = intercepts.event(cm_ID, role, previous_int_time=most_recent_int_time[role])
+        events.append({
+            'EntId': cm_ID,
+            'Interceptor Role': intercept_mops['Interceptor Role'],
+            'Time_to_Intercept_s_from_start': intercept_mops['Time_to_Intercept_s_from_start'],
+            'MOP_Time_to_Intercept_s': intercept_mops['MOP_Time_to_Intercept_s'],
+            'MOP_Time_to_Consent_s': intercept_mops['Time_to_Consent_s'],
+            'Airspeed_at_Intercept_kt': intercept_mops['Airspeed_at_Intercept_kt'],
+            'Airspeed_Diff_at_Intercept_kt': intercept_mops['Airspeed_Diff_at_Intercept_kt'],
+            'Heading_at_Intercept_deg': intercept_mops['Heading_at_Intercept_deg'],
+            'CM_Heading_at_Intercept_deg': intercept_mops['CM_Heading_at_Intercept_deg'],
+            'Heading_Diff_at_Intercept_deg': intercept_mops['Heading_Diff_at_Intercept_deg'],
+            'Altitude_at_Intercept_ft': intercept_mops['Altitude_at_Intercept_ft'],
+            'Altitude_Offset_at_Intercept_ft': intercept_mops['Altitude_Offset_at_Intercept_ft'],
+            'Bank_Angle_at_Intercept_deg': intercept_mops['Bank_Angle_at_Intercept_deg'],
+            'Distance_from_CM_at_Intercept_nm': intercept_mops['Distance_from_CM_at_Intercept_nm'],
+            'Aspect_at_MELD_Range_deg': intercept_mops['Aspect_Angle_at_MELD_Entry_deg'],
+        })
+        most_recent_int_time[role] = intercept_mops['CM_Int_Time']
+    return mops, events
+
+
+def cm_intercept_mops(intercepts, CM_EntIds, num_CMs):
+    """The intercept MOPs of intercept_events in the wide layout: Total/Proportion_CMs_Intercepted and the CM<i>_ columns."""
+    return wide_row(*intercept_events(intercepts, CM_EntIds, num_CMs))
+
+
+def reduce_scenario(scenario_view, scenario, scenario_inputs, tasking_index, lead_pilot, flight_number, traces=None):
+    """
+    Reduce one scenario to its MOPs. Inputs are:
+    scenario_view: ScenarioView of the scenario's DIS rows (with airspeed already merged)
+    scenario: scenario number within the flight
+    scenario_inputs: the scenario's row of Inputs/Input_<pilot>_<flight>.csv
+    tasking_index: TaskingIndex of the sortie's DIS tasking PDUs
+    traces: optional TraceArchive to store the scenario's merged CM/aircraft intercept traces in
+    Returns (scenario_mops, intercepts, sams), a scenario's rows of a MOPStore: the dict of scenario-level MOPs and
+    the dicts of each intercepted CM's and each SAM's MOPs.
+    """
+    scenario_type = scenario_inputs['Scenario'].values[0]
+    autonomy_config = scenario_inputs['Configuration'].values[0]
+    correct_sort = scenario_inputs['Correct_Acquistion'].values[0]
+    num_tac_comms = scenario_inputs['Tac_Comms'].values[0]
+
+    CM_airspeed = CM_AIRSPEED_KT
+
+    scenario_start_time = scenario_view.start_time
+    print('Scenario Type: {}, Start Time: {}, End Time: {}'.format(scenario_type, scenario_start_time, scenario_view.end_time))
+    with stage('scenario_slice'):
+        scenario_view, scenario_end_time, lead_alt, wing_alt, CM_EntIds, num_CMs = scored_scenario(scenario_view, scenario_type)
+
+    # --- Generate MOPs for this scenario ---
+    scenario_mops = {}
+    scenario_mops['Flight_Number'] = flight_number
+    scenario_mops['Lead_Pilot'] = lead_pilot
+    scenario_mops['Scenario_within_flight'] = scenario
+    scenario_mops['Scenario_Type'] = scenario_type
+    scenario_mops['Autonomy_Config'] = autonomy_config
+    if autonomy_config in ['HH', 'AH']:
+        scenario_mops['Num_Tactical_Comms'] = num_tac_comms
+    if autonomy_config in ['AA', 'HA']:
+        scenario_mops['Num_Tactical_Comms'] = 0
+    scenario_mops['Correct_Sort'] = correct_sort
+    scenario_mops['Num_CMs'] = num_CMs
+    scenario_mops['Lead_Altitude_MSL_ft'] = lead_alt
+    scenario_mops['Wingman_Altitude_MSL_ft'] = wing_alt
+    scenario_mops['CM_Airspeed_kt'] = CM_airspeed
+    scenario_mops['Scenario_Start_Time'] = scenario_start_time
+
+    # --- Altitude Deviation MOPs ---      
+    with stage('altitude_deviation'):
+        alt_stats = altitude_compliance(scenario_view, {'Lead': int(lead_alt), 'Wingman': int(wing_alt)}, alt_block_radius=500)
+
+        scenario_mops['Lead_Altitude_Deviation_Count'] = alt_stats.loc['Lead', 'Violation_Count']
+        scenario_mops['Wingman_Altitude_Deviation_Count'] = alt_stats.loc['Wingman', 'Violation_Count']
+        scenario_mops['Lead_Altitude_Deviation_Integrated_ft_s'] = alt_stats.loc['Lead', 'Integrated_ft_s']
+        scenario_mops['Wingman_Altitude_Deviation_Integrated_ft_s'] = alt_stats.loc['Wingman', 'Integrated_ft_s']
+        scenario_mops['Lead_Time_Outside_Altitude_Block_s'] = alt_stats.loc['Lead', 'Time_Outside_s']
+        scenario_mops['Wingman_Time_Outside_Altitude_Block_s'] = alt_stats.loc['Wingman', 'Time_Outside_s']
+        scenario_mops['Lead_Max_Altitude_Excursion_ft'] = alt_stats.loc['Lead', 'Max_Excursion_ft']
+        scenario_mops['Wingman_Max_Altitude_Excursion_ft'] = alt_stats.loc['Wingman', 'Max_Excursion_ft']
+
+    # --- Cruise Missile Intercept MOPs ---
+    # the intercept geometry for all CMs and both roles is built once per scenario; only the MELD part is redone as the CMs are sequenced
+    with stage('intercept_evaluation'):
+        intercepts = ScenarioIntercepts(scenario_view, tasking_index, {'Lead': lead_alt, 'Wingman': wing_alt}, cm_ids=CM_EntIds)
+        cm_mops, cm_events = intercept_events(intercepts, CM_EntIds, num_CMs)
+        scenario_mops.update(cm_mops)
+    if traces is not None:
+        with stage('trace_write'):
+            traces.write_scenario(lead_pilot, flight_number, autonomy_config, scenario_type, scenario, intercepts.table)
+
+    # --- Define Scenario End Time, make it robust to terminate after picture is clean --- 
+    max_cm_time = scenario_view.marking('JASSM')['SampleTime'].max()
+    if pd.notna(max_cm_time) and max_cm_time < scenario_end_time:
+        scenario_end_time = max_cm_time
+    scenario_duration = (scenario_end_time - scenario_start_time).total_seconds()
+    scenario_mops['Scenario_End_Time'] = scenario_end_time
+    scenario_mops['Scenario_Duration_s'] = scenario_duration
+
+    # --- SAM Identification MOPs ---
+    with stage('sam_id'):
+        SAM_data = scenario_view.marking('SAM')
+        SAM_data = SAM_data[(SAM_data['SampleTime'] <= scenario_end_time) & (SAM_data['SampleTime'] >= scenario_start_time)]
         SAM_data['SampleTime'] = pd.to_datetime(SAM_data['SampleTime'])
         num_sams = SAM_data['EntId'].nunique()
         SAM_IDs = SAM_data['EntId'].unique()
         # SAMs_Identified = input(f"Enter the number of SAMs identified by the Lead in scenario {scenario}: ")
-        SAMs_Identified = input_data[input_data['Scenario_Num'] == scenario]['SAMS_ID'].values[0]
+        SAMs_Identified = scenario_inputs['SAMS_ID'].values[0]
         print(f'Scenario {scenario} has {num_sams} SAMs, Lead identified {SAMs_Identified}')
         scenario_mops['Num_SAMs'] = num_sams
         scenario_mops['SAMs_Identified_by_Lead'] = SAMs_Identified
@@ -203,46 +374,45 @@ if __name__ == "__main__":
         bullseye_lat = 41.38494111111111
         bullseye_lon = -91.24627944444444
         # record the SAM_ID_Times as stamped in the CR.
-        SAM_ID_Times = []
-        for i in range(1, int(SAMs_Identified) + 1):
-            SAM_ID_Times.append(input_data[input_data['Scenario_Num'] == scenario][f'SAM_{i}_ID_Time_s'].values[0])
-            clean_time = SAM_ID_Times[-1]
-            SAM_ID_Times[-1] = pd.to_datetime(f"{scenario_start_time.date()} {clean_time}", errors="coerce") + pd.DateOffset(hours=5) # convert to Zulu
-        for i, sam_ID in enumerate(SAM_IDs, start=1):
-            scenario_mops[f'SAM{i}_EntId'] = sam_ID
+        SAM_ID_Times = sam_id_times(scenario_inputs, scenario_start_time)
+        sam_events = []
+        for sam_ID in SAM_IDs:
             SAM_spawn_time = SAM_data[SAM_data['EntId'] == sam_ID]['SampleTime'].min()
-            SAM_spawn_date = SAM_spawn_time.date()
-            scenario_mops[f'SAM{i}_Time_to_ID_s'] = 30
+            sam_event = {'EntId': sam_ID, 'Time_to_ID_s': 30}
             # check to see if there is a SAM_ID_Time within SAM_spawn_time to SAM_spawn_time + 30s, replace time_to_ID_s if so
             for sam_id_time in SAM_ID_Times:
                 if SAM_spawn_time <= sam_id_time <= (SAM_spawn_time + pd.DateOffset(seconds=30)):
-                    scenario_mops[f'SAM{i}_Time_to_ID_s'] = (sam_id_time - SAM_spawn_time).total_seconds()
-
-        # --- Tasking MOPs ---
-        if autonomy_config == 'AA':
-            tasking_data_scenario = tasking_data[(tasking_data['Scenario'] == scenario_type) & (tasking_data['Configuration'] == autonomy_config)].copy()
-            if scenario_type == 'D':
-                tasking_data_scenario = tasking_data_scenario[tasking_data_scenario['SampleTime'] <= scenario_end_time]
-            subset = tasking_data_scenario.loc[
-                tasking_data_scenario['ReceivingEntityID_Site'] == 73, 
-                ['RequestID', 'RequestStatus']
-            ]
-            num_tasking_comms = subset.drop_duplicates().shape[0]
-            scenario_mops['Num_Tactical_Comms'] += num_tasking_comms
-        if autonomy_config == 'HA':
-            tasking_data_scenario = tasking_data[(tasking_data['Scenario'] == scenario_type) & (tasking_data['Configuration'] == autonomy_config)].copy()
-            if scenario_type == 'D':
-                tasking_data_scenario = tasking_data_scenario[tasking_data_scenario['SampleTime'] <= scenario_end_time]
-            subset = tasking_data_scenario.loc[
-                tasking_data_scenario['ReceivingEntityID_Site'] == 73, 
-                ['RequestID', 'RequestStatus']
-            ]
-            num_tasking_comms = subset.drop_duplicates().shape[0]            
-            scenario_mops['Num_Tactical_Comms'] += num_tasking_comms
-
-        mops_df = pd.concat([mops_df, pd.DataFrame([scenario_mops])], ignore_index=True)
-
-    # Save MOPs to CSV
-    mops_df.to_csv(f'{output_file_path}/MOPs_{lead_pilot}_Flight{flight_number}.csv', index=False)
-
-    print(f"Data reduction complete. MOPs saved to {output_file_path}.")
\ No newline at end of file
+                    sam_event['Time_to_ID_s'] = (sam_id_time - SAM_spawn_time).total_seconds()
+            sam_events.append(sam_event)
+
+    # --- Tasking MOPs ---
+    # requests received by the Wingman (site 73) count as tactical comms when the autonomy is tasking
+    with stage('tasking'):
+        if autonomy_config in ['AA', 'HA']:
+            tasking_end_time = scenario_end_time if scenario_type == 'D' else None
+            scenario_mops['Num_Tactical_Comms'] += tasking_index.request_count(scenario_type, autonomy_config, 73, tasking_end_time)
+
+    return scenario_mops, cm_events, sam_events
+
+
+if __name__ == "__main__":
+    # Define file paths
+    input_file_path = 'Data/'
+    data_threads = {'comm':'Communications', 'CM':'CruiseMissiles', 'L':'Lead',
+                    'W':'Wingman', 'ST':'SurfaceThreats', 'W':'Workload'}
+    output_file_path = 'Output'
+
+    # request input from user for the Lead pilot's name and the flight number
+    lead_pilot = input("Enter Lead pilot's name (Chan, Grimmer, Jacob): ")
+    flight_number = input("Enter flight number: ")
+
+    # stage timings, memory and call counts of the run go to Output/Reports/Run_<pilot>_Flight<n>.json
+    with RunReport(lead_pilot, flight_number) as report:
+        mops_df = reduce_flight(lead_pilot, flight_number)
+
+        # Save MOPs to CSV
+        with stage('write'):
+            mops_df.to_csv(f'{output_file_path}/MOPs_{lead_pilot}_Flight{flight_number}.csv', index=False)
+    report_path = report.write(os.path.join(output_file_path, 'Reports'))
+
+    print(f"Data reduction complete. MOPs saved to {output_file_path}, run report saved to {report_path}.")
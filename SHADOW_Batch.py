@@ -0,0 +1,189 @@
+"""
+Batch version of SHADOW.py. Reduces every sortie in the campaign without interactive prompts.
+Every Inputs/Input_<pilot>_<flight>.csv with matching Data/ files is reduced across a process pool, each flight's
+MOPs are written to Output/MOPs_<pilot>_Flight<flight>.csv, and the consolidated table that Output_to_MOPs.ipynb
+builds is written to SHADOW_MOPs.csv. A failure in one flight is reported and does not stop the others.
+
+Example:
+    python SHADOW_Batch.py --workers 4
+    python SHADOW_Batch.py --pilots Chan Grimmer --no-consolidate
+    python SHADOW_Batch.py --stream --chunksize 500000    # long sorties / full-rate DIS logs
+    python SHADOW_Batch.py --incremental                  # only re-reduce what changed since the last build
+    python SHADOW_Batch.py --traces                       # also archive the intercept traces in Output/Intercept_Traces
+    python SHADOW_Batch.py --pilots Chan --profile        # cProfile + tracemalloc in the run reports
+Every flight writes a run report (stage timings, memory and call counts, see Utils/Telemetry.py) to
+Output/Reports/Run_<pilot>_Flight<flight>.json and the batch rolls them up into Output/Reports/Campaign_Report.json.
+"""
+
+# import libraries
+import os
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from SHADOW import reduce_flight, reduce_flight_streaming
+from Utils.Campaign import find_flights, consolidate_mops, read_flight_mops, read_mops_csv, merge_flight_mops, update_consolidated
+from Utils.BuildManifest import code_version, load_manifest, save_manifest, plan_flight, record_flight
+from Utils.TraceArchive import TraceArchive
+from Utils.Telemetry import RunReport, stage, read_reports, write_rollup, print_rollup
+
+
+def run_flight(lead_pilot, flight_number, root='.', output_file_path='Output', chunksize=None, scenarios=None, traces=None,
+               profile=False):
+    """
+    Reduce one sortie and save its MOPs. Returns a status dict instead of raising so one bad flight can't sink the batch.
+    A chunksize switches to the streaming reduction, which reads the DIS log one scenario window at a time.
+    With scenarios, only those scenario numbers are re-reduced and swapped into the flight's existing MOP CSV.
+    traces is the root of a TraceArchive to store the flight's intercept traces in (None to skip them).
+    The flight's run report goes to <output_file_path>/Reports; profile adds cProfile and tracemalloc to it.
+    """
+    start = time.perf_counter()
+    status = {'Lead_Pilot': lead_pilot, 'Flight_Number': flight_number, 'ok': False, 'num_scenarios': 0,
+              'elapsed_s': 0.0, 'output': None, 'report': None, 'error': None}
+    report = RunReport(lead_pilot, flight_number, profile)
+    try:
+        with report:
+            archive = TraceArchive(traces) if traces else None
+            if archive is not None and not scenarios:
+                archive.clear_flight(lead_pilot, flight_number)
+            if chunksize:
+                mops_df = reduce_flight_streaming(lead_pilot, flight_number, root, chunksize, scenarios, archive)
+            else:
+                mops_df = reduce_flight(lead_pilot, flight_number, root, scenarios, archive)
+            with stage('write'):
+                output = os.path.join(output_file_path, f'MOPs_{lead_pilot}_Flight{flight_number}.csv')
+                if scenarios:
+                    mops_df = merge_flight_mops(read_mops_csv(output), mops_df)
+                mops_df.to_csv(output, index=False)
+        status.update(ok=True, num_scenarios=len(mops_df), output=output)
+    except Exception:
+        status['error'] = traceback.format_exc()
+    status['report'] = report.write(os.path.join(output_file_path, 'Reports'))
+    status['elapsed_s'] = time.perf_counter() - start
+    return status
+
+
+def run_campaign(flights, root='.', output_file_path='Output', workers=None, chunksize=None, scenarios=None, traces=None,
+                 profile=False):
+    """
+    Reduce a list of (pilot, flight_number) sorties across a process pool. Returns the per-flight status dicts.
+    scenarios optionally maps a flight to the scenario numbers to re-reduce (see run_flight).
+    """
+    os.makedirs(output_file_path, exist_ok=True)
+    scenarios = scenarios or {}
+    results = []
+    if workers == 1:
+        for lead_pilot, flight_number in flights:
+            results.append(run_flight(lead_pilot, flight_number, root, output_file_path, chunksize,
+                                      scenarios.get((lead_pilot, flight_number)), traces, profile))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_flight, lead_pilot, flight_number, root, output_file_path, chunksize,
+                               scenarios.get((lead_pilot, flight_number)), traces, profile): (lead_pilot, flight_number)
+                   for lead_pilot, flight_number in flights}
+        for future in as_completed(futures):
+            status = future.result()
+            print('{} {} flight {} in {:.1f} s'.format('Finished' if status['ok'] else 'FAILED',
+                                                       status['Lead_Pilot'], status['Flight_Number'], status['elapsed_s']))
+            results.append(status)
+    results.sort(key=lambda status: (status['Lead_Pilot'], int(status['Flight_Number'])))
+    return results
+
+
+def run_incremental(flights, root='.', output_file_path='Output', workers=None, chunksize=None, consolidated=None,
+                    traces=None, profile=False):
+    """
+    Dependency-tracked build: re-reduce only the flights (or scenarios) whose data, inputs or reduction code changed
+    since the last build (see Utils/BuildManifest.py), then update the consolidated table in place.
+    Returns the per-flight status dicts of the flights that were rebuilt.
+    """
+    os.makedirs(output_file_path, exist_ok=True)
+    manifest = load_manifest(output_file_path)
+    code = code_version()
+    plans = {flight: plan_flight(*flight, manifest, code, root, output_file_path) for flight in flights}
+    stale = [flight for flight, plan in plans.items() if plan['stale']]
+    for flight, plan in plans.items():
+        if not plan['stale']:
+            # keep the latest file stamps so touched-but-unchanged files are not re-hashed next time
+            manifest['flights'][plan['key']]['sources'] = plan['entry']['sources']
+    for flight in flights:
+        print('{:<14}{:>4}  {}'.format(flight[0], flight[1], plans[flight]['reason'] or 'up to date'))
+
+    scenarios = {flight: plans[flight]['scenarios'] for flight in stale if plans[flight]['stale'] == 'scenarios'}
+    results = run_campaign(stale, root, output_file_path, workers, chunksize, scenarios, traces, profile)
+    rebuilt = {}
+    for status in results:
+        if status['ok']:
+            flight = (status['Lead_Pilot'], status['Flight_Number'])
+            record_flight(manifest, plans[flight])
+            rebuilt[flight] = read_mops_csv(status['output'])
+    save_manifest(manifest, output_file_path)
+
+    if consolidated and (rebuilt or not os.path.exists(consolidated)):
+        MOP_df = update_consolidated(consolidated, rebuilt, output_file_path)
+        MOP_df.to_csv(consolidated, index=False)
+        print(f'Updated {len(rebuilt)} flights in {consolidated}')
+    return results
+
+
+def print_summary(results, wall_time):
+    """Print the per-flight timing summary and any failures."""
+    print('\n--- SHADOW batch summary ---')
+    for status in results:
+        state = '{:>3} scenarios'.format(status['num_scenarios']) if status['ok'] else 'FAILED'
+        print('{:<14}{:>4}  {:>8.1f} s  {}'.format(status['Lead_Pilot'], status['Flight_Number'], status['elapsed_s'], state))
+    num_ok = sum(status['ok'] for status in results)
+    cpu_time = sum(status['elapsed_s'] for status in results)
+    print(f'{num_ok} of {len(results)} flights reduced in {wall_time:.1f} s wall time ({cpu_time:.1f} s summed over flights)')
+    for status in results:
+        if not status['ok']:
+            print(f"\n{status['Lead_Pilot']} flight {status['Flight_Number']} failed:\n{status['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Reduce every sortie in the campaign to MOPs.')
+    parser.add_argument('--root', default='.', help='repository root holding Data/ and Inputs/')
+    parser.add_argument('--output', default='Output', help='folder for per-flight MOP CSVs')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--pilots', nargs='*', default=None, help='only reduce flights for these lead pilots')
+    parser.add_argument('--consolidated', default='SHADOW_MOPs.csv', help='path of the consolidated MOP table')
+    parser.add_argument('--no-consolidate', action='store_true', help='skip writing the consolidated MOP table')
+    parser.add_argument('--stream', action='store_true', help='read each DIS log in chunks, one scenario window at a time')
+    parser.add_argument('--chunksize', type=int, default=200000, help='rows per chunk with --stream')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-reduce flights/scenarios whose data, inputs or reduction code changed')
+    parser.add_argument('--traces', action='store_true',
+                        help='archive the merged CM/aircraft intercept traces in <output>/Intercept_Traces')
+    parser.add_argument('--profile', action='store_true',
+                        help='run each flight under cProfile and tracemalloc and add the results to its run report')
+    args = parser.parse_args()
+
+    flights, skipped = find_flights(args.root, args.pilots)
+    for (lead_pilot, flight_number), missing in skipped.items():
+        print(f'Skipping {lead_pilot} flight {flight_number}, missing: {", ".join(missing)}')
+    print(f'Reducing {len(flights)} flights...')
+
+    start = time.perf_counter()
+    chunksize = args.chunksize if args.stream else None
+    traces = os.path.join(args.output, 'Intercept_Traces') if args.traces else None
+    if args.incremental:
+        consolidated = None if args.no_consolidate else args.consolidated
+        results = run_incremental(flights, args.root, args.output, args.workers, chunksize, consolidated, traces,
+                                  args.profile)
+    else:
+        results = run_campaign(flights, args.root, args.output, args.workers, chunksize, traces=traces,
+                               profile=args.profile)
+
+    if not args.no_consolidate and not args.incremental:
+        MOP_df = consolidate_mops(read_flight_mops(args.output))
+        MOP_df.to_csv(args.consolidated, index=False)
+        print(f'Consolidated {len(MOP_df)} scenarios into {args.consolidated}')
+
+    print_summary(results, time.perf_counter() - start)
+
+    # campaign rollup of the run reports of the flights reduced in this run
+    report_dir = os.path.join(args.output, 'Reports')
+    if results:
+        print('\n--- Stage timings (Utils/Telemetry.py) ---')
+        print_rollup(write_rollup(read_reports([status['report'] for status in results]), report_dir))
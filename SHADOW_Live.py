@@ -0,0 +1,65 @@
+"""
+Live MOP monitor. Replays a recorded sortie (Data/Lead DIS and Data/Tasking tables) through the same incremental
+evaluation a live DIS feed would get, and prints altitude busts, intercept-criteria events, time to consent and
+SAM-ID timeliness per scenario as they happen.
+
+Example:
+    python SHADOW_Live.py Chan 1 --speed 20
+"""
+
+# import libraries
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from SHADOW import prepare_inputs, sam_id_times
+from Utils.Campaign import flight_paths
+from Utils.FlightCache import load_table
+from Utils.Exclusions import load_exclusions, apply_exclusions
+from Utils.LiveMonitor import LiveMonitor, replay
+
+
+def scenario_sam_id_times(input_data, flight_data):
+    """SAM ID times from the Inputs file for each (Scenario, Configuration) flown, keyed for LiveMonitor."""
+    start_times = flight_data.groupby(['Scenario', 'Configuration'], observed=True)['SampleTime'].min()
+    times = {}
+    for _, row in prepare_inputs(input_data).iterrows():
+        key = (row['Scenario'], row['Configuration'])
+        if key in start_times.index:
+            times[key] = sam_id_times(row.to_frame().T, start_times.loc[key])
+    return times
+
+
+async def monitor_flight(lead_pilot, flight_number, root='.', speed=1.0, batch_s=0.1):
+    """Replay a sortie into a LiveMonitor. Returns the monitor once the replay has finished."""
+    paths = flight_paths(lead_pilot, flight_number, root)
+    windows = load_exclusions(lead_pilot, flight_number, root)
+    flight_data = apply_exclusions(load_table(paths['flight'], 'flight'), windows)
+    tasking_data = apply_exclusions(load_table(paths['tasking'], 'tasking'), windows)
+    input_data = pd.read_csv(paths['input'], low_memory=False)
+
+    monitor = LiveMonitor(sam_id_times=scenario_sam_id_times(input_data, flight_data))
+    queue = asyncio.Queue(maxsize=100)
+    await asyncio.gather(replay(flight_data, tasking_data, queue, speed, batch_s), monitor.run(queue))
+    return monitor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay a sortie through the live MOP monitor.')
+    parser.add_argument('lead_pilot', help="Lead pilot's name as used in the Data file names")
+    parser.add_argument('flight_number', help='flight number')
+    parser.add_argument('--root', default='.', help='repository root holding Data/ and Inputs/')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay rate, 1 (real time) to 100')
+    parser.add_argument('--batch', type=float, default=0.1, help='recorded seconds per replayed batch')
+    parser.add_argument('--updates', default=None, help='optional CSV to save every update to')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    monitor = asyncio.run(monitor_flight(args.lead_pilot, args.flight_number, args.root, args.speed, args.batch))
+    latencies = np.array(monitor.latencies) * 1000
+    print(f'\nReplayed in {time.perf_counter() - start:.1f} s at {args.speed:g}x; '
+          f'processing latency per batch: mean {latencies.mean():.1f} ms, max {latencies.max():.1f} ms')
+    print(monitor.mops().to_string(index=False))
+    if args.updates:
+        pd.DataFrame(monitor.updates).to_csv(args.updates, index=False)
@@ -0,0 +1,46 @@
+"""
+Build the campaign figures (Utils/Figures.py) that Plot_Trust.ipynb and Output_to_MOPs.ipynb draw: the trust rating
+timeline of every sortie and the trust distributions by configuration in TrustPlots/, and the MOP scatter panels in
+Output/Figures/. Figures whose data and style have not changed since the last build are skipped, the rest are rendered
+across a process pool.
+
+Example:
+    python SHADOW_Plots.py
+    python SHADOW_Plots.py --pilots Chan --workers 4
+    python SHADOW_Plots.py --force                         # re-render every figure
+"""
+
+# import libraries
+import os
+import time
+import argparse
+import pandas as pd
+from Utils.Campaign import consolidate_mops, read_flight_mops
+from Utils.Figures import FIGURE_MANIFEST, build_figures, trust_timeline_specs, mean_trust_table, trust_box_specs, \
+    mop_figure_specs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the trust and MOP figures.')
+    parser.add_argument('--output', default='Output', help='folder of the per-flight MOPs_*.csv')
+    parser.add_argument('--pilots', nargs='*', default=None, help='only draw the trust timelines of these pilots')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='re-render every figure, changed or not')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    specs = trust_timeline_specs('.', args.pilots)
+    flight_mops = read_flight_mops(args.output)
+    if flight_mops:
+        specs += trust_box_specs(mean_trust_table(pd.concat(flight_mops, ignore_index=True)))
+        specs += mop_figure_specs(consolidate_mops(flight_mops))
+    else:
+        print(f'No MOPs_*.csv in {args.output}, skipping the MOP and trust distribution figures')
+    print(f'Planned {len(specs)} figures in {time.perf_counter() - start:.2f} s')
+
+    start = time.perf_counter()
+    result = build_figures(specs, os.path.join(args.output, os.path.basename(FIGURE_MANIFEST)), args.workers, args.force)
+    print(f"Rendered {len(result['rendered'])}, skipped {len(result['skipped'])} unchanged, "
+          f"{len(result['empty'])} without data, {len(result['failed'])} failed in {time.perf_counter() - start:.2f} s")
+    for path in result['failed']:
+        print(f'FAILED {path}')
@@ -0,0 +1,60 @@
+"""
+Score the campaign's MOPs (Utils/Scoring.py) straight from the consolidated MOP table, replacing the export to
+Scenario_C.xlsx/Scenario_D.xlsx and the MATLAB run of Scoring_SHADOW/scoring_fnxn_avgs.m.
+Writes to the output folder:
+    Score_Summary.csv     one row per pilot, scenario type and configuration (the SCORES_Scenario_C/D_Summary.xlsx sheets)
+    Scenario_Scores.csv   one row per scored scenario
+    Intercept_Scores.csv  one row per scenario and CM slot (terminal conditions, TTI and consent)
+    Score_Curves.csv      the fitted curve parameters
+    Score_CIs.csv         bootstrap confidence intervals of each configuration's mean scores (unless --bootstrap 0)
+
+Example:
+    python SHADOW_Score.py
+    python SHADOW_Score.py --from-flights Output --bootstrap 5000 --workers 4
+"""
+
+# import libraries
+import os
+import time
+import argparse
+import pandas as pd
+from Utils.Campaign import consolidate_mops, read_flight_mops, read_mops_csv
+from Utils.Scoring import score_campaign, summarize_scores, bootstrap_scores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Score the campaign MOPs.')
+    parser.add_argument('--consolidated', default='SHADOW_MOPs.csv', help='path of the consolidated MOP table')
+    parser.add_argument('--from-flights', default=None, metavar='FOLDER',
+                        help='consolidate the per-flight MOPs_*.csv in FOLDER instead of reading --consolidated')
+    parser.add_argument('--output', default=os.path.join('Output', 'Scores'), help='folder for the score tables')
+    parser.add_argument('--bootstrap', type=int, default=1000, help='bootstrap replicates (0 to skip the intervals)')
+    parser.add_argument('--level', type=float, default=0.95, help='confidence level of the intervals')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the bootstrap resampling')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.from_flights:
+        mops_df = consolidate_mops(read_flight_mops(args.from_flights))
+    else:
+        mops_df = read_mops_csv(args.consolidated)
+    scenario_scores, intercept_scores, curves = score_campaign(mops_df)
+    summary = summarize_scores(scenario_scores)
+
+    os.makedirs(args.output, exist_ok=True)
+    summary.to_csv(os.path.join(args.output, 'Score_Summary.csv'), index=False)
+    scenario_scores.to_csv(os.path.join(args.output, 'Scenario_Scores.csv'), index=False)
+    intercept_scores.to_csv(os.path.join(args.output, 'Intercept_Scores.csv'), index=False)
+    pd.DataFrame([[name, b, tau] for name, (b, tau) in curves.items()], columns=['Curve', 'b', 'tau']).to_csv(
+        os.path.join(args.output, 'Score_Curves.csv'), index=False)
+    print(f'Scored {len(scenario_scores)} scenarios in {time.perf_counter() - start:.2f} s')
+
+    if args.bootstrap > 0:
+        start = time.perf_counter()
+        cis = bootstrap_scores(mops_df, args.bootstrap, args.level, args.seed, args.workers)
+        cis.to_csv(os.path.join(args.output, 'Score_CIs.csv'), index=False)
+        overall = cis[cis['Score'] == 'Configuration_Overall_Score']
+        print(overall.drop(columns='Score').round(2).to_string(index=False))
+        print(f'{args.bootstrap} bootstrap replicates in {time.perf_counter() - start:.2f} s')
+    print(f'Wrote score tables to {args.output}')
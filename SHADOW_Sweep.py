@@ -0,0 +1,111 @@
+"""
+Threshold sensitivity sweep of the cruise missile intercept MOPs.
+The intercept criteria (INTERCEPT_CRITERIA in Utils/DataReduction.py: 1.5 nm distance, 30 deg trailing and nose cones,
+2.5 nm MELD range, 300 ms CM/aircraft match tolerance and 10 s kill window) are evaluated over a grid of values for
+every sortie in the campaign in one pass. Each flight is loaded and indexed once, each scenario's CM/aircraft
+geometry is computed once (Utils/Sweep.py), and every threshold set is then scored from it, so a grid of a hundred
+sets costs little more than a normal reduction. The intercept MOPs of every set are written in long form, one row
+per (Set, scenario, MOP), with the set's thresholds on each row.
+
+Example:
+    python SHADOW_Sweep.py --distance-nm 1 1.5 2 --trailing-cone-deg 20 30 45 --nose-cone-deg 20 30 45
+    python SHADOW_Sweep.py --pilots Chan --meld-range-nm 2 2.5 3 --kill-window-s 5 10 20 --workers 4
+"""
+
+# import libraries
+import os
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from SHADOW import load_flight, prepare_inputs, scored_scenario, cm_intercept_mops
+from Utils.DataReduction import INTERCEPT_CRITERIA, brute_force_merge_airspeed
+from Utils.Campaign import find_flights
+from Utils.FlightCache import parse_sample_times
+from Utils.FlightIndex import FlightIndex
+from Utils.TaskingIndex import TaskingIndex
+from Utils.Sweep import ScenarioSweep, criteria_grid
+
+SCENARIO_KEYS = ['Lead_Pilot', 'Flight_Number', 'Scenario_within_flight', 'Scenario_Type', 'Autonomy_Config']
+
+
+def sweep_flight(lead_pilot, flight_number, grid, root='.'):
+    """
+    Intercept MOPs of every scenario of a sortie under every threshold set of grid (see criteria_grid).
+    Returns a long-form DataFrame: Set, the set's thresholds, the scenario keys, MOP and Value.
+    """
+    flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data, input_data = load_flight(lead_pilot, flight_number, root)
+    for table in (flight_data, lead_airspeed_data, wing_airpseed_data, tasking_data):
+        parse_sample_times(table)
+    flight_data = brute_force_merge_airspeed(flight_data, lead_airspeed_data, wing_airpseed_data)
+    input_data = prepare_inputs(input_data)
+    flight_index = FlightIndex(flight_data)
+    tasking_index = TaskingIndex(tasking_data)
+
+    rows = []
+    for scenario in range(1, input_data['Scenario_Num'].max() + 1):
+        scenario_inputs = input_data[input_data['Scenario_Num'] == scenario]
+        scenario_type = scenario_inputs['Scenario'].values[0]
+        autonomy_config = scenario_inputs['Configuration'].values[0]
+        scenario_view = flight_index.scenario(scenario_type, autonomy_config)
+        scenario_view, _, lead_alt, wing_alt, CM_EntIds, num_CMs = scored_scenario(scenario_view, scenario_type)
+        sweep = ScenarioSweep(scenario_view, tasking_index, {'Lead': lead_alt, 'Wingman': wing_alt}, CM_EntIds, grid)
+        keys = [lead_pilot, flight_number, scenario, scenario_type, autonomy_config]
+        for s in range(len(grid)):
+            mops = cm_intercept_mops(sweep.intercepts(s), CM_EntIds, num_CMs)
+            rows.extend([s] + keys + [mop, value] for mop, value in mops.items())
+
+    sweep_mops = pd.DataFrame(rows, columns=['Set'] + SCENARIO_KEYS + ['MOP', 'Value'])
+    return grid.reset_index(drop=True).rename_axis('Set').reset_index().merge(sweep_mops, on='Set')
+
+
+def run_sweep(flights, grid, root='.', workers=None):
+    """
+    Sweep a list of (pilot, flight_number) sorties across a process pool. A failure in one flight is reported and
+    does not stop the others. Returns the long-form MOPs of every flight that succeeded.
+    """
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(sweep_flight, lead_pilot, flight_number, grid, root): (lead_pilot, flight_number)
+                   for lead_pilot, flight_number in flights}
+        for future in as_completed(futures):
+            lead_pilot, flight_number = futures[future]
+            try:
+                results[(lead_pilot, flight_number)] = future.result()
+                print(f'Finished {lead_pilot} flight {flight_number}')
+            except Exception:
+                print(f'FAILED {lead_pilot} flight {flight_number}:\n{traceback.format_exc()}')
+    if not results:
+        return pd.DataFrame(columns=['Set'] + list(grid.columns) + SCENARIO_KEYS + ['MOP', 'Value'])
+    sweep_mops = pd.concat([results[flight] for flight in flights if flight in results], ignore_index=True)
+    return sweep_mops.sort_values('Set', kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep the intercept criteria thresholds over the campaign.')
+    parser.add_argument('--root', default='.', help='repository root holding Data/ and Inputs/')
+    parser.add_argument('--output', default=os.path.join('Output', 'Sweep_MOPs.csv'), help='path of the long-form sweep table')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--pilots', nargs='*', default=None, help='only sweep flights for these lead pilots')
+    for name, default in INTERCEPT_CRITERIA.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=float, nargs='+', default=[default],
+                            help=f'values to sweep (default: {default})')
+    args = parser.parse_args()
+
+    grid = criteria_grid(**{name: getattr(args, name) for name in INTERCEPT_CRITERIA})
+    flights, skipped = find_flights(args.root, args.pilots)
+    for (lead_pilot, flight_number), missing in skipped.items():
+        print(f'Skipping {lead_pilot} flight {flight_number}, missing: {", ".join(missing)}')
+    print(f'Sweeping {len(grid)} threshold sets over {len(flights)} flights...')
+
+    start = time.perf_counter()
+    sweep_mops = run_sweep(flights, grid, args.root, args.workers)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    sweep_mops.to_csv(args.output, index=False)
+
+    # campaign-wide proportion of CMs intercepted under each threshold set
+    proportions = sweep_mops[sweep_mops['MOP'] == 'Proportion_CMs_Intercepted']
+    summary = proportions.assign(Value=proportions['Value'].astype(float)).groupby(['Set'] + list(grid.columns))['Value'].mean()
+    print(summary.rename('Mean_Proportion_CMs_Intercepted').reset_index().to_string(index=False))
+    print(f'Wrote {len(sweep_mops)} rows to {args.output} in {time.perf_counter() - start:.1f} s')
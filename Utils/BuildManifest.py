@@ -0,0 +1,122 @@
+# import libraries
+import os
+import json
+import hashlib
+import pandas as pd
+from Utils.Campaign import flight_paths
+from Utils.FlightCache import file_hash
+from Utils.Exclusions import exclusions_path
+from Utils.SensorStreams import SENSOR_STREAMS, stream_path
+
+# bump when the manifest layout changes so old manifests are ignored
+MANIFEST_VERSION = 1
+MANIFEST_NAME = '.build_manifest.json'
+# modules whose contents decide the MOPs; editing any of them makes every flight stale
+CODE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REDUCTION_SOURCES = ['SHADOW.py', 'Utils/DataReduction.py', 'Utils/FlightIndex.py', 'Utils/TaskingIndex.py',
+                     'Utils/FlightCache.py', 'Utils/Streaming.py', 'Utils/Exclusions.py', 'Utils/SensorStreams.py',
+                     'Utils/Kinematics.py', 'Utils/MOPStore.py', 'Utils/Campaign.py']
+
+
+def code_version(code_root=CODE_ROOT):
+    """SHA-1 over the reduction source files (REDUCTION_SOURCES)."""
+    sha = hashlib.sha1()
+    for source in REDUCTION_SOURCES:
+        sha.update(source.encode())
+        with open(os.path.join(code_root, source), 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def source_stamp(path, previous=None):
+    """
+    Size, modification time and SHA-1 of a file. The hash of previous (an earlier stamp of the same file) is
+    reused when size and modification time are unchanged, so unchanged flight logs are not re-read.
+    """
+    stat = os.stat(path)
+    stamp = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and previous['size'] == stamp['size'] and previous['mtime_ns'] == stamp['mtime_ns']:
+        stamp['sha1'] = previous['sha1']
+    else:
+        stamp['sha1'] = file_hash(path)
+    return stamp
+
+
+def scenario_hashes(input_path):
+    """SHA-1 of each scenario row of an Input_<pilot>_<flight>.csv, keyed by Scenario_Num (as a string)."""
+    input_data = pd.read_csv(input_path, low_memory=False)
+    input_data = input_data[input_data['Scenario_Num'].notna()]
+    return {str(int(row['Scenario_Num'])): hashlib.sha1(row.to_json().encode()).hexdigest()
+            for _, row in input_data.iterrows()}
+
+
+def load_manifest(output_path='Output'):
+    """The build manifest kept next to the per-flight MOP CSVs (an empty one if there is none yet)."""
+    path = os.path.join(output_path, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'flights': {}}
+
+
+def save_manifest(manifest, output_path='Output'):
+    with open(os.path.join(output_path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def plan_flight(lead_pilot, flight_number, manifest, code, root='.', output_path='Output'):
+    """
+    Decide what has to be recomputed for a flight. Returns a dict with:
+    stale: None (up to date), 'flight' (re-reduce every scenario) or 'scenarios' (only the scenarios listed)
+    scenarios: scenario numbers to re-reduce when stale is 'scenarios'
+    reason: why the flight is stale
+    entry: the manifest entry to record once the flight has been rebuilt
+    A flight is rebuilt whole when its DIS, airspeed, tasking, trust or workload file, its exclusion windows, the
+    reduction code or its output changed, or when scenarios were added or removed from its Inputs file. Edits to existing Inputs
+    rows only re-reduce the scenarios whose rows changed.
+    """
+    key = '{}_{}'.format(lead_pilot, flight_number)
+    previous = manifest['flights'].get(key)
+    old_sources = previous['sources'] if previous else {}
+    paths = flight_paths(lead_pilot, flight_number, root)
+    paths['exclusions'] = exclusions_path(lead_pilot, flight_number, root)
+    for stream in SENSOR_STREAMS:
+        paths[stream.lower()] = stream_path(stream, lead_pilot, flight_number, root)
+    sources = {name: source_stamp(path, old_sources.get(name)) if os.path.exists(path) else None
+               for name, path in paths.items()}
+    output = os.path.join(output_path, 'MOPs_{}_Flight{}.csv'.format(lead_pilot, flight_number))
+    entry = {'code': code, 'sources': sources, 'output': output}
+
+    if previous is not None and previous['sources']['input']['sha1'] == sources['input']['sha1']:
+        entry['scenarios'] = previous['scenarios']
+    else:
+        entry['scenarios'] = scenario_hashes(paths['input'])
+    plan = {'key': key, 'stale': 'flight', 'scenarios': [], 'reason': None, 'entry': entry}
+
+    if previous is None:
+        plan['reason'] = 'not built yet'
+    elif previous['code'] != code:
+        plan['reason'] = 'reduction code changed'
+    elif not os.path.exists(output) or previous.get('output_sha1') != file_hash(output):
+        plan['reason'] = 'output missing or modified'
+    elif any(stamp_hash(previous['sources'].get(name)) != stamp_hash(sources[name]) for name in sources if name != 'input'):
+        plan['reason'] = 'flight data, sensor streams or exclusion windows changed'
+    elif set(previous['scenarios']) != set(entry['scenarios']):
+        plan['reason'] = 'scenarios added or removed'
+    else:
+        changed = sorted(int(num) for num, sha1 in entry['scenarios'].items() if previous['scenarios'][num] != sha1)
+        plan.update(stale='scenarios' if changed else None, scenarios=changed,
+                    reason='inputs changed for scenario(s) {}'.format(changed) if changed else None)
+    return plan
+
+
+def stamp_hash(stamp):
+    return stamp['sha1'] if stamp else None
+
+
+def record_flight(manifest, plan):
+    """Record a rebuilt flight in the manifest, including the hash of the output it wrote."""
+    entry = dict(plan['entry'], output_sha1=file_hash(plan['entry']['output']))
+    manifest['flights'][plan['key']] = entry
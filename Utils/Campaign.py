@@ -0,0 +1,154 @@
+# import data analysis libraries
+import io
+import os
+import re
+import pandas as pd
+
+# Columns of the consolidated campaign table, in the order Output_to_MOPs.ipynb has always written them
+MOP_COLUMNS = [
+    # --- Scenario Metadata ---
+    "Flight_Number",
+    "Lead_Pilot",
+    "Scenario_within_flight",
+    "Scenario_Type",
+    "Autonomy_Config",
+    "Num_Tactical_Comms",
+    "Correct_Sort",
+    "Scenario_Start_Time",
+
+    # --- Aircraft State / Performance ---
+    "Num_CMs",
+    "Lead_Altitude_MSL_ft",
+    "Wingman_Altitude_MSL_ft",
+    "CM_Airspeed_kt",
+    "Lead_Altitude_Deviation_Count",
+    "Wingman_Altitude_Deviation_Count",
+    "Lead_Altitude_Deviation_Integrated_ft_s",
+    "Wingman_Altitude_Deviation_Integrated_ft_s",
+    "Lead_Time_Outside_Altitude_Block_s",
+    "Wingman_Time_Outside_Altitude_Block_s",
+    "Lead_Max_Altitude_Excursion_ft",
+    "Wingman_Max_Altitude_Excursion_ft",
+
+    # --- CM Engagement Summary ---
+    "Total_CMs_Intercepted",
+    "Proportion_CMs_Intercepted",
+]
+CM_FIELDS = ['EntId', 'Interceptor Role', 'Time_to_Intercept_s_from_start', 'MOP_Time_to_Intercept_s',
+             'MOP_Time_to_Consent_s', 'Airspeed_at_Intercept_kt', 'Airspeed_Diff_at_Intercept_kt',
+             'Heading_at_Intercept_deg', 'CM_Heading_at_Intercept_deg', 'Heading_Diff_at_Intercept_deg',
+             'Altitude_at_Intercept_ft', 'Altitude_Offset_at_Intercept_ft', 'Bank_Angle_at_Intercept_deg',
+             'Distance_from_CM_at_Intercept_nm', 'Aspect_at_MELD_Range_deg']
+for i in range(1, 6):
+    MOP_COLUMNS.extend([f'CM{i}_{field}' for field in CM_FIELDS])
+MOP_COLUMNS.extend(["Num_SAMs", "SAMs_Identified_by_Lead", "Proportion_SAMs_Identified"])
+for i in range(1, 11):
+    MOP_COLUMNS.extend([f'SAM{i}_EntId', f'SAM{i}_Time_to_ID_s'])
+MOP_COLUMNS.extend(["Scenario_End_Time", "Scenario_Duration_s"])
+
+# Columns the consolidated table does not carry
+CONSOLIDATED_DROP_COLUMNS = ['Scenario_Start_Time', 'Lead_Altitude_MSL_ft', 'Wingman_Altitude_MSL_ft', 'CM_Airspeed_kt',
+                             'Total_CMs_Intercepted', 'CM1_EntId', 'Num_SAMs', 'SAMs_Identified_by_Lead', 'Scenario_End_Time']
+for i in range(1, 6):
+    CONSOLIDATED_DROP_COLUMNS.extend([f'CM{i}_EntId', f'CM{i}_Airspeed_at_Intercept_kt',
+                                      f'CM{i}_Heading_at_Intercept_deg', f'CM{i}_CM_Heading_at_Intercept_deg',
+                                      f'CM{i}_Altitude_at_Intercept_ft', f'CM{i}_Bank_Angle_at_Intercept_deg',
+                                      f'SAM{i}_EntId'])
+for i in range(6, 11):
+    CONSOLIDATED_DROP_COLUMNS.extend([f'SAM{i}_EntId'])
+
+
+def flight_paths(lead_pilot, flight_number, root='.'):
+    """File paths of every table SHADOW reads for a sortie, keyed by table name."""
+    return {
+        'flight': os.path.join(root, 'Data', 'Lead', 'Lead_{}_{}.csv'.format(lead_pilot, flight_number)),
+        'lead_airspeed': os.path.join(root, 'Data', 'Lead', 'Lead_{}_{}_Airspeed.csv'.format(lead_pilot, flight_number)),
+        'wing_airspeed': os.path.join(root, 'Data', 'Wingman', 'Wing_{}_{}_Airspeed.csv'.format(lead_pilot, flight_number)),
+        'tasking': os.path.join(root, 'Data', 'Tasking', 'Tasking_{}_{}.csv'.format(lead_pilot, flight_number)),
+        'input': os.path.join(root, 'Inputs', 'Input_{}_{}.csv'.format(lead_pilot, flight_number)),
+    }
+
+
+def find_flights(root='.', pilots=None):
+    """
+    Find every Inputs/Input_<pilot>_<flight>.csv that has all of its matching Data/ files.
+    pilots: optional list of pilot names to restrict the search to
+    Returns (flights, skipped) where flights is a sorted list of (pilot, flight_number) tuples and skipped
+    maps each incomplete flight to the list of files it is missing.
+    """
+    flights = []
+    skipped = {}
+    for filename in sorted(os.listdir(os.path.join(root, 'Inputs'))):
+        match = re.fullmatch(r'Input_(.+)_(\d+)\.csv', filename)
+        if match is None:
+            continue
+        pilot, flight_number = match.group(1), match.group(2)
+        if pilots and pilot not in pilots:
+            continue
+        missing = [path for path in flight_paths(pilot, flight_number, root).values() if not os.path.exists(path)]
+        if missing:
+            skipped[(pilot, flight_number)] = missing
+        else:
+            flights.append((pilot, flight_number))
+    flights.sort(key=lambda flight: (flight[0], int(flight[1])))
+    return flights, skipped
+
+
+def consolidate_mops(mops_frames):
+    """
+    Build the consolidated campaign MOP table (SHADOW_MOPs.csv) from per-flight MOP DataFrames.
+    Adds Avg_SAM_ID_Time_s, drops the columns the campaign table does not carry and caps
+    Proportion_SAMs_Identified at 1.
+    """
+    MOP_df = pd.concat(list(mops_frames), ignore_index=True) if mops_frames else pd.DataFrame()
+    MOP_df = MOP_df.reindex(columns=MOP_COLUMNS + [col for col in MOP_df.columns if col not in MOP_COLUMNS]).copy()
+    # average of the SAM{1-10}_Time_to_ID_s entries that are present
+    MOP_df['Avg_SAM_ID_Time_s'] = MOP_df[[f'SAM{i}_Time_to_ID_s' for i in range(1, 11)]].apply(pd.to_numeric).mean(axis=1)
+    MOP_df = MOP_df.drop(columns=CONSOLIDATED_DROP_COLUMNS)
+    MOP_df['Proportion_SAMs_Identified'] = pd.to_numeric(MOP_df['Proportion_SAMs_Identified']).clip(upper=1)
+    return MOP_df
+
+
+def read_mops_csv(path_or_buffer):
+    """Read a MOP table back exactly as it was written (round-trip float parsing)."""
+    return pd.read_csv(path_or_buffer, float_precision='round_trip')
+
+
+def read_flight_mops(results_path='Output'):
+    """Read every per-flight MOPs_*.csv in results_path, in a stable (sorted) order."""
+    return [read_mops_csv(os.path.join(results_path, file)) for file in sorted(os.listdir(results_path))
+            if file.startswith('MOPs_') and file.endswith('.csv')]
+
+
+def merge_flight_mops(existing, updated):
+    """
+    Replace the rows of a per-flight MOP table whose Scenario_within_flight was re-reduced.
+    existing: the flight's MOP table as read from its CSV; updated: the re-reduced scenarios
+    Returns the combined table in scenario order.
+    """
+    # pass the new rows through CSV so both parts are written back in the same formats
+    updated = read_mops_csv(io.StringIO(updated.to_csv(index=False)))
+    kept = existing[~existing['Scenario_within_flight'].isin(updated['Scenario_within_flight'])]
+    merged = pd.concat([kept, updated], ignore_index=True)
+    return merged.sort_values('Scenario_within_flight', kind='stable').reset_index(drop=True)
+
+
+def update_consolidated(consolidated_path, flight_mops, results_path='Output'):
+    """
+    Update the consolidated MOP table in place for the flights that were re-reduced.
+    flight_mops: dict mapping (pilot, flight_number) to the flight's MOP table (as read back from its CSV)
+    Rows of those flights are swapped for freshly consolidated ones; every other row is kept as it is. Without an
+    existing table the whole campaign is consolidated from results_path.
+    Returns the updated table.
+    """
+    if not os.path.exists(consolidated_path):
+        return consolidate_mops(read_flight_mops(results_path))
+    MOP_df = read_mops_csv(consolidated_path)
+    if not flight_mops:
+        return MOP_df
+    rebuilt = MOP_df[['Lead_Pilot', 'Flight_Number']].astype(str).apply(tuple, axis=1).isin(
+        [(str(pilot), str(flight_number)) for pilot, flight_number in flight_mops])
+    MOP_df = pd.concat([MOP_df[~rebuilt.values], consolidate_mops(list(flight_mops.values()))], ignore_index=True)
+    # same row order as consolidating the sorted MOPs_*.csv files
+    file_order = MOP_df['Lead_Pilot'].astype(str) + '_Flight' + MOP_df['Flight_Number'].astype(str) + '.csv'
+    return MOP_df.iloc[file_order.argsort(kind='stable')].reset_index(drop=True)
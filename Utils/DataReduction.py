@@ -1,208 +1,415 @@
 # import data analysis libraries
 import numpy as np
 import pandas as pd
+from Utils.FlightIndex import ScenarioView
+from Utils.Kinematics import Kinematics, relative_geometry, nearest_rows
+from Utils.TaskingIndex import TaskingIndex
+from Utils.Telemetry import count_call
 pd.options.mode.chained_assignment = None
 
+# OPL Naming Convention - Black is AMBUSH51 (Lead), Blue is HAWK11 (Wingman); PBU site IDs used in the tasking PDUs
+ROLE_MARKINGS = {'Lead': 'AMBUSH51', 'Wingman': 'HAWK11'}
+ROLE_PBU_SITES = {'Lead': 48, 'Wingman': 73}
+# intercept definition: criteria distance and cone half-angles, MELD range, CM/aircraft sample matching tolerance and
+# the window after the CM is last seen in which a KILL from the interceptor's site is credited to it
+INTERCEPT_CRITERIA = {'distance_nm': 1.5, 'trailing_cone_deg': 30, 'nose_cone_deg': 30, 'meld_range_nm': 2.5,
+                      'match_tolerance_ms': 300, 'kill_window_s': 10}
+
+
 def convert_to_datetime(df, time_col):
-    """Convert time column to datetime objects."""
-    df[time_col] = pd.to_datetime(df[time_col])
+    """Convert time column to datetime objects (no-op if it already is one)."""
+    if not pd.api.types.is_datetime64_any_dtype(df[time_col]):
+        df[time_col] = pd.to_datetime(df[time_col])
     return df
 
-def brute_force_merge_airspeed(df, airspeed_df_lead, airspeed_df_wing):
+def nearest_time_join(df, sources, key_col='MarkingTxt', time_col='SampleTime', value_col='Calibrated_Airspeed',
+                      out_col='CalibratedAirspeed', max_gap=None):
     """
-    For each row in df, find the nearest SampleTime in the appropriate
-    airspeed dataframe (lead or wing) and copy over Calibrated_Airspeed.
-    Returns df with a new column 'CalibratedAirspeed'.
+    Nearest-time join of value_col from one or more source tables onto df. Inputs are:
+    df: DataFrame to receive the joined column (e.g. DIS entity state data)
+    sources: dict mapping a value of df[key_col] (e.g. 'AMBUSH51') to the source DataFrame for that entity
+    key_col: column in df used to route rows to a source table
+    time_col: time column present in df and in every source table
+    max_gap: optional maximum time difference (pd.Timedelta or seconds) - rows further than this from any source sample are left NaN
+    Each source is sorted once and every df row is matched by binary search, so the cost is O((N + M) log M)
+    instead of one full scan of the source table per row. Ties go to the earlier source sample.
+    Returns df sorted by time_col with the new column out_col.
     """
+    if max_gap is not None and not isinstance(max_gap, pd.Timedelta):
+        max_gap = pd.Timedelta(seconds=max_gap)
+
+    df = convert_to_datetime(df, time_col)
+    df = df.sort_values(time_col, kind='stable').reset_index(drop=True)
+    df_times = df[time_col].values.astype('datetime64[ns]').view('int64')
+    df_keys = df[key_col].values
+    joined = np.full(len(df), np.nan)
+
+    for key, source in sources.items():
+        rows = np.flatnonzero(df_keys == key)
+        if rows.size == 0 or source is None or source.empty:
+            continue
+        source = convert_to_datetime(source, time_col)
+        source = source[source[time_col].notna()].sort_values(time_col, kind='stable')
+        src_times = source[time_col].values.astype('datetime64[ns]').view('int64')
+        src_values = source[value_col].values.astype(float)
+        if src_times.size == 0:
+            continue
 
-    # Ensure datetime
-    df['SampleTime'] = pd.to_datetime(df['SampleTime'])
-    airspeed_df_lead['SampleTime'] = pd.to_datetime(airspeed_df_lead['SampleTime'])
-    airspeed_df_wing['SampleTime'] = pd.to_datetime(airspeed_df_wing['SampleTime'])
-
-    # Sort
-    df = df.sort_values('SampleTime').reset_index(drop=True)
-    airspeed_df_lead = airspeed_df_lead.sort_values('SampleTime').reset_index(drop=True)
-    airspeed_df_wing = airspeed_df_wing.sort_values('SampleTime').reset_index(drop=True)
-
-    # Add column
-    df['CalibratedAirspeed'] = np.nan
-
-    # --- Lead (AMBUSH51) ---
-    mask_lead = df['MarkingTxt'] == 'AMBUSH51'
-    for idx in df[mask_lead].index:
-        t = df.at[idx, 'SampleTime']
-        diffs = (airspeed_df_lead['SampleTime'] - t).abs()
-        nearest_idx = diffs.idxmin()
-        df.at[idx, 'CalibratedAirspeed'] = airspeed_df_lead.at[nearest_idx, 'Calibrated_Airspeed']
-
-    # --- Wingman (HAWK11) ---
-    mask_wing = df['MarkingTxt'] == 'HAWK11'
-    for idx in df[mask_wing].index:
-        t = df.at[idx, 'SampleTime']
-        diffs = (airspeed_df_wing['SampleTime'] - t).abs()
-        nearest_idx = diffs.idxmin()
-        df.at[idx, 'CalibratedAirspeed'] = airspeed_df_wing.at[nearest_idx, 'Calibrated_Airspeed']
+        t = df_times[rows]
+        pos = np.searchsorted(src_times, t, side='left')
+        right = np.minimum(pos, src_times.size - 1)
+        left = np.maximum(pos - 1, 0)
+        # prefer the earlier sample on ties, and the first of any duplicated source times
+        use_left = (pos > 0) & ((pos == src_times.size) | (t - src_times[left] <= src_times[right] - t))
+        nearest = np.where(use_left, np.searchsorted(src_times, src_times[left], side='left'), right)
+        values = src_values[nearest]
+        if max_gap is not None:
+            values = np.where(np.abs(src_times[nearest] - t) <= max_gap.value, values, np.nan)
+        joined[rows] = values
 
+    df[out_col] = joined
     return df
 
+def brute_force_merge_airspeed(df, airspeed_df_lead, airspeed_df_wing, max_gap=None):
+    """
+    For each row in df, find the nearest SampleTime in the appropriate
+    airspeed dataframe (lead or wing) and copy over Calibrated_Airspeed.
+    Kept under its original name; the matching is done by nearest_time_join.
+    Returns df with a new column 'CalibratedAirspeed'.
+    """
+    return nearest_time_join(df, {'AMBUSH51': airspeed_df_lead, 'HAWK11': airspeed_df_wing}, max_gap=max_gap)
+
     
 def altitude_deviation(df, role, assigned_alt, alt_block_radius=500):
     """
     Calculate altitude deviation from assigned altitude block. Inputs are:
     df: DataFrame containing scenario data
-    lead_alt: assigned altitude for lead in feet
-    wing_alt: assigned altitude for wingman in feet
-    alt_block_radius: radius of altitude block in feet (default ±1000ft)
+    role: 'Lead' or 'Wingman'
+    assigned_alt: assigned altitude for the role in feet
+    alt_block_radius: radius of altitude block in feet (default ±500ft)
+    Returns (number of excursions outside the block, altitude deviation integrated over time in ft*s).
     """
-    alt_col = 'Altitude'
-    if role == 'Lead':
-        marking = 'AMBUSH51'
-    elif role == 'Wingman':
-        marking = 'HAWK11'
-
-    # define a block of altitudes +- 1000ft from assigned altitude
-    block_min = assigned_alt - alt_block_radius
-    block_max = assigned_alt + alt_block_radius
-    
-    # count the number of times in df where df[df['MarkingTxt']==marking][alt_col] is outside the block
-    role_df = df[df['MarkingTxt'] == marking]
-    role_df['Outside_Altitude_Block'] = (role_df[alt_col] < block_min) | (role_df[alt_col] > block_max)
-    role_df['Block_Transition'] = role_df['Outside_Altitude_Block'].ne(role_df['Outside_Altitude_Block'].shift())
-    altitude_violations = role_df[role_df['Block_Transition'] & role_df['Outside_Altitude_Block']]
-    num_violations = altitude_violations.shape[0]
+    stats = altitude_compliance(df, {role: assigned_alt}, alt_block_radius)
+    return int(stats.loc[role, 'Violation_Count']), stats.loc[role, 'Integrated_ft_s']
+
+
+def altitude_compliance(df, assigned_alts, alt_block_radius=500):
+    """
+    Altitude-block compliance for several aircraft in one pass. Inputs are:
+    df: DataFrame containing scenario data, or a ScenarioView of it
+    assigned_alts: dict mapping role ('Lead'/'Wingman') to its assigned altitude in feet
+    alt_block_radius: radius of altitude block in feet
+    Returns a DataFrame indexed by role with the AltitudeBlockTracker statistics.
+    """
+    tracker = AltitudeBlockTracker(assigned_alts, alt_block_radius)
+    if isinstance(df, ScenarioView):
+        for role in tracker.roles:
+            role_df = df.marking(ROLE_MARKINGS[role])
+            tracker.update(role, role_df['Timestamp'].values, role_df['Altitude'].values)
+    else:
+        tracker.update_frame(df)
+    return tracker.totals()
+
+
+class AltitudeBlockTracker:
+    """
+    Running altitude-block compliance per aircraft. Samples can be fed all at once or in any number of time-ordered
+    batches (e.g. chunks of a stream or live PDUs); the totals are the same either way. For each role it keeps:
+    Violation_Count: number of excursions outside the block (a run of samples outside counts once)
+    Integrated_ft_s: distance outside the block times the time since the previous sample, summed
+    Time_Outside_s: time since the previous sample, summed over samples outside the block
+    Max_Excursion_ft: largest distance outside the block
+    """
+    STATS = ['Violation_Count', 'Integrated_ft_s', 'Time_Outside_s', 'Max_Excursion_ft']
+
+    def __init__(self, assigned_alts, alt_block_radius=500):
+        """assigned_alts maps role ('Lead'/'Wingman') to its assigned altitude in feet."""
+        self.roles = list(assigned_alts)
+        self._codes = {role: i for i, role in enumerate(self.roles)}
+        alts = np.array([assigned_alts[role] for role in self.roles], dtype=float)
+        self.block_min = alts - alt_block_radius
+        self.block_max = alts + alt_block_radius
+        n = len(self.roles)
+        self.violation_count = np.zeros(n, dtype=int)
+        self.integrated = np.zeros(n)
+        self.time_outside = np.zeros(n)
+        self.max_excursion = np.zeros(n)
+        # state carried to the next batch - time and block status of each role's last sample
+        self.last_time = np.zeros(n, dtype='int64')
+        self.has_last = np.zeros(n, dtype=bool)
+        self.last_outside = np.zeros(n, dtype=bool)
+
+    def update(self, roles, timestamps, altitudes):
+        """
+        Add samples. roles is one role name for the whole batch or one per sample; timestamps are datetime64 and
+        must be in time order within each role.
+        """
+        timestamps = np.asarray(timestamps).astype('datetime64[ns]').view('int64')
+        altitudes = np.asarray(altitudes, dtype=float)
+        if isinstance(roles, str):
+            codes = np.full(altitudes.size, self._codes[roles])
+        else:
+            codes = np.array([self._codes[role] for role in roles], dtype=int)
+        self._update_codes(codes, timestamps, altitudes)
+
+    def update_frame(self, df, alt_col='Altitude', time_col='Timestamp'):
+        """Add the rows of a DIS DataFrame whose MarkingTxt belongs to one of the tracked roles."""
+        marking_codes = {ROLE_MARKINGS[role]: code for role, code in self._codes.items()}
+        codes = df['MarkingTxt'].astype(object).map(marking_codes).values.astype(float)
+        rows = ~pd.isna(codes)
+        self._update_codes(codes[rows].astype(int), df[time_col].values[rows].astype('datetime64[ns]').view('int64'),
+                           df[alt_col].values[rows].astype(float))
 
-    # integrate the altitude deviation over time - sum the altitude deviation from block multiplied by the time in seconds
-    role_df['Altitude_Deviation'] = np.where(role_df[alt_col] < block_min, block_min - role_df[alt_col],
-                                            np.where(role_df[alt_col] > block_max, role_df[alt_col] - block_max, 0))
-    role_df['Time_Diff'] = role_df['Timestamp'].diff().dt.total_seconds().fillna(0)
-    altitude_deviation_integral = (role_df['Altitude_Deviation'] * role_df['Time_Diff']).sum()
+    def _update_codes(self, codes, times, altitudes):
+        """Vectorized update over every role at once; rows are grouped by role keeping their order."""
+        if codes.size == 0:
+            return
+        order = np.argsort(codes, kind='stable')
+        codes, times, altitudes = codes[order], times[order], altitudes[order]
+        first = np.r_[True, codes[1:] != codes[:-1]]
 
-    return num_violations, altitude_deviation_integral
+        block_min, block_max = self.block_min[codes], self.block_max[codes]
+        outside = (altitudes < block_min) | (altitudes > block_max)
+        deviation = np.fmax(block_min - altitudes, 0) + np.fmax(altitudes - block_max, 0)
+
+        # previous sample of each row - within the batch, or the role's last sample from earlier batches
+        prev_outside = np.r_[False, outside[:-1]]
+        prev_outside[first] = self.last_outside[codes[first]]
+        time_diff = np.r_[0.0, np.diff(times) / 1e9]
+        time_diff[first] = np.where(self.has_last[codes[first]], (times[first] - self.last_time[codes[first]]) / 1e9, 0.0)
+
+        n = len(self.roles)
+        self.violation_count += np.bincount(codes, weights=outside & ~prev_outside, minlength=n).astype(int)
+        self.integrated += np.bincount(codes, weights=deviation * time_diff, minlength=n)
+        self.time_outside += np.bincount(codes, weights=outside * time_diff, minlength=n)
+        starts = np.flatnonzero(first)
+        present = codes[starts]
+        self.max_excursion[present] = np.fmax(self.max_excursion[present], np.maximum.reduceat(deviation, starts))
+
+        last = np.r_[starts[1:], codes.size] - 1
+        self.last_time[present] = times[last]
+        self.has_last[present] = True
+        self.last_outside[present] = outside[last]
+
+    def totals(self):
+        """Current statistics as a DataFrame indexed by role."""
+        return pd.DataFrame({'Violation_Count': self.violation_count, 'Integrated_ft_s': self.integrated,
+                             'Time_Outside_s': self.time_outside, 'Max_Excursion_ft': self.max_excursion},
+                            index=pd.Index(self.roles, name='Role'))
 
 
 def is_within_cone(scenario_data, cm_index, role, scenario_alt, pbu_data, previous_int_time=None, pilot='', flight_num='', scenario='', config=''):
     """
-    Determine if an aircraft (lead/wingman) is within intercept criteria:
-      1) Bank angle within ±10°
-      2) Within 1.5 nm aft of CM
-      3) Within 30° trailing cone of CM velocity vector
-      4) Heading within ±20° of CM heading
+    Determine if an aircraft (lead/wingman) meets the intercept criteria on a CM (thresholds in INTERCEPT_CRITERIA):
+      1) Within distance_nm (1.5 nm) of the CM
+      2) Inside the CM's trailing cone (trailing_cone_deg, 30°) by position
+      3) Inside the aircraft's nose cone (nose_cone_deg, 30°) by position
+    and score the intercept at the kill (evaluate_intercept, then finalize_intercept).
     Inputs:
-    df: DataFrame containing scenario data
+    scenario_data: DataFrame of the scenario's DIS rows
     cm_index: index of the CM being intercepted
     role: 'Lead' or 'Wingman'
-    Returns a boolean Series indicating if the aircraft meets all criteria for a given timestamp and cm.
+    previous_int_time: time of this role's previous intercept, which bounds the start of the MELD lookback
+    Returns the intercept event dict, or None if the intercept criteria are never met.
     """
+    count_call('is_within_cone')
+    return finalize_intercept(evaluate_intercept(scenario_data, cm_index, role, scenario_alt, pbu_data), previous_int_time)
 
-    # for every entry in scenario_data['EntId']==cm_index, get the nearest entry in scenario_data['MarkingTxt']==role
-    if role == 'Lead':
-        marking = 'AMBUSH51'
-        pbu_id = 48
-    elif role == 'Wingman':
-        marking = 'HAWK11'
-        pbu_id = 73
-
-
-    df_cm = scenario_data[scenario_data['EntId'] == cm_index].copy()
-    df_ac = scenario_data[scenario_data['MarkingTxt'] == marking].copy()
-    # df = pd.merge_asof(df_ac.sort_values('Timestamp'), df_cm.sort_values('Timestamp'), on='Timestamp', suffixes=('_ac', '_cm'),
-    #                    tolerance=pd.Timedelta("1ms"),  direction='nearest')
-    df = pd.merge_asof(
-    df_cm.sort_values('Timestamp'), 
-    df_ac.sort_values('Timestamp'),   
-    on='Timestamp',
-    suffixes=('_cm', '_ac'),
-    tolerance=pd.Timedelta("300ms"),
-    direction='nearest'
-) # this merge limits data, but is necessary to avoid cm time slippage
-
-    df = df.dropna(subset=['EntId_cm'])  # drop rows where no matching CM data
-    if df.empty:
-        return pd.Series([False]*len(scenario_data), index=scenario_data.index)
 
-    # relevant columns
-    lat_col = 'Latitude_ac'
-    lon_col = 'Longitude_ac'
-    alt_col = 'Altitude_ac'
-    heading_col = 'Heading_ac'
-    cm_lat_col = 'Latitude_cm'
-    cm_lon_col = 'Longitude_cm'
-    cm_alt_col = 'Altitude_cm'
-    cm_heading_col = 'Heading_cm'
-    bank_col = 'Roll_ac'
+def cone_geometry(ac_lat, ac_lon, cm_lat, cm_lon, ac_pos, cm_pos, ac_vel, cm_vel):
+    """
+    Relative CM/aircraft geometry for any number of aligned samples. Inputs are 1-D lat/lon arrays (deg) and
+    (n, 3) ECEF position (m) and velocity (m/s) arrays for the aircraft and the CM.
+    Returns the dict of arrays of Utils.Kinematics.relative_geometry: distance_nm, angle_between_vel,
+    angle_between_pos (trailing cone) and angle_between_pos_nose (nose cone).
+    """
+    return relative_geometry(Kinematics(ac_lat, ac_lon, ac_pos, ac_vel), Kinematics(cm_lat, cm_lon, cm_pos, cm_vel))
 
-    # get the scenario start time
-    scenario_data['SampleTime'] = pd.to_datetime(scenario_data['SampleTime']) 
-    pbu_data['SampleTime'] = pd.to_datetime(pbu_data['SampleTime'])  
-    scenario_start_time = scenario_data['SampleTime'].min()
 
-    # get the SampleTime where the cm_index is last seen
-    cm_last_time = df_cm['SampleTime'].max()
+def intercept_geometry(scenario_data, cm_ids, roles=('Lead', 'Wingman'), criteria=None):
+    """
+    Intercept criteria for every (CM, role) pair of a scenario in one pass. Inputs are:
+    scenario_data: DataFrame containing scenario data, or a ScenarioView of it
+    cm_ids: EntIds of the CMs to evaluate
+    roles: interceptor roles to align the CM tracks against
+    criteria: optional overrides of INTERCEPT_CRITERIA (see intercept_thresholds)
+    All CM rows are aligned to each aircraft track with a single time-sorted merge_asof per role (each CM sample
+    still takes its own nearest aircraft sample, exactly as a per-CM merge would), then the distance, trailing-cone
+    and nose-cone criteria are evaluated as one array operation over every pair.
+    A ScenarioView with kinematics is paired by row position instead: the merge only matches timestamps, and the
+    geometry is read from the flight's shared Kinematics arrays (see view_pairs).
+    Returns a long-form DataFrame with one row per CM sample per role: 'Role', the merged _cm/_ac columns,
+    the geometry columns and the boolean condition columns including 'Intercept_Criteria'.
+    """
+    count_call('intercept_geometry')
+    criteria = intercept_thresholds(criteria)
+    if isinstance(scenario_data, ScenarioView) and scenario_data.kinematics is not None:
+        return view_intercept_geometry(scenario_data, cm_ids, roles, criteria)
+
+    # for every entry in scenario_data['EntId'] in cm_ids, get the nearest entry in scenario_data['MarkingTxt']==role
+    if isinstance(scenario_data, ScenarioView):
+        df_cm = scenario_data.rows(cm_ids)
+    else:
+        df_cm = scenario_data[scenario_data['EntId'].isin(list(cm_ids))]
+    df_cm = df_cm.sort_values('Timestamp', kind='stable')
+    tables = []
+    for role in roles:
+        if isinstance(scenario_data, ScenarioView):
+            df_ac = scenario_data.marking(ROLE_MARKINGS[role])
+        else:
+            df_ac = scenario_data[scenario_data['MarkingTxt'] == ROLE_MARKINGS[role]]
+        df_ac = df_ac.sort_values('Timestamp', kind='stable')
+        df = pd.merge_asof(
+            df_cm,
+            df_ac,
+            on='Timestamp',
+            suffixes=('_cm', '_ac'),
+            tolerance=pd.Timedelta(milliseconds=criteria['match_tolerance_ms']),
+            direction='nearest'
+        ) # this merge limits data, but is necessary to avoid cm time slippage
+        df.insert(0, 'Role', role)
+        tables.append(df)
+    df = pd.concat(tables, ignore_index=True)
 
     # --- CONDITION NO LONGER USED!!: Bank Angle ---
-    cond_bank = df[bank_col].abs() <= 10
-    df['Bank_Angle_Condition'] = cond_bank
-    
+    df['Bank_Angle_Condition'] = df['Roll_ac'].abs() <= 10
+
+    geometry = pair_geometry(df)
+
+    conditions = intercept_conditions(geometry, criteria)
+    for col in ['distance_nm', 'angle_between_vel', 'angle_between_pos', 'angle_between_pos_nose']:
+        df[col] = geometry[col]
+    for col in ['Distance_Condition', 'Cone_Condition', 'Nose_Cone_Condition', 'Intercept_Criteria']:
+        df[col] = conditions[col]
+    return df
+
+
+def view_pairs(view, cm_ids, role, tolerance_ms=INTERCEPT_CRITERIA['match_tolerance_ms']):
+    """
+    Row positions in view.data of the CM samples (time-sorted) and of the aircraft sample each one is paired with,
+    chosen exactly as the merge_asof in intercept_geometry (nearest Timestamp within tolerance_ms, see nearest_rows).
+    Unmatched CM samples are paired with -1.
+    """
+    times = view.data['Timestamp'].values.astype('datetime64[ns]').view('int64')
+    cm_rows = view.positions(cm_ids)
+    cm_rows = cm_rows[np.argsort(times[cm_rows], kind='stable')]
+    ac_rows = view.positions(marking=ROLE_MARKINGS[role])
+    ac_rows = ac_rows[np.argsort(times[ac_rows], kind='stable')]
+    matched = nearest_rows(times[ac_rows], times[cm_rows], pd.Timedelta(milliseconds=tolerance_ms).value)
+    return cm_rows, np.where(matched >= 0, ac_rows[np.maximum(matched, 0)] if len(ac_rows) else -1, -1)
+
+
+def view_intercept_geometry(view, cm_ids, roles=('Lead', 'Wingman'), criteria=None):
+    """intercept_geometry for a ScenarioView with kinematics: same table, geometry from the shared arrays."""
+    data = view.data.reset_index(drop=True)
+    ac_data = data.drop(columns='Timestamp')
+    cm_cols = [col if col == 'Timestamp' else col + '_cm' for col in data.columns]
+    ac_cols = [col + '_ac' for col in ac_data.columns]
+    tables, geometries = [], []
+    for role in roles:
+        cm_rows, ac_rows = view_pairs(view, cm_ids, role, intercept_thresholds(criteria)['match_tolerance_ms'])
+        df_cm = data.take(cm_rows).set_axis(cm_cols, axis=1).reset_index(drop=True)
+        # unmatched CM samples get missing aircraft columns, as they do from the merge
+        df_ac = ac_data.take(ac_rows) if (ac_rows >= 0).all() else ac_data.reindex(ac_rows)
+        df_ac = df_ac.set_axis(ac_cols, axis=1).reset_index(drop=True)
+        df = pd.concat([df_cm, df_ac], axis=1)
+        df.insert(0, 'Role', role)
+        tables.append(df)
+        geometries.append(relative_geometry(view.kinematics.take(ac_rows), view.kinematics.take(cm_rows)))
+    df = pd.concat(tables, ignore_index=True)
+
+    # --- CONDITION NO LONGER USED!!: Bank Angle ---
+    df['Bank_Angle_Condition'] = df['Roll_ac'].abs() <= 10
+
+    geometry = {col: np.concatenate([g[col] for g in geometries]) for col in geometries[0]}
+    conditions = intercept_conditions(geometry, criteria)
+    for col in ['distance_nm', 'angle_between_vel', 'angle_between_pos', 'angle_between_pos_nose']:
+        df[col] = geometry[col]
+    for col in ['Distance_Condition', 'Cone_Condition', 'Nose_Cone_Condition', 'Intercept_Criteria']:
+        df[col] = conditions[col]
+    return df
+
+
+def pair_geometry(df):
+    """cone_geometry for a table of merged CM/aircraft samples (columns suffixed _cm and _ac)."""
+    return cone_geometry(
+        df['Latitude_ac'].values, df['Longitude_ac'].values, df['Latitude_cm'].values, df['Longitude_cm'].values,
+        df[['ECEF_X_ac', 'ECEF_Y_ac', 'ECEF_Z_ac']].values, df[['ECEF_X_cm', 'ECEF_Y_cm', 'ECEF_Z_cm']].values,
+        df[['LinVelX_ac', 'LinVelY_ac', 'LinVelZ_ac']].values, df[['LinVelX_cm', 'LinVelY_cm', 'LinVelZ_cm']].values)
+
+
+def intercept_thresholds(criteria=None):
+    """INTERCEPT_CRITERIA with any of its thresholds overridden by the criteria dict."""
+    if not criteria:
+        return INTERCEPT_CRITERIA
+    unknown = set(criteria) - set(INTERCEPT_CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown intercept criteria: {sorted(unknown)}")
+    return dict(INTERCEPT_CRITERIA, **criteria)
+
+
+def intercept_conditions(geometry, criteria=None):
+    """
+    Intercept criteria from cone_geometry output. Returns a dict of boolean arrays: Distance_Condition,
+    Cone_Condition, Nose_Cone_Condition and Intercept_Criteria (all three met).
+    criteria: optional overrides of the INTERCEPT_CRITERIA thresholds
+    """
+    criteria = intercept_thresholds(criteria)
     # --- CONDITION 1: Aft + Distance ---
-    # Flat-earth approximation in nautical miles
-    dlat = (df[lat_col] - df[cm_lat_col]) * 60.0    # nm
-    dlon = (df[lon_col] - df[cm_lon_col]) * 60.0 * np.cos(np.radians(df[cm_lat_col]))
-    # Distance between aircraft and CM
-    df['distance_nm'] = np.sqrt(dlat**2 + dlon**2)
-    cond1 = df['distance_nm'] <= 1.5
-    df['Distance_Condition'] = cond1
-    
-    # --- CONDITION NOT USED - NICE TO HAVE: Inside trailing cone VELOCITY ---
-    vel_vector_cm = np.column_stack([df['LinVelX_cm'], df['LinVelY_cm'], df['LinVelZ_cm']])
-    vel_vector_ac = np.column_stack([df['LinVelX_ac'], df['LinVelY_ac'], df['LinVelZ_ac']])
-    dot = np.sum(vel_vector_cm * vel_vector_ac, axis=1)
-    angle_between_vec = np.degrees(np.arccos(np.clip(dot / (np.linalg.norm(vel_vector_cm, axis=1) * np.linalg.norm(vel_vector_ac, axis=1)), -1, 1)))
-    df['angle_between_vel'] = angle_between_vec
-    cond_vel = angle_between_vec <= 30
- 
+    distance_condition = geometry['distance_nm'] <= criteria['distance_nm']
+    # --- CONDITION NOT USED - NICE TO HAVE: Inside trailing cone VELOCITY (angle_between_vel) ---
     # --- CONDITION 2: Inside trailing cone POSITION ---
-    pos_vector_ac = np.column_stack([df['ECEF_X_ac'], df['ECEF_Y_ac'], df['ECEF_Z_ac']])
-    pos_vector_cm = np.column_stack([df['ECEF_X_cm'], df['ECEF_Y_cm'], df['ECEF_Z_cm']])
-    rel_pos = pos_vector_cm - pos_vector_ac
-    dot = np.sum(rel_pos * vel_vector_cm, axis=1)
-    angle_between_pos = np.degrees(np.arccos(np.clip(dot / (np.linalg.norm(rel_pos, axis=1) * np.linalg.norm(vel_vector_cm, axis=1)), -1, 1)))
-    df['angle_between_pos'] = angle_between_pos
-    cond2 = angle_between_pos <= 30
-    df['Cone_Condition'] = cond2
-
+    cone_condition = geometry['angle_between_pos'] <= criteria['trailing_cone_deg']
     # --- CONDITION 3: Inside nose cone POSITION ---
-    dot = np.sum(rel_pos * vel_vector_ac, axis=1)
-    angle_between_pos_nose = np.degrees(np.arccos(np.clip(dot / (np.linalg.norm(rel_pos, axis=1) * np.linalg.norm(vel_vector_ac, axis=1)), -1, 1)))
-    df['angle_between_pos_nose'] = angle_between_pos_nose
-    cond3 = angle_between_pos_nose <= 30
-    df['Nose_Cone_Condition'] = cond3
+    nose_cone_condition = geometry['angle_between_pos_nose'] <= criteria['nose_cone_deg']
+    return {'Distance_Condition': distance_condition, 'Cone_Condition': cone_condition,
+            'Nose_Cone_Condition': nose_cone_condition,
+            'Intercept_Criteria': distance_condition & cone_condition & nose_cone_condition}
 
-    intercept_criteria = cond1 & cond2 & cond3
-    df['Intercept_Criteria'] = intercept_criteria
+
+def evaluate_intercept(scenario_data, cm_index, role, scenario_alt, pbu_data):
+    """
+    The part of is_within_cone that does not depend on earlier intercepts: merge the CM and aircraft tracks,
+    apply the intercept criteria, resolve the kill time and record the aircraft state at the kill.
+    Returns a dict for finalize_intercept, or None if the intercept criteria are never met.
+    """
+    convert_to_datetime(scenario_data, 'SampleTime')
+    df = intercept_geometry(scenario_data, [cm_index], roles=[role])
+    if df.empty:
+        return None
+    return score_intercept(df, cm_index, role, scenario_alt, pbu_data, scenario_data['SampleTime'].min())
+
+
+def score_intercept(df, cm_index, role, scenario_alt, pbu_data, scenario_start_time, criteria=None):
+    """
+    Score one CM/role pair from its rows of the intercept_geometry table. Inputs are:
+    df: intercept_geometry rows for this CM and role, in time order
+    scenario_alt: assigned altitude of the interceptor (ft)
+    pbu_data: tasking PDUs, used to find the kill time (a TaskingIndex, or the tasking table to index)
+    scenario_start_time: first SampleTime of the scenario
+    criteria: optional overrides of INTERCEPT_CRITERIA (the MELD range and kill window are used here)
+    Returns a dict for finalize_intercept, or None if the intercept criteria are never met.
+    """
+    count_call('score_intercept')
+    criteria = intercept_thresholds(criteria)
+    pbu_id = ROLE_PBU_SITES[role]
+
+    # relevant columns
+    alt_col = 'Altitude_ac'
+    heading_col = 'Heading_ac'
+    cm_heading_col = 'Heading_cm'
+    bank_col = 'Roll_ac'
+
+    # get the SampleTime where the cm_index is last seen
+    cm_last_time = df['SampleTime_cm'].max()
+    intercept_criteria = df['Intercept_Criteria']
 
     if intercept_criteria.any():
         # --- SCENARIO META DATA --- WE now score the intercept at the time of kill, not the time of intercept criteria met ---
-        # 3 cases
-        pbu_kill_data = pbu_data[pbu_data['PduType'] == 'KILL']
-        # case 1 - FiringEntityID_Site matches pbu_id and TargetEntityID_Entity matches cm_index
-        if pbu_kill_data[(pbu_kill_data['FiringEntityID_Site']==pbu_id) & (pbu_kill_data['TargetEntityID_Entity']==cm_index)].shape[0] > 0:
-            cm_kill_time = pbu_kill_data[(pbu_kill_data['FiringEntityID_Site']==pbu_id) & (pbu_kill_data['TargetEntityID_Entity']==cm_index)]['SampleTime'].min()
-            cm_kill_time = pd.to_datetime(cm_kill_time)
-        # case 2 - FiringEntityID_Site matches pbu_id, but there is no TargetEntityID_Entity match
-        elif pbu_kill_data[(pbu_kill_data['FiringEntityID_Site']==pbu_id)].shape[0] > 0:
-            # find the closest SampleTime in pbu_kill_data to cm_last_time where FiringEntityID_Site matches pbu_id
-            kill_times = pbu_kill_data[pbu_kill_data['FiringEntityID_Site']==pbu_id]['SampleTime']
-            kill_times = pd.to_datetime(kill_times)
-            diffs = (kill_times - cm_last_time).abs()
-            nearest_idx = diffs.idxmin()
-            cm_kill_time_potential = kill_times.loc[nearest_idx]
-            if (cm_kill_time_potential - cm_last_time).total_seconds() <= 10: # make sure the kill time is within 10 seconds of last seen time
-                cm_kill_time = cm_kill_time_potential
-            else:
-                cm_kill_time = cm_last_time
-        else:
-            cm_kill_time = cm_last_time
+        # 3 cases (see TaskingIndex.kill_time): a KILL from pbu_id targeting cm_index, else the nearest KILL from pbu_id
+        # within the kill window (10 s) of the CM last being seen, else the time the CM was last seen
+        tasking_index = pbu_data if isinstance(pbu_data, TaskingIndex) else TaskingIndex(pbu_data)
+        cm_kill_time = tasking_index.kill_time(pbu_id, cm_index, cm_last_time, criteria['kill_window_s'])
         
         # instead, define the intercept parameters at the time of kill
         df_at_kill = df[df['SampleTime_ac'] <= cm_kill_time]
@@ -234,28 +441,10 @@ def is_within_cone(scenario_data, cm_index, role, scenario_alt, pbu_data, previo
                 cm_int_time = cm_kill_time
 
     
-        # Define MELD range
-        meld_range = 2.5
-
-        # process the meld range in the lookback_df
-        lookback_df = df.copy() 
-        lookback_df['In_Meld_Range'] = lookback_df['distance_nm'] <= meld_range
-        if previous_int_time is not None:
-            previous_int_time = pd.to_datetime(previous_int_time)
-            meld_transition_time = lookback_df[lookback_df['In_Meld_Range']]['SampleTime_ac'].min()
-            meld_transition_time = max(meld_transition_time, previous_int_time)
-        elif previous_int_time is None:
-            meld_transition_time = lookback_df[lookback_df['In_Meld_Range']]['SampleTime_ac'].min()
-
-        MOP_time_to_intercept = (cm_kill_time - meld_transition_time).total_seconds()
-        aspect_angle_at_meld = lookback_df.iloc[(lookback_df['SampleTime_ac'] - meld_transition_time).abs().argsort()[:1]]['angle_between_vel'].values[0] # to make it closest
-        # aspect_angle_at_meld = lookback_df[lookback_df['SampleTime_ac'] == meld_transition_time]['angle_between_vel'].values[0] 
-        aspect_angle_at_meld = np.abs((aspect_angle_at_meld + 180) % 360 - 180) # set to 180°
+        # the MELD range entry does not depend on earlier intercepts - finalize_intercept bounds it by previous_int_time
+        meld_range = criteria['meld_range_nm']
+        meld_entry_time = df[df['distance_nm'] <= meld_range]['SampleTime_ac'].min()
 
-        # save df to 'CM_Intercept_Data/pilot_flightnum_role_cmindex.csv'
-        # if pilot != '' and flight_num != '':
-        #     df.to_csv(f'CM_Intercept_Data/{pilot}_{flight_num}_{config}_{scenario}_{role}_CM{cm_index}.csv', index=False)
-        
         # define a dictionary that records the intercept event
         intercept_event = {
             'Interceptor Role': role,
@@ -273,9 +462,98 @@ def is_within_cone(scenario_data, cm_index, role, scenario_alt, pbu_data, previo
             'Bank_Angle_at_Intercept_deg': bank_angle_at_intercept,
             'Distance_from_CM_at_Intercept_nm': distance_from_cm_at_intercept,
             'CM_Kill_Time': cm_kill_time,
-            'MOP_Time_to_Intercept_s': MOP_time_to_intercept,
-            'Aspect_Angle_at_MELD_Entry_deg': aspect_angle_at_meld,
-            'CM_Int_Time': cm_int_time
+            'CM_Int_Time': cm_int_time,
+            'MELD_Entry_Time': meld_entry_time,
+            # lookback arrays used to find the aspect angle at the (possibly delayed) MELD transition
+            'Lookback_Time': df['SampleTime_ac'].values,
+            'Lookback_Aspect': df['angle_between_vel'].values,
         }
 
         return intercept_event
+
+
+def finalize_intercept(intercept_event, previous_int_time=None):
+    """
+    Complete an evaluate_intercept result with the MOPs that depend on the role's previous intercept:
+    the MELD transition time, MOP time to intercept and aspect angle at MELD entry.
+    Returns a new intercept event dict (or None if intercept_event is None).
+    """
+    if intercept_event is None:
+        return None
+
+    meld_transition_time = intercept_event['MELD_Entry_Time']
+    if previous_int_time is not None:
+        meld_transition_time = max(meld_transition_time, pd.to_datetime(previous_int_time))
+
+    MOP_time_to_intercept = (intercept_event['CM_Kill_Time'] - meld_transition_time).total_seconds()
+    if pd.isna(meld_transition_time):
+        # never inside the MELD range (only possible with a MELD range below the intercept distance)
+        aspect_angle_at_meld = np.nan
+    else:
+        lookback_time = intercept_event['Lookback_Time']
+        closest = np.argmin(np.abs(lookback_time - np.datetime64(meld_transition_time))) # to make it closest
+        aspect_angle_at_meld = intercept_event['Lookback_Aspect'][closest]
+        aspect_angle_at_meld = np.abs((aspect_angle_at_meld + 180) % 360 - 180) # set to 180°
+
+    event = {key: value for key, value in intercept_event.items()
+             if key not in ('MELD_Entry_Time', 'Lookback_Time', 'Lookback_Aspect')}
+    event['MOP_Time_to_Intercept_s'] = MOP_time_to_intercept
+    event['Aspect_Angle_at_MELD_Entry_deg'] = aspect_angle_at_meld
+    return event
+
+
+class ScenarioIntercepts:
+    """
+    Per-scenario intercept evaluation. The intercept_geometry table for every CM and both roles is built once
+    when the object is created; each CM/role pair is then scored from its slice of that table at most once, and
+    only the MELD / time-to-intercept part that depends on the previous intercept is recomputed when the CMs
+    are sequenced.
+    """
+
+    def __init__(self, scenario_data, pbu_data, scenario_alts, cm_ids=None, criteria=None):
+        """
+        scenario_data is the scenario DataFrame or a ScenarioView of it.
+        pbu_data is the sortie's TaskingIndex (or its tasking table, indexed here).
+        scenario_alts maps role ('Lead'/'Wingman') to the assigned altitude used for altitude offsets.
+        cm_ids defaults to every JASSM EntId in the scenario.
+        criteria optionally overrides the INTERCEPT_CRITERIA thresholds.
+        """
+        if isinstance(scenario_data, ScenarioView):
+            if cm_ids is None:
+                cm_ids = scenario_data.entity_ids('JASSM')
+            self.scenario_start_time = scenario_data.start_time
+        else:
+            convert_to_datetime(scenario_data, 'SampleTime')
+            if cm_ids is None:
+                cm_ids = scenario_data[scenario_data['MarkingTxt'] == 'JASSM']['EntId'].unique()
+            self.scenario_start_time = scenario_data['SampleTime'].min()
+        self.pbu_data = pbu_data if isinstance(pbu_data, TaskingIndex) else TaskingIndex(pbu_data)
+        self.scenario_alts = scenario_alts
+        self.criteria = intercept_thresholds(criteria)
+        self.table = intercept_geometry(scenario_data, cm_ids, roles=list(scenario_alts), criteria=self.criteria)
+        self._rows = self.table.groupby(['EntId_cm', 'Role'], sort=False).indices
+        self._met = self.table.groupby(['EntId_cm', 'Role'], sort=False)['Intercept_Criteria'].any()
+        self._cache = {}
+
+    def evaluate(self, cm_index, role):
+        """Cached score_intercept result for this CM and role (None if no intercept)."""
+        key = (cm_index, role)
+        if key not in self._cache:
+            if key in self._rows and self._met[key]:
+                self._cache[key] = score_intercept(self.table.iloc[self._rows[key]], cm_index, role,
+                                                   self.scenario_alts[role], self.pbu_data, self.scenario_start_time,
+                                                   self.criteria)
+            else:
+                self._cache[key] = None
+        return self._cache[key]
+
+    def interceptor_role(self, cm_index):
+        """Role credited with the intercept of this CM - the Lead takes precedence - or None if not intercepted."""
+        for role in ['Lead', 'Wingman']:
+            if self.evaluate(cm_index, role) is not None:
+                return role
+        return None
+
+    def event(self, cm_index, role, previous_int_time=None):
+        """Full intercept event for this CM and role, given the role's previous intercept time."""
+        return finalize_intercept(self.evaluate(cm_index, role), previous_int_time)
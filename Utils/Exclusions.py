@@ -0,0 +1,84 @@
+# import libraries
+import os
+import numpy as np
+import pandas as pd
+
+EXCLUSION_COLUMNS = ['Start_Time', 'End_Time', 'Reason']
+NS_PER_DAY = 24 * 3600 * 10**9
+
+
+def exclusions_path(lead_pilot, flight_number, root='.'):
+    """Exclusion-window manifest of a sortie: Inputs/Exclusions_<pilot>_<flight>.csv."""
+    return os.path.join(root, 'Inputs', 'Exclusions_{}_{}.csv'.format(lead_pilot, flight_number))
+
+
+def read_exclusions(path):
+    """
+    Read an exclusion-window manifest. Each row is a window of SampleTime to drop: Start_Time and End_Time as
+    times of day (HH:MM:SS[.fff], Zulu as in the Data files, both ends included) and a free-text Reason.
+    Returns the table, or an empty one if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=EXCLUSION_COLUMNS)
+    return pd.read_csv(path, dtype={'Start_Time': str, 'End_Time': str, 'Reason': str}, keep_default_na=False)
+
+
+def exclusion_windows(exclusions):
+    """
+    Merge the rows of an exclusion table into sorted, non-overlapping (start, end) arrays of ns since midnight.
+    A window whose end is before its start is taken to run over midnight and is split in two.
+    """
+    starts = pd.to_timedelta(exclusions['Start_Time']).values.astype('timedelta64[ns]').view('int64')
+    ends = pd.to_timedelta(exclusions['End_Time']).values.astype('timedelta64[ns]').view('int64')
+    wraps = ends < starts
+    starts = np.concatenate([starts, np.zeros(wraps.sum(), dtype='int64')])
+    ends = np.concatenate([np.where(wraps, NS_PER_DAY - 1, ends), ends[wraps]])
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    # merge overlapping windows so every time falls in at most one
+    merged_starts, merged_ends = [], []
+    for start, end in zip(starts, ends):
+        if merged_ends and start <= merged_ends[-1]:
+            merged_ends[-1] = max(merged_ends[-1], end)
+        else:
+            merged_starts.append(start)
+            merged_ends.append(end)
+    return np.array(merged_starts, dtype='int64'), np.array(merged_ends, dtype='int64')
+
+
+def load_exclusions(lead_pilot, flight_number, root='.'):
+    """Merged exclusion windows of a sortie (see exclusion_windows); empty arrays if it has no manifest."""
+    return exclusion_windows(read_exclusions(exclusions_path(lead_pilot, flight_number, root)))
+
+
+def exclusion_mask(times, windows):
+    """
+    Boolean mask of the times (datetime64 values) that fall inside any window. One binary search per sample
+    against the sorted window starts, so the cost does not grow with the number of windows. NaT is never excluded.
+    """
+    starts, ends = windows
+    times = np.asarray(times).astype('datetime64[ns]')
+    if starts.size == 0 or times.size == 0:
+        return np.zeros(times.shape, dtype=bool)
+    time_of_day = (times - times.astype('datetime64[D]')).view('int64')
+    window = np.searchsorted(starts, time_of_day, side='right') - 1
+    inside = (window >= 0) & (time_of_day <= ends[np.maximum(window, 0)])
+    return inside & ~np.isnat(times)
+
+
+def apply_exclusions(df, windows, time_col='SampleTime'):
+    """Rows of df outside every exclusion window (df itself when there is nothing to drop)."""
+    mask = exclusion_mask(df[time_col].values, windows)
+    if not mask.any():
+        return df
+    return df[~mask]
+
+
+def add_exclusion(lead_pilot, flight_number, start_time, end_time, reason='', root='.'):
+    """Append a window to a sortie's exclusion manifest (created if needed). Returns the updated table."""
+    path = exclusions_path(lead_pilot, flight_number, root)
+    exclusions = read_exclusions(path)
+    row = pd.DataFrame([{'Start_Time': start_time, 'End_Time': end_time, 'Reason': reason}])
+    exclusions = pd.concat([exclusions, row], ignore_index=True) if len(exclusions) else row
+    exclusions.to_csv(path, index=False)
+    return exclusions
@@ -0,0 +1,234 @@
+"""
+Cached, parallel figure builds for the trust and MOP plots that Plot_Trust.ipynb and Output_to_MOPs.ipynb used to
+draw one at a time on every run. A figure is described by a spec: its output path, a renderer (RENDERERS), the slice
+of data it draws and its style parameters. The figure's key is a SHA-1 over the data slice, the style, the renderer
+and this module's source, and build_figures only renders the figures whose key differs from the one recorded in the
+figure manifest (or whose file is gone). The stale figures are rendered across a process pool with matplotlib's
+non-interactive Agg backend. matplotlib is only imported in the processes that render.
+
+Example:
+    specs = trust_timeline_specs('.') + mop_figure_specs(read_mops_csv('SHADOW_MOPs.csv'))
+    build_figures(specs, workers=4)
+"""
+
+# import libraries
+import os
+import re
+import json
+import hashlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from Utils.SensorStreams import SENSOR_STREAMS, load_stream, sensor_stream_mops
+
+# bump when the manifest layout changes so old manifests are ignored
+FIGURE_MANIFEST_VERSION = 1
+FIGURE_MANIFEST = os.path.join('Output', '.figure_manifest.json')
+# editing the renderers re-renders every figure
+RENDERER_SOURCE = os.path.abspath(__file__)
+TRUST_PLOT_DIR = 'TrustPlots'
+MOP_PLOT_DIR = os.path.join('Output', 'Figures')
+
+TRUST_TIMELINE_STYLE = {'figsize': [12, 6], 'dpi': 500, 'step': 100, 'ylim': [0, 100]}
+TRUST_BOX_STYLE = {'figsize': [10, 6], 'dpi': 300}
+TTI_ASPECT_STYLE = {'figsize': [10, 25], 'dpi': 100}
+
+
+def figure_spec(path, renderer, data, style, **labels):
+    """A figure to build: output path, RENDERERS name, the DataFrame it draws, style parameters and text labels."""
+    return {'path': path, 'renderer': renderer, 'data': data.reset_index(drop=True), 'style': dict(style, **labels)}
+
+
+def renderer_version():
+    with open(RENDERER_SOURCE, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def figure_key(spec, version=None):
+    """SHA-1 of what a figure looks like: its renderer, style, data slice (values and columns) and renderer source."""
+    sha = hashlib.sha1()
+    sha.update(spec['renderer'].encode())
+    sha.update(json.dumps(spec['style'], sort_keys=True, default=str).encode())
+    sha.update(json.dumps([str(col) for col in spec['data'].columns]).encode())
+    sha.update(pd.util.hash_pandas_object(spec['data'], index=False).values.tobytes())
+    sha.update((version or renderer_version()).encode())
+    return sha.hexdigest()
+
+
+def load_figure_manifest(path=FIGURE_MANIFEST):
+    """Keys of the figures built so far, by output path (empty if there is no manifest yet)."""
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == FIGURE_MANIFEST_VERSION:
+            return manifest
+    return {'version': FIGURE_MANIFEST_VERSION, 'figures': {}}
+
+
+def save_figure_manifest(manifest, path=FIGURE_MANIFEST):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def pyplot():
+    """matplotlib.pyplot on the non-interactive Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_trust_timeline(data, style):
+    """A sortie's trust rating over time, with a line at the start of each configuration/scenario."""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=style['figsize'], dpi=100)
+    ax.plot(data['SampleTime'], data['RatingValue'], label='Trust Rating')
+    scenario_starts = data.groupby(['Configuration', 'Scenario'], observed=True)['SampleTime'].min().reset_index()
+    for _, row in scenario_starts.iterrows():
+        ax.axvline(x=row['SampleTime'], color='red', linestyle='--', alpha=0.7,
+                   label=f"Begin Config: {row['Configuration']}, Scenario: {row['Scenario']}")
+    ax.set_ylim(*style['ylim'])
+    ax.set_xlabel('Sortie Duration')
+    ax.set_ylabel('Trust Rating')
+    ax.set_title(style['title'])
+    ax.legend()
+    ax.set_xticks([])
+    return fig
+
+
+def render_trust_box(data, style):
+    """Distribution of the scenario mean trust ratings of each configuration."""
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=style['figsize'])
+    configs = list(data['Configuration'].unique())
+    ax.boxplot([data.loc[data['Configuration'] == config, 'RatingValue'] for config in configs], labels=configs)
+    ax.set_title(style['title'])
+    ax.set_xlabel('Configuration')
+    ax.set_ylabel('Trust Rating')
+    ax.grid(axis='y')
+    return fig
+
+
+def render_tti_vs_aspect(data, style):
+    """Time to intercept against aspect at MELD range, one panel per CM slot."""
+    plt = pyplot()
+    cms = sorted(int(match.group(1)) for match in
+                 (re.fullmatch(r'CM(\d+)_MOP_Time_to_Intercept_s', col) for col in data.columns) if match)
+    fig, axs = plt.subplots(len(cms), 1, figsize=style['figsize'], squeeze=False)
+    for ax, i in zip(axs[:, 0], cms):
+        ax.scatter(data[f'CM{i}_Aspect_at_MELD_Range_deg'], data[f'CM{i}_MOP_Time_to_Intercept_s'])
+        ax.set_title(f'CM{i} MOP Time to Intercept vs Aspect at MELD Range')
+        ax.set_xlabel('Aspect at MELD Range (deg)')
+        ax.set_ylabel('MOP Time to Intercept (s)')
+        ax.grid(True)
+    return fig
+
+
+RENDERERS = {
+    'trust_timeline': render_trust_timeline,
+    'trust_box': render_trust_box,
+    'tti_vs_aspect': render_tti_vs_aspect,
+}
+
+
+def render_figure(spec):
+    """Render one figure spec to its path (run in a pool worker). Returns the path."""
+    fig = RENDERERS[spec['renderer']](spec['data'], spec['style'])
+    os.makedirs(os.path.dirname(spec['path']) or '.', exist_ok=True)
+    try:
+        fig.savefig(spec['path'], bbox_inches='tight', dpi=spec['style']['dpi'])
+    finally:
+        pyplot().close(fig)
+    return spec['path']
+
+
+def trust_timeline_specs(root='.', pilots=None, plot_dir=None):
+    """
+    One trust-over-time figure per Trust file (Data/Trust/Trust_<pilot>_<flight>.csv), with the sortie's exclusion
+    windows dropped and every TRUST_TIMELINE_STYLE['step']-th sample drawn. Files that cannot be decoded are skipped.
+    """
+    trust_dir = os.path.dirname(os.path.join(root, SENSOR_STREAMS['Trust']['path']))
+    plot_dir = plot_dir or os.path.join(root, TRUST_PLOT_DIR)
+    specs = []
+    for filename in sorted(os.listdir(trust_dir)) if os.path.isdir(trust_dir) else []:
+        match = re.fullmatch(r'Trust_(.+)_(\d+)\.csv', filename)
+        if match is None or (pilots and match.group(1) not in pilots):
+            continue
+        pilot_name, flight_number = match.groups()
+        try:
+            trust = load_stream('Trust', pilot_name, flight_number, root)
+        except UnicodeDecodeError:
+            print(f"Skipping {filename}, bad encoding")
+            continue
+        data = trust[['SampleTime', 'RatingValue', 'Configuration', 'Scenario']].iloc[::TRUST_TIMELINE_STYLE['step']]
+        # file names as Plot_Trust.ipynb has always written them (TrustPlot_Chan_1.csv.jpg)
+        specs.append(figure_spec(os.path.join(plot_dir, f'TrustPlot_{pilot_name}_{flight_number}.csv.jpg'),
+                                 'trust_timeline', data, TRUST_TIMELINE_STYLE,
+                                 title=f'{pilot_name} Trust Rating Over Time for Sortie {flight_number}'))
+    return specs
+
+
+def mean_trust_table(mops, root='.'):
+    """
+    Mean trust of each scenario row of a MOP table over the window SHADOW scored (Utils/SensorStreams.py), with its
+    configuration, scenario type, pilot and flight; scenarios without trust samples are dropped.
+    """
+    mean_trust_df = pd.DataFrame({'Configuration': mops['Autonomy_Config'], 'Scenario': mops['Scenario_Type'],
+                                  'RatingValue': sensor_stream_mops(mops, root)['Trust_RatingValue_Mean'],
+                                  'Pilot': mops['Lead_Pilot'], 'Flight': mops['Flight_Number']})
+    return mean_trust_df.dropna(subset=['RatingValue']).reset_index(drop=True)
+
+
+def trust_box_specs(mean_trust_df, plot_dir=TRUST_PLOT_DIR):
+    """Box plots of the scenario mean trust by configuration, one per scenario type (C and D)."""
+    specs = []
+    for scenario in ['C', 'D']:
+        data = mean_trust_df.loc[mean_trust_df['Scenario'] == scenario, ['Configuration', 'RatingValue']]
+        specs.append(figure_spec(os.path.join(plot_dir, f'trust_distribution_scenario_{scenario.lower()}.jpg'),
+                                 'trust_box', data, TRUST_BOX_STYLE,
+                                 title=f'Trust Distribution by Configuration for Scenario {scenario}'))
+    return specs
+
+
+def mop_figure_specs(mops_df, plot_dir=MOP_PLOT_DIR):
+    """The MOP scatter panels of Output_to_MOPs.ipynb, from the consolidated MOP table."""
+    columns = [col for col in mops_df.columns
+               if re.fullmatch(r'CM\d+_(MOP_Time_to_Intercept_s|Aspect_at_MELD_Range_deg)', col)]
+    return [figure_spec(os.path.join(plot_dir, 'TTI_vs_Aspect_at_MELD_Range.jpg'), 'tti_vs_aspect',
+                        mops_df[columns], TTI_ASPECT_STYLE)]
+
+
+def build_figures(specs, manifest_path=FIGURE_MANIFEST, workers=None, force=False):
+    """
+    Render the figures of specs whose key changed since the last build (all of them with force) across a process
+    pool, and record the new keys in the figure manifest. A figure that fails is reported and does not stop the
+    others. A figure with no data is reported and neither drawn nor recorded.
+    Returns a dict with the paths 'rendered', 'skipped' (unchanged), 'empty' and 'failed'.
+    """
+    manifest = load_figure_manifest(manifest_path)
+    version = renderer_version()
+    empty = [spec['path'] for spec in specs if spec['data'].empty]
+    for path in empty:
+        print(f'No data for {path}, not drawn')
+    specs = [spec for spec in specs if not spec['data'].empty]
+    keys = {spec['path']: figure_key(spec, version) for spec in specs}
+    stale = [spec for spec in specs if force or not os.path.exists(spec['path'])
+             or manifest['figures'].get(spec['path']) != keys[spec['path']]]
+    stale_paths = {spec['path'] for spec in stale}
+    result = {'rendered': [], 'skipped': [spec['path'] for spec in specs if spec['path'] not in stale_paths],
+              'empty': empty, 'failed': []}
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_figure, spec): spec['path'] for spec in stale}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    future.result()
+                    manifest['figures'][path] = keys[path]
+                    result['rendered'].append(path)
+                except Exception:
+                    print(f'FAILED {path}:\n{traceback.format_exc()}')
+                    result['failed'].append(path)
+        save_figure_manifest(manifest, manifest_path)
+    return result
@@ -0,0 +1,151 @@
+# import data analysis libraries
+import os
+import json
+import hashlib
+import pandas as pd
+
+# Parquet keeps datetime64 and categorical columns as-is; without pyarrow the cache falls back to pickle
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# bump when the parsing below changes so old caches are rebuilt
+CACHE_VERSION = 1
+CACHE_DIR_NAME = '.cache'
+
+# Columns SHADOW uses from each table (None keeps every column) and the low-cardinality text columns stored as categoricals
+TABLE_SPECS = {
+    'flight': {
+        'columns': ['Timestamp', 'SampleDate', 'SampleTime', 'Configuration', 'Scenario', 'MarkingTxt', 'EntId',
+                    'ECEF_X', 'ECEF_Y', 'ECEF_Z', 'LinVelX', 'LinVelY', 'LinVelZ', 'Latitude', 'Longitude',
+                    'Altitude', 'Heading', 'Roll'],
+        'categories': ['MarkingTxt', 'Scenario', 'Configuration'],
+    },
+    'airspeed': {
+        'columns': ['Timestamp', 'SampleDate', 'SampleTime', 'Calibrated_Airspeed'],
+        'categories': [],
+    },
+    'tasking': {
+        'columns': ['Timestamp', 'SampleDate', 'SampleTime', 'Configuration', 'Scenario', 'PduType',
+                    'ReceivingEntityID_Site', 'RequestID', 'RequestStatus', 'FiringEntityID_Site',
+                    'TargetEntityID_Entity'],
+        'categories': ['Scenario', 'Configuration', 'PduType'],
+    },
+    'trust': {
+        'columns': None,
+        'categories': ['Scenario', 'Configuration', 'RatingType'],
+    },
+    'workload': {
+        'columns': None,
+        'categories': [],
+    },
+}
+
+
+def parse_sample_times(df):
+    """
+    Convert the DIS/DAS time columns to datetime64 in place. Inputs are:
+    df: table with any of 'Timestamp' (integer ticks), 'SampleDate' (YYYY-MM-DD) and 'SampleTime' (HH:MM:SS.fff)
+    Timestamp is parsed the way SHADOW always has (pd.to_datetime of the integer). SampleTime is anchored to the
+    row's SampleDate rather than to the day the script runs, so cached tables compare the same on any day.
+    Returns df.
+    """
+    if 'Timestamp' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Timestamp']):
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    if 'SampleDate' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['SampleDate']):
+        df['SampleDate'] = pd.to_datetime(df['SampleDate'])
+    if 'SampleTime' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['SampleTime']):
+        if 'SampleDate' in df.columns:
+            df['SampleTime'] = df['SampleDate'] + pd.to_timedelta(df['SampleTime'])
+        else:
+            df['SampleTime'] = pd.to_datetime(df['SampleTime'])
+    return df
+
+
+def read_table(path, kind, full=False):
+    """
+    Read a raw CSV and apply the typing used by the cache (column subset, datetimes, categoricals).
+    full=True keeps every column of the source file.
+    """
+    spec = TABLE_SPECS[kind]
+    wanted = None if full else spec['columns']
+    usecols = None if wanted is None else (lambda col: col in wanted)
+    df = pd.read_csv(path, low_memory=False, usecols=usecols)
+    df = parse_sample_times(df)
+    for col in spec['categories']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-1 of a file, read in blocks."""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def cache_paths(path, kind, full=False, cache_dir=None):
+    """Cache file and metadata file for a source CSV (kept in a .cache folder next to the source by default)."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = '{}.{}{}'.format(stem, kind, '.full' if full else '')
+    ext = '.parquet' if CACHE_FORMAT == 'parquet' else '.pkl'
+    return os.path.join(cache_dir, name + ext), os.path.join(cache_dir, name + '.json')
+
+
+def load_table(path, kind, full=False, cache_dir=None, refresh=False):
+    """
+    Load a flight-test CSV through the columnar cache. Inputs are:
+    path: source CSV (e.g. Data/Lead/Lead_Chan_1.csv)
+    kind: table type in TABLE_SPECS ('flight', 'airspeed', 'tasking', 'trust', 'workload')
+    full: keep every source column instead of only the ones SHADOW uses
+    cache_dir: where to keep the cache (default: a .cache folder next to the source)
+    refresh: rebuild the cache even if it is current
+    The first load parses the CSV and writes the cache; later loads read the cache as long as the source file is
+    unchanged. A changed size or modification time triggers a hash check, and the cache is only rebuilt if the
+    contents actually differ.
+    Returns the typed DataFrame.
+    """
+    cache_file, meta_file = cache_paths(path, kind, full, cache_dir)
+    stat = os.stat(path)
+    source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    meta = None
+    if not refresh and os.path.exists(cache_file) and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION or meta.get('format') != CACHE_FORMAT:
+            meta = None
+        elif meta['size'] != source['size']:
+            meta = None
+        elif meta['mtime_ns'] != source['mtime_ns']:
+            # touched or copied - only rebuild if the contents changed
+            if meta['sha1'] == file_hash(path):
+                meta['mtime_ns'] = source['mtime_ns']
+                with open(meta_file, 'w') as f:
+                    json.dump(meta, f)
+            else:
+                meta = None
+
+    if meta is not None:
+        if CACHE_FORMAT == 'parquet':
+            return pd.read_parquet(cache_file)
+        return pd.read_pickle(cache_file)
+
+    df = read_table(path, kind, full)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(cache_file, index=False)
+    else:
+        df.to_pickle(cache_file)
+    meta = dict(source, sha1=file_hash(path), version=CACHE_VERSION, format=CACHE_FORMAT, kind=kind, full=full)
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f)
+    return df
+
@@ -0,0 +1,125 @@
+# import data analysis libraries
+import numpy as np
+import pandas as pd
+from Utils.Kinematics import Kinematics
+
+
+class FlightIndex:
+    """
+    Row index over a sortie's DIS entity state table, built once per flight.
+    The table is stably re-ordered by (Scenario, Configuration) block, then MarkingTxt, then EntId, keeping time
+    order inside each entity. Blocks, markings and entities are ordered by first appearance, so the EntIds of a
+    marking come out in the same order as .unique() on the time-sorted table. Every scenario, marking and entity
+    is then a contiguous row range, and lookups are slices instead of boolean scans of the whole sortie.
+    The per-row kinematics (Utils/Kinematics.py) are computed once for the whole flight on first use and each
+    ScenarioView gets a slice of them.
+    """
+
+    def __init__(self, flight_data, time_col='SampleTime'):
+        """flight_data: DIS entity state table (any order; re-ordered by time_col first if needed)."""
+        if not flight_data[time_col].is_monotonic_increasing:
+            flight_data = flight_data.sort_values(time_col, kind='stable')
+        keys = ['Scenario', 'Configuration']
+        scenario_key = flight_data.groupby(keys, sort=False, dropna=False, observed=True).ngroup().values
+        marking_key = flight_data.groupby(keys + ['MarkingTxt'], sort=False, dropna=False, observed=True).ngroup().values
+        entity_key = flight_data.groupby(keys + ['MarkingTxt', 'EntId'], sort=False, dropna=False, observed=True).ngroup().values
+        order = np.lexsort((entity_key, marking_key, scenario_key))
+
+        self.time_col = time_col
+        self.data = flight_data.iloc[order].reset_index(drop=True)
+        self.entities = entity_table(self.data, entity_key[order], time_col)
+        self._kinematics = None
+        self._scenarios = self.entities.groupby(keys, sort=False, dropna=False, observed=True).agg(
+            start=('start', 'min'), stop=('stop', 'max'))
+
+    @property
+    def kinematics(self):
+        """Kinematics of every row of data, built on first use."""
+        if self._kinematics is None:
+            self._kinematics = Kinematics.from_table(self.data)
+        return self._kinematics
+
+    def scenario(self, scenario_type, config):
+        """ScenarioView over the rows of one Scenario/Configuration block (empty if it was not flown)."""
+        key = (scenario_type, config)
+        if key not in self._scenarios.index:
+            return ScenarioView(self.data.iloc[0:0], self.entities.iloc[0:0], self.time_col, self.kinematics.rows(0, 0))
+        start, stop = self._scenarios.loc[key, ['start', 'stop']]
+        entities = self.entities[(self.entities['start'] >= start) & (self.entities['stop'] <= stop)].copy()
+        entities[['start', 'stop']] -= start
+        return ScenarioView(self.data.iloc[start:stop], entities.reset_index(drop=True), self.time_col,
+                            self.kinematics.rows(start, stop))
+
+
+class ScenarioView:
+    """
+    Rows of one scenario from a FlightIndex, grouped by marking and entity. data is a slice of the flight table;
+    entities holds one row per (MarkingTxt, EntId) with its row range [start, stop) in data and its time bounds.
+    kinematics, when given, holds the Kinematics of the rows of data (row for row).
+    """
+
+    def __init__(self, data, entities, time_col='SampleTime', kinematics=None):
+        self.data = data
+        self.entities = entities
+        self.time_col = time_col
+        self.kinematics = kinematics
+
+    @property
+    def start_time(self):
+        return self.entities['first_time'].min()
+
+    @property
+    def end_time(self):
+        return self.entities['last_time'].max()
+
+    def marking(self, marking):
+        """Rows of every entity with this MarkingTxt (e.g. 'AMBUSH51', 'JASSM') as one contiguous slice."""
+        blocks = self.entities[self.entities['MarkingTxt'] == marking]
+        if blocks.empty:
+            return self.data.iloc[0:0]
+        return self.data.iloc[blocks['start'].min():blocks['stop'].max()]
+
+    def entity_ids(self, marking):
+        """EntIds with this MarkingTxt in order of first appearance (same as .unique() on the time-sorted rows)."""
+        return self.entities.loc[self.entities['MarkingTxt'] == marking, 'EntId'].values
+
+    def rows(self, ent_ids):
+        """Rows of the given EntIds (under any marking), entity by entity."""
+        blocks = self.entities[self.entities['EntId'].isin(list(ent_ids))]
+        if len(blocks) == 1:
+            return self.data.iloc[blocks['start'].iloc[0]:blocks['stop'].iloc[0]]
+        return self.data.iloc[self.positions(ent_ids)]
+
+    def positions(self, ent_ids=None, marking=None):
+        """Row positions in data of the given EntIds, or of every entity with this MarkingTxt, entity by entity."""
+        if marking is not None:
+            keep = np.asarray(self.entities['MarkingTxt'].values == marking)
+        else:
+            keep = np.isin(self.entities['EntId'].values, list(ent_ids))
+        starts, stops = self.entities['start'].values[keep], self.entities['stop'].values[keep]
+        positions = [np.arange(start, stop) for start, stop in zip(starts, stops)]
+        return np.concatenate(positions) if positions else np.zeros(0, dtype=int)
+
+    def until(self, end_time):
+        """New ScenarioView keeping only the rows at or before end_time (each entity keeps a prefix of its rows)."""
+        keep = (self.data[self.time_col] <= end_time).values
+        data = self.data[keep]
+        entity_key = np.repeat(np.arange(len(self.entities)), (self.entities['stop'] - self.entities['start']).values)[keep]
+        kinematics = self.kinematics.take(keep) if self.kinematics is not None else None
+        return ScenarioView(data, entity_table(data, entity_key, self.time_col), self.time_col, kinematics)
+
+
+def entity_table(data, entity_key, time_col='SampleTime'):
+    """One row per run of equal entity_key in data: Scenario/Configuration/MarkingTxt/EntId, row range and time bounds."""
+    if len(data) == 0:
+        return pd.DataFrame(columns=['Scenario', 'Configuration', 'MarkingTxt', 'EntId', 'start', 'stop',
+                                     'first_time', 'last_time'])
+    starts = np.flatnonzero(np.r_[True, entity_key[1:] != entity_key[:-1]])
+    stops = np.r_[starts[1:], len(entity_key)]
+    times = data[time_col].values
+    entities = data.iloc[starts][['Scenario', 'Configuration', 'MarkingTxt', 'EntId']].reset_index(drop=True)
+    entities['start'] = starts
+    entities['stop'] = stops
+    entities['first_time'] = times[starts]
+    entities['last_time'] = times[stops - 1]
+    return entities
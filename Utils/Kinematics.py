@@ -0,0 +1,96 @@
+# import data analysis libraries
+import numpy as np
+
+POSITION_COLUMNS = ['ECEF_X', 'ECEF_Y', 'ECEF_Z']
+VELOCITY_COLUMNS = ['LinVelX', 'LinVelY', 'LinVelZ']
+
+
+def nearest_rows(right, left, tolerance):
+    """
+    Row of the sorted right times nearest to each left time, -1 if none is within tolerance.
+    Same choice as merge_asof(direction='nearest'): ties go to the earlier sample (the last of its duplicates).
+    """
+    n = right.size
+    before = np.searchsorted(right, left, side='right') - 1
+    after = np.searchsorted(right, left, side='left')
+    before_diff = np.where(before >= 0, left - right[np.maximum(before, 0)], tolerance + 1)
+    after_diff = np.where(after < n, right[np.minimum(after, n - 1)] - left, tolerance + 1)
+    use_before = (before_diff <= tolerance) & ((after_diff > tolerance) | (before_diff <= after_diff))
+    return np.where(use_before, before, np.where(after_diff <= tolerance, after, -1))
+
+
+class Kinematics:
+    """
+    Per-sample kinematics of DIS entity states as contiguous float arrays, computed once per flight and shared by
+    every MOP that needs relative geometry. All entities share the ECEF frame the DIS data is logged in.
+    lat / lon: position (deg), with cos_lat = cos(lat) cached for the flat-earth distance
+    pos / vel: (n, 3) ECEF position (m) and velocity (m/s)
+    speed: norm of vel
+    Slices of a Kinematics (rows) are views into the flight arrays, so a scenario costs no copies.
+    """
+
+    def __init__(self, lat, lon, pos, vel, cos_lat=None, speed=None):
+        self.lat = lat
+        self.lon = lon
+        self.pos = pos
+        self.vel = vel
+        self.cos_lat = np.cos(np.radians(lat)) if cos_lat is None else cos_lat
+        self.speed = np.linalg.norm(vel, axis=1) if speed is None else speed
+
+    @classmethod
+    def from_table(cls, data):
+        """Kinematics of every row of a DIS entity state table."""
+        # fill the (n, 3) arrays column by column so no wide temporary copy of the table is made
+        pos = np.empty((len(data), 3))
+        vel = np.empty((len(data), 3))
+        for i, (pos_col, vel_col) in enumerate(zip(POSITION_COLUMNS, VELOCITY_COLUMNS)):
+            pos[:, i] = data[pos_col].values
+            vel[:, i] = data[vel_col].values
+        return cls(data['Latitude'].to_numpy(dtype=float, copy=True), data['Longitude'].to_numpy(dtype=float, copy=True),
+                   pos, vel)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def rows(self, start, stop):
+        """Kinematics of rows [start, stop) (views, no copy)."""
+        return Kinematics(self.lat[start:stop], self.lon[start:stop], self.pos[start:stop], self.vel[start:stop],
+                          self.cos_lat[start:stop], self.speed[start:stop])
+
+    def take(self, positions):
+        """Kinematics of the rows at positions (a mask or integer positions); position -1 gives a row of NaN."""
+        positions = np.asarray(positions)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        missing = positions < 0
+        if not missing.any():
+            return Kinematics(self.lat[positions], self.lon[positions], self.pos[positions], self.vel[positions],
+                              self.cos_lat[positions], self.speed[positions])
+        taken = self.take(np.where(missing, 0, positions))
+        for values in (taken.lat, taken.lon, taken.pos, taken.vel, taken.cos_lat, taken.speed):
+            values[missing] = np.nan
+        return taken
+
+
+def relative_geometry(ac, cm):
+    """
+    Relative CM/aircraft geometry for aligned samples (two Kinematics of the same length).
+    Returns a dict of arrays:
+    distance_nm: flat-earth distance between aircraft and CM
+    angle_between_vel: angle between the two velocity vectors (deg)
+    angle_between_pos: angle between the aircraft->CM line of sight and the CM velocity, i.e. the trailing cone (deg)
+    angle_between_pos_nose: angle between the aircraft->CM line of sight and the aircraft velocity, i.e. the nose cone (deg)
+    """
+    # Flat-earth approximation in nautical miles
+    dlat = (ac.lat - cm.lat) * 60.0    # nm
+    dlon = (ac.lon - cm.lon) * 60.0 * cm.cos_lat
+    distance_nm = np.sqrt(dlat**2 + dlon**2)
+
+    rel_pos = cm.pos - ac.pos
+    norm_rel = np.linalg.norm(rel_pos, axis=1)
+    angle_between_vel = np.degrees(np.arccos(np.clip(np.sum(cm.vel * ac.vel, axis=1) / (cm.speed * ac.speed), -1, 1)))
+    angle_between_pos = np.degrees(np.arccos(np.clip(np.sum(rel_pos * cm.vel, axis=1) / (norm_rel * cm.speed), -1, 1)))
+    angle_between_pos_nose = np.degrees(np.arccos(np.clip(np.sum(rel_pos * ac.vel, axis=1) / (norm_rel * ac.speed), -1, 1)))
+
+    return {'distance_nm': distance_nm, 'angle_between_vel': angle_between_vel,
+            'angle_between_pos': angle_between_pos, 'angle_between_pos_nose': angle_between_pos_nose}
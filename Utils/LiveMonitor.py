@@ -0,0 +1,411 @@
+# import libraries
+import asyncio
+import numpy as np
+import pandas as pd
+from Utils.DataReduction import ROLE_MARKINGS, ROLE_PBU_SITES, INTERCEPT_CRITERIA, AltitudeBlockTracker, cone_geometry, \
+    intercept_conditions
+from Utils.Kinematics import nearest_rows
+
+SCENARIO_KEYS = ['Scenario', 'Configuration']
+SITE_ROLES = {site: role for role, site in ROLE_PBU_SITES.items()}
+MELD_RANGE_NM = INTERCEPT_CRITERIA['meld_range_nm']
+SAM_ID_WINDOW = pd.Timedelta(seconds=30).value
+MATCH_TOLERANCE = pd.Timedelta(milliseconds=INTERCEPT_CRITERIA['match_tolerance_ms']).value
+KILL_WINDOW = pd.Timedelta(seconds=INTERCEPT_CRITERIA['kill_window_s']).value
+# columns kept from each entity-state sample; Timestamp and SampleTime are held as int64 ns
+SAMPLE_COLUMNS = ['Timestamp', 'SampleTime', 'EntId', 'Latitude', 'Longitude', 'Altitude',
+                  'ECEF_X', 'ECEF_Y', 'ECEF_Z', 'LinVelX', 'LinVelY', 'LinVelZ']
+
+
+async def replay(flight_data, tasking_data, queue, speed=1.0, batch_s=0.1):
+    """
+    Stand-in for the live feed: push recorded DIS entity-state and tasking rows onto queue in SampleTime order,
+    paced at speed x real time. Inputs are:
+    flight_data / tasking_data: typed tables (e.g. from load_table)
+    queue: asyncio.Queue read by LiveMonitor.run
+    speed: replay rate (1 = real time, 100 = 100x)
+    batch_s: recorded time covered by each batch; a batch is sent once its last sample is due
+    Each batch is a dict {'kind': 'entity' or 'tasking', 'data': DataFrame, 'sent': loop time}; None marks the end.
+    """
+    loop = asyncio.get_running_loop()
+    streams = []
+    for kind, table in (('entity', flight_data), ('tasking', tasking_data)):
+        table = table[table['SampleTime'].notna()].sort_values('SampleTime', kind='stable')
+        streams.append((kind, table, table['SampleTime'].values.astype('datetime64[ns]').view('int64')))
+    t0 = min(times[0] for _, _, times in streams if times.size)
+    batch_ns = int(batch_s * 1e9)
+    streams = [(kind, table, (times - t0) // batch_ns) for kind, table, times in streams]
+
+    start = loop.time()
+    for b in np.union1d(streams[0][2], streams[1][2]):
+        await asyncio.sleep(max(0.0, start + (b + 1) * batch_s / speed - loop.time()))
+        for kind, table, bins in streams:
+            lo, hi = np.searchsorted(bins, b, side='left'), np.searchsorted(bins, b, side='right')
+            if hi > lo:
+                await queue.put({'kind': kind, 'data': table.iloc[lo:hi], 'sent': loop.time()})
+    await queue.put(None)
+
+
+def print_update(update):
+    """Default LiveMonitor output: one line per update."""
+    details = ', '.join(f'{k}={v}' for k, v in update.items() if k not in ('Scenario', 'Configuration', 'Event', 'SampleTime'))
+    print(f"[{update['Scenario']}/{update['Configuration']} {pd.Timestamp(update['SampleTime']).time()}] {update['Event']}: {details}")
+
+
+class LiveMonitor:
+    """
+    Near-real-time MOPs from a stream of DIS entity-state and tasking PDU batches (see replay for the batch format).
+    Each batch is routed to its (Scenario, Configuration) and evaluated incrementally with the same criteria as
+    the post-flight reduction: altitude busts (AltitudeBlockTracker), intercept criteria (pair_geometry and
+    intercept_conditions on a 300 ms nearest-time match), time to consent / time to intercept at each kill, and
+    SAM-ID timeliness. Updates are passed to on_update as they happen; the time from a batch being sent to it being
+    processed is kept in latencies.
+    """
+
+    def __init__(self, sam_id_times=None, alt_block_radius=500, on_update=None):
+        """sam_id_times maps (Scenario, Configuration) to the SAM ID times stamped in the CR (optional)."""
+        self.sam_id_times = sam_id_times or {}
+        self.alt_block_radius = alt_block_radius
+        self.on_update = on_update or print_update
+        self.scenarios = {}
+        self.current = None
+        self.updates = []
+        self.latencies = []
+
+    async def run(self, queue):
+        """Consume batches until None. Returns the per-scenario MOP snapshot table."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            if batch['kind'] == 'entity':
+                self.process_entities(batch['data'])
+            else:
+                self.process_tasking(batch['data'])
+            self.latencies.append(loop.time() - batch['sent'])
+        self.close()
+        return self.mops()
+
+    def emit(self, update):
+        self.updates.append(update)
+        self.on_update(update)
+
+    def process_entities(self, df):
+        for key, part in split_scenarios(df):
+            state = self.scenarios.get(key)
+            if state is None:
+                state = ScenarioMonitor(key, self.sam_id_times.get(key, []), self.alt_block_radius, self.emit)
+                self.scenarios[key] = state
+            if self.current is not None and self.current is not state:
+                self.current.close()
+            self.current = state
+            state.update_entities(part)
+
+    def process_tasking(self, df):
+        for key, part in split_scenarios(df):
+            if key in self.scenarios:
+                self.scenarios[key].update_tasking(part)
+
+    def close(self):
+        for state in self.scenarios.values():
+            state.close()
+
+    def mops(self):
+        """Current MOP snapshot of every scenario seen so far, one row per scenario."""
+        return pd.DataFrame([state.mops() for state in self.scenarios.values()])
+
+
+def split_scenarios(df):
+    """(Scenario, Configuration) groups of a batch; a batch almost always falls inside one window, so skip the groupby."""
+    if df.empty:
+        return []
+    scenario, config = df['Scenario'].values, df['Configuration'].values
+    if (scenario == scenario[0]).all() and (config == config[0]).all():
+        return [] if pd.isna(scenario[0]) or pd.isna(config[0]) else [((scenario[0], config[0]), df)]
+    return list(df.groupby(SCENARIO_KEYS, sort=False, observed=True))
+
+
+def to_ns(times):
+    """datetime64 values as int64 ns."""
+    return np.asarray(times).astype('datetime64[ns]').view('int64')
+
+
+def sample_arrays(df, rows=None):
+    """SAMPLE_COLUMNS of df (optionally only the rows of a boolean mask) as a dict of numpy arrays."""
+    arrays = {}
+    for col in SAMPLE_COLUMNS:
+        values = df[col].values
+        if col in ('Timestamp', 'SampleTime'):
+            values = to_ns(values)
+        arrays[col] = values if rows is None else values[rows]
+    return arrays
+
+
+def append_arrays(buffer, arrays):
+    if buffer is None:
+        return arrays
+    return {col: np.concatenate([buffer[col], arrays[col]]) for col in buffer}
+
+
+def take_arrays(buffer, rows):
+    return {col: values[rows] for col, values in buffer.items()}
+
+
+class ScenarioMonitor:
+    """
+    Incremental state of one scenario window for LiveMonitor. Samples are held as numpy arrays (see sample_arrays)
+    and all times are int64 ns, so a batch costs a few array operations rather than DataFrame copies.
+    """
+
+    def __init__(self, key, sam_id_times, alt_block_radius, emit):
+        self.key = key
+        self.emit = emit
+        self.alt_block_radius = alt_block_radius
+        self.sam_id_times = [pd.Timestamp(t).value for t in sam_id_times]
+        self.start_time = None
+        self.end_cap = None
+        self.last_time = None
+        self.closed = False
+        self.assigned_alts = {}
+        self.trackers = {}
+        # recent aircraft samples and the CM samples still waiting for the aircraft sample after them, per role
+        self.tracks = {role: None for role in ROLE_MARKINGS}
+        self.pending = {role: None for role in ROLE_MARKINGS}
+        self.criteria = {}
+        self.cm_last_seen = {}
+        self.pending_kills = []
+        self.kills = {}
+        self.previous_int_time = {role: None for role in ROLE_MARKINGS}
+        self.sam_spawn = {}
+        self.sam_time_to_id = {}
+
+    def update(self, event, time, **details):
+        self.emit(dict({'Scenario': self.key[0], 'Configuration': self.key[1], 'Event': event,
+                        'SampleTime': pd.Timestamp(time)}, **details))
+
+    def update_entities(self, part):
+        sample_times = to_ns(part['SampleTime'].values)
+        if self.start_time is None:
+            self.start_time = int(sample_times.min())
+            if self.key[0] == 'D':
+                # Cap Delta scenarios as the reduction does
+                self.end_cap = (pd.Timestamp(self.start_time) + pd.DateOffset(minutes=7, second=15)).value
+            self.update('Scenario_Start', self.start_time)
+        keep = None
+        if self.end_cap is not None:
+            keep = sample_times <= self.end_cap
+            if not keep.any():
+                return
+        self.closed = False
+        markings = part['MarkingTxt'].values
+        if keep is not None:
+            markings = np.where(keep, markings, None)
+        self.last_time = int(sample_times[keep].max() if keep is not None else sample_times.max())
+
+        for role, marking in ROLE_MARKINGS.items():
+            rows = markings == marking
+            if not rows.any():
+                continue
+            samples = sample_arrays(part, rows)
+            if role not in self.trackers:
+                self.assigned_alts[role] = samples['Altitude'][0]
+                self.trackers[role] = AltitudeBlockTracker({role: int(self.assigned_alts[role])}, self.alt_block_radius)
+            tracker = self.trackers[role]
+            busts = tracker.violation_count[0]
+            tracker.update(role, samples['Timestamp'], samples['Altitude'])
+            if tracker.violation_count[0] > busts:
+                self.update('Altitude_Bust', samples['SampleTime'][-1], Role=role,
+                            Assigned_Altitude_ft=self.assigned_alts[role], Count=int(tracker.violation_count[0]))
+            track = append_arrays(self.tracks[role], samples)
+            if (np.diff(track['Timestamp']) < 0).any():
+                track = take_arrays(track, np.argsort(track['Timestamp'], kind='stable'))
+            self.tracks[role] = track
+
+        rows = markings == 'JASSM'
+        if rows.any():
+            samples = sample_arrays(part, rows)
+            for cm_id, last_seen in zip(samples['EntId'], samples['SampleTime']):
+                self.cm_last_seen[cm_id] = max(self.cm_last_seen.get(cm_id, last_seen), last_seen)
+            for role in self.pending:
+                self.pending[role] = append_arrays(self.pending[role], samples)
+
+        rows = markings == 'SAM'
+        if rows.any():
+            for sam_id, spawn_time in zip(part['EntId'].values[rows], sample_times[rows]):
+                if sam_id not in self.sam_spawn:
+                    self.sam_spawn[sam_id] = int(spawn_time)
+                    self.update('SAM_Spawn', spawn_time, EntId=sam_id)
+
+        self.resolve()
+        self.process_kills()
+        self.check_sams()
+
+    def resolve(self, force=False):
+        """
+        Evaluate the CM samples whose nearest aircraft sample is now known (one aircraft sample period of latency).
+        force evaluates every pending sample against the samples received so far.
+        """
+        for role, track in self.tracks.items():
+            pending = self.pending[role]
+            if track is None or pending is None or pending['Timestamp'].size == 0:
+                continue
+            latest = track['Timestamp'][-1]
+            is_ready = np.ones(pending['Timestamp'].size, dtype=bool) if force else pending['Timestamp'] <= latest
+            if is_ready.any():
+                ready = take_arrays(pending, np.flatnonzero(is_ready))
+                ready = take_arrays(ready, np.argsort(ready['Timestamp'], kind='stable'))
+                self.pending[role] = pending = take_arrays(pending, ~is_ready)
+                self.update_criteria(role, ready, track, nearest_rows(track['Timestamp'], ready['Timestamp'], MATCH_TOLERANCE))
+            # only aircraft samples that can still be the nearest match of a pending CM sample are kept
+            oldest = pending['Timestamp'].min() if pending['Timestamp'].size else latest
+            first = min(np.searchsorted(track['Timestamp'], oldest - MATCH_TOLERANCE, side='left'), track['Timestamp'].size - 1)
+            if first > 0:
+                self.tracks[role] = take_arrays(track, slice(first, None))
+
+    def update_criteria(self, role, cm, track, match):
+        # CM samples without an aircraft sample within tolerance never meet the criteria (NaN geometry in the reduction)
+        matched = np.flatnonzero(match >= 0)
+        ac = take_arrays(track, match[matched])
+        geometry = cone_geometry(
+            ac['Latitude'], ac['Longitude'], cm['Latitude'][matched], cm['Longitude'][matched],
+            np.column_stack([ac['ECEF_X'], ac['ECEF_Y'], ac['ECEF_Z']]),
+            np.column_stack([cm['ECEF_X'][matched], cm['ECEF_Y'][matched], cm['ECEF_Z'][matched]]),
+            np.column_stack([ac['LinVelX'], ac['LinVelY'], ac['LinVelZ']]),
+            np.column_stack([cm['LinVelX'][matched], cm['LinVelY'][matched], cm['LinVelZ'][matched]]))
+        met = np.zeros(match.size, dtype=bool)
+        met[matched] = intercept_conditions(geometry)['Intercept_Criteria']
+        in_meld = np.zeros(match.size, dtype=bool)
+        in_meld[matched] = geometry['distance_nm'] <= MELD_RANGE_NM
+        times = np.zeros(match.size, dtype='int64')
+        times[matched] = ac['SampleTime']
+
+        cm_ids = cm['EntId']
+        for cm_id in pd.unique(cm_ids):
+            rows = cm_ids == cm_id
+            state = self.criteria.setdefault((cm_id, role), {'met': False, 'rises': [], 'first_met': None, 'meld_entry': None})
+            cm_met, cm_times = met[rows], times[rows]
+            for rise in cm_times[cm_met & ~np.r_[state['met'], cm_met[:-1]]]:
+                state['rises'].append(int(rise))
+                self.update('Intercept_Criteria_Met', rise, Role=role, CM=cm_id)
+            if state['first_met'] is None and cm_met.any():
+                state['first_met'] = int(cm_times[cm_met].min())
+            state['met'] = bool(cm_met[-1])
+            cm_meld = cm_times[in_meld[rows]]
+            if state['meld_entry'] is None and cm_meld.size:
+                state['meld_entry'] = int(cm_meld.min())
+
+    def update_tasking(self, part):
+        kills = part[part['PduType'] == 'KILL']
+        for kill_time, site, target in zip(to_ns(kills['SampleTime'].values), kills['FiringEntityID_Site'].values,
+                                           kills['TargetEntityID_Entity'].values):
+            self.pending_kills.append((int(kill_time), site, target))
+        self.process_kills()
+
+    def process_kills(self, force=False):
+        """
+        Score kills once every CM sample up to the kill time has been evaluated, with TaskingIndex.kill_time's rules.
+        A KILL that targets a known CM only scores that CM, once it has met the intercept criteria for the site's role
+        (until then it waits; at the end of the window it is dropped). A KILL without a known target goes to the
+        role's unscored intercept last seen nearest the kill, at most kill_window_s before it, once that window has
+        passed.
+        """
+        remaining = []
+        for kill_time, site, target in self.pending_kills:
+            waiting = any(p is not None and p['SampleTime'].size and p['SampleTime'].min() <= kill_time
+                          for p in self.pending.values())
+            if waiting and not force:
+                remaining.append((kill_time, site, target))
+                continue
+            role = SITE_ROLES.get(site)
+            if role is None:
+                continue
+            if target in self.cm_last_seen:
+                # the CM's own EntId (the PDU field reads as float)
+                cm_id = next(cm for cm in self.cm_last_seen if cm == target)
+                if cm_id in self.kills:
+                    continue
+                state = self.criteria.get((cm_id, role))
+                if state is not None and state['first_met'] is not None:
+                    self.score_kill(cm_id, role, kill_time, 'KILL PDU')
+                elif not force:
+                    remaining.append((kill_time, site, target))
+                continue
+            # untargeted: wait until the CMs last seen before the kill window closes are known
+            if not force and (self.last_time is None or self.last_time <= kill_time + KILL_WINDOW):
+                remaining.append((kill_time, site, target))
+                continue
+            candidates = [cm for (cm, r), state in self.criteria.items()
+                          if r == role and state['first_met'] is not None and cm not in self.kills
+                          and kill_time - self.cm_last_seen[cm] <= KILL_WINDOW]
+            if candidates:
+                cm_id = min(candidates, key=lambda cm: abs(kill_time - self.cm_last_seen[cm]))
+                self.score_kill(cm_id, role, kill_time, 'KILL PDU')
+        self.pending_kills = remaining
+
+    def score_kill(self, cm_id, role, kill_time, source):
+        """Time to consent and MOP time to intercept at a kill, as finalize_intercept computes them."""
+        state = self.criteria[(cm_id, role)]
+        rises = [rise for rise in state['rises'] if rise <= kill_time]
+        if rises:
+            int_time = max(rises)
+        elif state['first_met'] is not None:
+            int_time = state['first_met']
+        else:
+            int_time = kill_time
+        meld_transition = state['meld_entry']
+        if self.previous_int_time[role] is not None and meld_transition is not None:
+            meld_transition = max(meld_transition, self.previous_int_time[role])
+        event = {'Role': role, 'CM': cm_id, 'Kill_Source': source,
+                 'Time_to_Consent_s': max((kill_time - int_time) / 1e9, 0),
+                 'MOP_Time_to_Intercept_s': (kill_time - meld_transition) / 1e9 if meld_transition is not None else np.nan}
+        self.kills[cm_id] = event
+        self.previous_int_time[role] = int_time
+        self.update('CM_Kill', kill_time, **event)
+
+    def check_sams(self, force=False):
+        """Score each SAM once its 30 s identification window has closed (same rule as the reduction)."""
+        for sam_id, spawn_time in self.sam_spawn.items():
+            if sam_id in self.sam_time_to_id or not (force or self.last_time > spawn_time + SAM_ID_WINDOW):
+                continue
+            time_to_id = 30
+            for sam_id_time in self.sam_id_times:
+                if spawn_time <= sam_id_time <= spawn_time + SAM_ID_WINDOW:
+                    time_to_id = (sam_id_time - spawn_time) / 1e9
+            self.sam_time_to_id[sam_id] = time_to_id
+            self.update('SAM_ID', spawn_time + SAM_ID_WINDOW, EntId=sam_id, Time_to_ID_s=time_to_id)
+
+    def close(self):
+        """Flush pending work at the end of the window; CMs met but never killed are scored at their last sample."""
+        if self.closed or self.start_time is None:
+            return
+        self.resolve(force=True)
+        self.process_kills(force=True)
+        unscored = [(self.cm_last_seen[cm], cm) for cm in self.cm_last_seen if cm not in self.kills]
+        for last_seen, cm_id in sorted(unscored):
+            for role in ROLE_MARKINGS:
+                state = self.criteria.get((cm_id, role))
+                if state is not None and state['first_met'] is not None:
+                    self.score_kill(cm_id, role, last_seen, 'last seen')
+                    break
+        self.check_sams(force=True)
+        self.closed = True
+        self.update('Scenario_Update', self.last_time, **self.mops())
+
+    def mops(self):
+        """Snapshot of the scenario's MOPs so far."""
+        mops = {'Scenario': self.key[0], 'Configuration': self.key[1], 'Start_Time': pd.Timestamp(self.start_time),
+                'Last_Sample_Time': pd.Timestamp(self.last_time)}
+        for role, tracker in self.trackers.items():
+            stats = tracker.totals().loc[role]
+            mops[f'{role}_Altitude_MSL_ft'] = self.assigned_alts[role]
+            mops[f'{role}_Altitude_Deviation_Count'] = int(stats['Violation_Count'])
+            mops[f'{role}_Altitude_Deviation_Integrated_ft_s'] = stats['Integrated_ft_s']
+        mops['Num_CMs'] = len(self.cm_last_seen)
+        mops['CMs_Meeting_Criteria'] = len({cm for (cm, _), state in self.criteria.items() if state['first_met'] is not None})
+        mops['Total_CMs_Intercepted'] = len(self.kills)
+        consent = [event['Time_to_Consent_s'] for event in self.kills.values()]
+        mops['Mean_Time_to_Consent_s'] = float(np.mean(consent)) if consent else np.nan
+        mops['Num_SAMs'] = len(self.sam_spawn)
+        mops['Mean_SAM_Time_to_ID_s'] = float(np.mean(list(self.sam_time_to_id.values()))) if self.sam_time_to_id else np.nan
+        return mops
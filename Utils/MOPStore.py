@@ -0,0 +1,215 @@
+"""
+Long-format store of the MOPs, in place of one wide row per scenario with a CM<i>_ block per intercepted CM and a
+SAM<i>_ block per SAM. A MOPStore holds three tables:
+    scenarios    one row per scenario: the scenario-level MOPs (config, altitude deviation, SAM counts, ...)
+    intercepts   one row per intercepted CM, numbered CM_Num in order of time to intercept, with the CM_FIELDS
+    sams         one row per SAM in the scenario, numbered SAM_Num, with its EntId and Time_to_ID_s
+Every event row carries the scenario keys (EVENT_KEYS), so queries such as all HH intercepts are a filtered read of
+one table. Rows are appended into preallocated column buffers, and the wide table SHADOW has always written
+(MOPs_<pilot>_Flight<n>.csv) is only built when wide() is called. The tables are written as Parquet (pickles without
+pyarrow, as for the table cache) so their types survive a round trip.
+
+Example:
+    store = MOPStore.from_wide(read_flight_mops('Output'))
+    store.intercepts(Autonomy_Config='HH', Scenario_Type='C')
+    python -m Utils.MOPStore Output Output/MOPStore    # convert the per-flight MOP tables in Output
+"""
+
+# import libraries
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+from Utils.Campaign import CM_FIELDS, read_flight_mops
+from Utils.TraceArchive import TRACE_EXT, write_frame, read_frame, as_list
+
+# scenario keys copied onto every intercept and SAM row
+EVENT_KEYS = ['Lead_Pilot', 'Flight_Number', 'Scenario_within_flight', 'Scenario_Type', 'Autonomy_Config']
+SAM_FIELDS = ['EntId', 'Time_to_ID_s']
+INTERCEPT_COLUMNS = EVENT_KEYS + ['CM_Num'] + CM_FIELDS
+SAM_COLUMNS = EVENT_KEYS + ['SAM_Num'] + SAM_FIELDS
+# types of the event tables (the scenario table keeps the types of its values)
+INTERCEPT_DTYPES = dict({field: 'float64' for field in CM_FIELDS if field not in ('EntId', 'Interceptor Role')},
+                        CM_Num='int64', EntId='int64')
+SAM_DTYPES = {'SAM_Num': 'int64', 'EntId': 'int64', 'Time_to_ID_s': 'float64'}
+# in the wide layout the CM<i>_ block follows the intercept counts and the SAM<i>_ block follows the SAM counts
+INTERCEPT_BLOCK_AFTER = 'Proportion_CMs_Intercepted'
+SAM_BLOCK_AFTER = 'Proportion_SAMs_Identified'
+TABLE_NAMES = {'scenarios': 'Scenarios', 'intercepts': 'Intercepts', 'sams': 'SAMs'}
+
+
+class ColumnBuffer:
+    """Rows appended into one preallocated object array per column, doubled when full. Missing values are NaN."""
+
+    def __init__(self, columns=(), capacity=16):
+        self.size = 0
+        self.capacity = capacity
+        self.columns = {}
+        for col in columns:
+            self.add_column(col)
+
+    def add_column(self, col):
+        self.columns[col] = np.full(self.capacity, np.nan, dtype=object)
+
+    def append(self, row):
+        if self.size == self.capacity:
+            self.capacity *= 2
+            for col, values in self.columns.items():
+                grown = np.full(self.capacity, np.nan, dtype=object)
+                grown[:self.size] = values[:self.size]
+                self.columns[col] = grown
+        for col, value in row.items():
+            if col not in self.columns:
+                self.add_column(col)
+            self.columns[col][self.size] = value
+        self.size += 1
+
+    def row(self, i, columns=None):
+        return {col: self.columns[col][i] for col in (columns or self.columns)}
+
+    def frame(self, dtypes=None):
+        """The buffered rows as a DataFrame; column types are inferred from the values unless given in dtypes."""
+        frame = pd.DataFrame({col: values[:self.size].tolist() for col, values in self.columns.items()})
+        return frame.astype({col: dtype for col, dtype in (dtypes or {}).items() if col in frame.columns})
+
+
+def select(frame, filters):
+    """Rows of frame whose columns match the filters (column=value or column=[values])."""
+    mask = np.ones(len(frame), dtype=bool)
+    for col, value in filters.items():
+        mask &= frame[col].isin(as_list(value)).values
+    return frame[mask].reset_index(drop=True)
+
+
+def wide_row(scenario_mops, intercepts=(), sams=()):
+    """
+    One scenario in the wide MOP layout: its scenario-level MOPs with the CM<i>_ columns of its intercepts after
+    Proportion_CMs_Intercepted and the SAM<i>_ columns of its SAMs after Proportion_SAMs_Identified (or at the end
+    when those are missing).
+    """
+    blocks = {INTERCEPT_BLOCK_AFTER: {f'CM{i}_{field}': value for i, event in enumerate(intercepts, start=1)
+                                      for field, value in event.items()},
+              SAM_BLOCK_AFTER: {f'SAM{i}_{field}': value for i, event in enumerate(sams, start=1)
+                                for field, value in event.items()}}
+    row = {}
+    for col, value in scenario_mops.items():
+        row[col] = value
+        row.update(blocks.pop(col, {}))
+    for block in blocks.values():
+        row.update(block)
+    return row
+
+
+class MOPStore:
+    """Scenario, intercept and SAM MOP tables of one or more flights (see the module docstring)."""
+
+    def __init__(self):
+        self.scenario_buffer = ColumnBuffer()
+        self.intercept_buffer = ColumnBuffer(INTERCEPT_COLUMNS)
+        self.sam_buffer = ColumnBuffer(SAM_COLUMNS)
+        # scenario row of each intercept and SAM row
+        self.intercept_rows = []
+        self.sam_rows = []
+
+    def __len__(self):
+        return self.scenario_buffer.size
+
+    def add_scenario(self, scenario_mops, intercepts=(), sams=()):
+        """
+        Append a scenario. Inputs are:
+        scenario_mops: dict of the scenario-level MOPs, including the EVENT_KEYS
+        intercepts: dicts of CM_FIELDS, one per intercepted CM in order of time to intercept
+        sams: dicts of SAM_FIELDS, one per SAM
+        """
+        row = self.scenario_buffer.size
+        self.scenario_buffer.append(scenario_mops)
+        keys = {key: scenario_mops.get(key, np.nan) for key in EVENT_KEYS}
+        for num, event in enumerate(intercepts, start=1):
+            self.intercept_buffer.append({**keys, 'CM_Num': num, **event})
+            self.intercept_rows.append(row)
+        for num, event in enumerate(sams, start=1):
+            self.sam_buffer.append({**keys, 'SAM_Num': num, **event})
+            self.sam_rows.append(row)
+
+    def scenarios(self, **filters):
+        """Scenario table, optionally filtered on any of its columns (e.g. Autonomy_Config='HH')."""
+        return select(self.scenario_buffer.frame(), filters)
+
+    def intercepts(self, **filters):
+        """Intercept table, optionally filtered on any of its columns (e.g. Autonomy_Config=['HA', 'AA'], CM_Num=1)."""
+        return select(self.intercept_buffer.frame(INTERCEPT_DTYPES), filters)
+
+    def sams(self, **filters):
+        """SAM table, optionally filtered on any of its columns."""
+        return select(self.sam_buffer.frame(SAM_DTYPES), filters)
+
+    def wide(self, first_row=0):
+        """
+        The wide MOP table, one row per scenario in the order they were added, as SHADOW writes it. first_row skips
+        the scenarios added before it (e.g. another flight's).
+        """
+        intercepts = [[] for _ in range(len(self))]
+        for i, row in enumerate(self.intercept_rows):
+            intercepts[row].append(self.intercept_buffer.row(i, CM_FIELDS))
+        sams = [[] for _ in range(len(self))]
+        for i, row in enumerate(self.sam_rows):
+            sams[row].append(self.sam_buffer.row(i, SAM_FIELDS))
+        return pd.DataFrame([wide_row(self.scenario_buffer.row(i), intercepts[i], sams[i])
+                             for i in range(first_row, len(self))])
+
+    def write(self, root):
+        """Write the three tables to <root>/Scenarios, Intercepts and SAMs (.parquet, or .pkl without pyarrow)."""
+        os.makedirs(root, exist_ok=True)
+        for table, name in TABLE_NAMES.items():
+            write_frame(getattr(self, table)(), os.path.join(root, name + TRACE_EXT))
+
+    @classmethod
+    def read(cls, root):
+        """Load the tables written by write."""
+        tables = {table: read_frame(os.path.join(root, name + TRACE_EXT)) for table, name in TABLE_NAMES.items()}
+        store = cls()
+        scenario_rows = {}
+        for scenario_mops in tables['scenarios'].to_dict('records'):
+            scenario_rows[tuple(str(scenario_mops[key]) for key in EVENT_KEYS)] = len(store)
+            store.scenario_buffer.append(scenario_mops)
+        for table, buffer, rows in [('intercepts', store.intercept_buffer, store.intercept_rows),
+                                    ('sams', store.sam_buffer, store.sam_rows)]:
+            for event in tables[table].to_dict('records'):
+                buffer.append(event)
+                rows.append(scenario_rows[tuple(str(event[key]) for key in EVENT_KEYS)])
+        return store
+
+    @classmethod
+    def from_wide(cls, mops_frames):
+        """
+        Store of wide MOP tables (a DataFrame or a list of them, e.g. read_flight_mops('Output')). The CM<i>_ and
+        SAM<i>_ blocks become intercept and SAM rows; blocks that are entirely empty are not events. wide() gives the
+        tables back with the same columns, though columns first used by later rows may come in another order.
+        """
+        store = cls()
+        for mops_df in ([mops_frames] if isinstance(mops_frames, pd.DataFrame) else mops_frames):
+            blocks = {'CM': {}, 'SAM': {}}
+            scenario_cols = []
+            for col in mops_df.columns:
+                match = re.fullmatch(r'(CM|SAM)(\d+)_(.+)', col)
+                if match is None:
+                    scenario_cols.append(col)
+                else:
+                    blocks[match.group(1)].setdefault(int(match.group(2)), []).append((match.group(3), col))
+            for record in mops_df.to_dict('records'):
+                events = {}
+                for kind, slots in blocks.items():
+                    events[kind] = [{field: record[col] for field, col in slots[i]} for i in sorted(slots)]
+                    events[kind] = [event for event in events[kind] if pd.notna(list(event.values())).any()]
+                store.add_scenario({col: record[col] for col in scenario_cols}, events['CM'], events['SAM'])
+        return store
+
+
+if __name__ == "__main__":
+    results_path = sys.argv[1] if len(sys.argv) > 1 else 'Output'
+    store_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(results_path, 'MOPStore')
+    store = MOPStore.from_wide(read_flight_mops(results_path))
+    store.write(store_path)
+    print(f'{len(store)} scenarios, {len(store.intercept_rows)} intercepts and {len(store.sam_rows)} SAMs '
+          f'written to {store_path}')
@@ -0,0 +1,357 @@
+"""
+MOP scoring, ported from Scoring_SHADOW/scoring_fnxn_avgs.m so the campaign is scored straight from the MOP table
+instead of through Scenario_C.xlsx/Scenario_D.xlsx and MATLAB. Every MOP is mapped to a score in [1, 2] (2 is best)
+and the scores are multiplied up into the Terminal Condition, Time Efficiency, SAM Identification, Engagement-Wide
+and Overall scores of each pilot and configuration, as in SCORES_Scenario_C/D_Summary.xlsx.
+
+TTI, time to consent, average SAM ID time and tactical comms are scored on exponential curves fitted to the whole
+campaign (scenarios C and D together) through two quantile anchors (fit_exp_curve, SCORE_CURVES); altitude deviation
+is scored against the campaign's best, and the terminal conditions on fixed curves. The curves are fitted on numpy
+arrays of the whole campaign at once, so re-scoring takes well under a second. bootstrap_scores resamples the scenarios
+of each scenario type and configuration, refits the curves and re-scores every replicate, giving percentile confidence
+intervals of each configuration's mean scores; the replicates are spread over a process pool.
+
+Example:
+    scenario_scores, intercept_scores, curves = score_campaign(read_mops_csv('SHADOW_MOPs.csv'))
+    summary = summarize_scores(scenario_scores)
+    cis = bootstrap_scores(read_mops_csv('SHADOW_MOPs.csv'), num_boot=2000, workers=4)
+"""
+
+# import libraries
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+SCORED_SCENARIOS = ['C', 'D']
+CONFIG_ORDER = ['HH', 'HA', 'AH', 'AA']
+SCORE_KEYS = ['Scenario_Type', 'Autonomy_Config', 'Lead_Pilot']
+EPS = np.finfo(float).eps
+
+# two-point exponential score curves 1 + exp(-max(0, x - b) / tau), tuned in scoring_fnxn_avgs.m: the q1 quantile of
+# the campaign's values scores about s1 and the q2 quantile s2. With 'base', b is the base quantile (the curve is
+# pinned at 2 there, fitExpTwoPointBaseQuantile); without it b is solved from the two anchors
+# (computeSAMTimeExpParamsTwoPoint, computeCommsExpParamsTwoPoint). 'offset' is added to x - b so no score is exactly 2.
+SCORE_CURVES = {
+    'TTI': {'mop': 'MOP_Time_to_Intercept_s', 'q1': 0.25, 's1': 1.70, 'q2': 0.65, 's2': 1.25, 'base': 0.01,
+            'offset': 0.0},
+    'TTC': {'mop': 'MOP_Time_to_Consent_s', 'q1': 0.20, 's1': 1.70, 'q2': 0.70, 's2': 1.35, 'base': 0.01,
+            'offset': 0.0},
+    'SAM_ID_Time': {'mop': 'Avg_SAM_ID_Time_s', 'q1': 0.28, 's1': 1.70, 'q2': 0.75, 's2': 1.25, 'base': None,
+                    'offset': 1e-9},
+    'Comms': {'mop': 'Num_Tactical_Comms', 'q1': 0.20, 's1': 1.85, 'q2': 0.70, 's2': 1.25, 'base': None,
+              'offset': 1e-9},
+}
+# integrated altitude deviation: 2 at the campaign's best, ALT_DEV_ANCHOR_SCORE at the ALT_DEV_ANCHOR_QUANTILE
+ALT_DEV_ANCHOR_QUANTILE = 0.65
+ALT_DEV_ANCHOR_SCORE = 1.25
+# altitude deviation count: a single deviation already drops the score to ALT_DEV_COUNT_SCORE_AT_1
+ALT_DEV_COUNT_SCORE_AT_1 = 1.8
+# terminal conditions at the intercept (grabTerminal_multi)
+NM_TO_FT = 6076.12
+TERMINAL_DISTANCE_TARGET_FT = 2000
+TERMINAL_DISTANCE_TAU_FT = 3000
+TERMINAL_ALTITUDE_TAU_FT = 150
+TERMINAL_AIRSPEED_TARGET_KT = 30
+TERMINAL_AIRSPEED_TAU_KT = 20
+TERMINAL_HEADING_TAU_DEG = 25
+
+INTERCEPT_SCORES = ['Distance_Score', 'Altitude_Score', 'Airspeed_Score', 'Heading_Score', 'TTI_Score',
+                    'Consent_Score']
+# scores of each scenario: averages over its intercepts, then the scenario-wide MOPs
+COMPONENT_SCORES = ['Avg_Distance_Score', 'Avg_Altitude_Score', 'Avg_Airspeed_Score', 'Avg_Heading_Score',
+                    'Avg_TTI_Score', 'Avg_TTC_Score', 'SAM_ID_Proportion_Score', 'SAM_ID_Time_Score',
+                    'AltDev_Integrated_Score', 'AltDev_Count_Score', 'Correct_Target_Sort_Score',
+                    'Comms_Density_Score', 'Pct_Intercepts_Completed_Score']
+# products of the component scores, as in the SCORES summary workbooks
+COMBINED_SCORES = ['Terminal_Condition_Score', 'Time_Efficiency_Score', 'SAM_Identification_Score',
+                   'AltDev_Overall_Score', 'Engagement_Wide_Score', 'Configuration_Overall_Score']
+# bootstrap replicates per pool task; fixed so the intervals depend on the seed only, not on the worker count
+BOOTSTRAP_CHUNK = 250
+
+
+def quantile(values, q):
+    """Quantile with MATLAB's prctile/quantile (midpoint) rule, which the curves were tuned with."""
+    return np.quantile(values, q, method='hazen')
+
+
+def fit_exp_curve(values, q1, s1, q2, s2, base=None):
+    """
+    Baseline b and decay tau of the score curve 1 + exp(-max(0, x - b) / tau) fitted to values (NaNs ignored):
+    the q1 quantile scores s1 and the q2 quantile s2, with 1 < s2 < s1 < 2. With base, b is the base quantile and
+    only the spread between the anchors sets tau (fitExpTwoPointBaseQuantile); otherwise both b and tau come from the
+    anchors and negative values are ignored (compute*ExpParamsTwoPoint). Returns (b, tau); (0, 1) without data.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if base is None:
+        values = values[values >= 0]
+    if values.size == 0:
+        return 0.0, 1.0
+    s1 = min(max(s1, 1 + 1e-6), 2 - 1e-6)
+    s2 = min(max(s2, 1 + 1e-6), 2 - 1e-6)
+
+    if base is not None:
+        b = quantile(values, base)
+        x1 = max(quantile(values, q1), b)
+        x2 = max(quantile(values, q2), b + EPS)
+        denom = np.log(s1 - 1) - np.log(s2 - 1)
+        if abs(denom) < 1e-12:
+            # degenerate anchors: fall back to the 10-90 spread
+            tau = max(1e-6, quantile(values, 0.9) - quantile(values, 0.1)) / 2
+        else:
+            tau = (x2 - x1) / denom
+        return float(b), float(max(tau, 1e-6))
+
+    q1, q2 = min(max(q1, 0), 1), min(max(q2, 0), 1)
+    if q2 <= q1:
+        q2 = min(q1 + 0.2, 0.99)
+    if s2 >= s1:
+        s2 = max(s1 - 0.1, 1.05)
+    x1, x2 = quantile(values, q1), quantile(values, q2)
+    if x2 <= x1:
+        x1, x2 = quantile(values, 0.25), quantile(values, 0.75)
+    denom = np.log((s1 - 1) / (s2 - 1))
+    if not np.isfinite(denom) or denom <= 0:
+        denom = np.log(2)
+    tau = (x2 - x1) / max(denom, EPS)
+    return float(x1 + tau * np.log(s1 - 1)), float(tau)
+
+
+def exp_score(values, b, tau, offset=0.0):
+    """
+    1 + exp(-(max(0, x - b) + offset) / tau), in [1, 2]. A missing value scores 2: scoring_fnxn_avgs.m takes
+    max(0, x - b) and MATLAB's max skips the NaN, so e.g. a CM that was not intercepted gets full TTI credit.
+    """
+    values = np.asarray(values, dtype=float)
+    delta = np.where(np.isnan(values), 0.0, np.maximum(values - b, 0.0))
+    return np.clip(1 + np.exp(-(delta + offset) / max(tau, EPS)), 1, 2)
+
+
+def cm_numbers(mops_df):
+    """The CM slots of a MOP table (CM<n>_MOP_Time_to_Intercept_s columns), in order."""
+    return sorted(int(match.group(1)) for match in
+                  (re.fullmatch(r'CM(\d+)_MOP_Time_to_Intercept_s', col) for col in mops_df.columns) if match)
+
+
+def scored_rows(mops_df):
+    """Rows of a MOP table that are scored: scenarios C and D with a lead pilot."""
+    scored = mops_df['Scenario_Type'].isin(SCORED_SCENARIOS) & mops_df['Lead_Pilot'].notna()
+    return mops_df[scored.values].reset_index(drop=True)
+
+
+def mop_arrays(mops_df):
+    """
+    The MOPs that are scored, as float arrays aligned with the rows of mops_df (already filtered by scored_rows):
+    one column per CM slot for the per-intercept MOPs. Missing or blank entries are NaN.
+    """
+    def numeric(col):
+        if col not in mops_df:
+            return np.full(len(mops_df), np.nan)
+        return pd.to_numeric(mops_df[col], errors='coerce').values.astype(float)
+
+    cms = cm_numbers(mops_df)
+    per_cm = lambda field: np.column_stack([numeric(f'CM{i}_{field}') for i in cms]) if cms else \
+        np.zeros((len(mops_df), 0))
+    correct_sort = mops_df['Correct_Sort'].astype(str).str.strip() if 'Correct_Sort' in mops_df else \
+        pd.Series('N', index=mops_df.index)
+    return {
+        'TTI': per_cm(SCORE_CURVES['TTI']['mop']),
+        'TTC': per_cm(SCORE_CURVES['TTC']['mop']),
+        'Distance': per_cm('Distance_from_CM_at_Intercept_nm'),
+        'Altitude': per_cm('Altitude_Offset_at_Intercept_ft'),
+        'Airspeed': per_cm('Airspeed_Diff_at_Intercept_kt'),
+        'Heading': per_cm('Heading_Diff_at_Intercept_deg'),
+        'SAM_ID_Time': numeric(SCORE_CURVES['SAM_ID_Time']['mop']),
+        'SAM_ID_Proportion': numeric('Proportion_SAMs_Identified'),
+        'Comms': numeric(SCORE_CURVES['Comms']['mop']),
+        'AltDev_Count': numeric('Lead_Altitude_Deviation_Count') + numeric('Wingman_Altitude_Deviation_Count'),
+        'AltDev_Integrated': numeric('Lead_Altitude_Deviation_Integrated_ft_s')
+                             + numeric('Wingman_Altitude_Deviation_Integrated_ft_s'),
+        'Correct_Sort': correct_sort.isin(['Y', 'y', 'Yes', 'YES', 'True', 'true', '1']).values.astype(float),
+        'Proportion_CMs_Intercepted': numeric('Proportion_CMs_Intercepted'),
+    }
+
+
+def take_rows(arrays, rows):
+    """mop_arrays restricted to (or resampled at) the given row positions."""
+    return {name: values[rows] for name, values in arrays.items()}
+
+
+def fit_curves(arrays):
+    """Fit every campaign-relative curve to mop_arrays. Returns {curve: (b, tau)}."""
+    curves = {name: fit_exp_curve(arrays[name], spec['q1'], spec['s1'], spec['q2'], spec['s2'], spec['base'])
+              for name, spec in SCORE_CURVES.items()}
+    integrated = arrays['AltDev_Integrated'][np.isfinite(arrays['AltDev_Integrated'])]
+    if integrated.size:
+        best = integrated.min()
+        anchor = quantile(integrated, ALT_DEV_ANCHOR_QUANTILE)
+        curves['AltDev_Integrated'] = (float(best), float(max((anchor - best) / np.log(1 / (ALT_DEV_ANCHOR_SCORE - 1)), EPS)))
+    else:
+        curves['AltDev_Integrated'] = (0.0, 1.0)
+    return curves
+
+
+def intercept_scores(arrays, curves):
+    """Per-intercept scores (rows x CM slots) of INTERCEPT_SCORES; NaN where a terminal condition is missing."""
+    distance_ft = arrays['Distance'] * NM_TO_FT
+    heading_excess = np.where(np.isnan(arrays['Heading']), 0.0, np.abs(arrays['Heading']))
+    return {
+        'Distance_Score': 1 + np.exp(-np.abs(distance_ft - TERMINAL_DISTANCE_TARGET_FT) / TERMINAL_DISTANCE_TAU_FT),
+        'Altitude_Score': 1 + np.exp(-np.abs(arrays['Altitude']) / TERMINAL_ALTITUDE_TAU_FT),
+        'Airspeed_Score': 1 + np.exp(-np.abs(TERMINAL_AIRSPEED_TARGET_KT - arrays['Airspeed']) / TERMINAL_AIRSPEED_TAU_KT),
+        # a missing heading difference scores 2, like the missing times in exp_score
+        'Heading_Score': 1 + np.exp(-heading_excess / TERMINAL_HEADING_TAU_DEG),
+        'TTI_Score': exp_score(arrays['TTI'], *curves['TTI'], offset=SCORE_CURVES['TTI']['offset']),
+        'Consent_Score': exp_score(arrays['TTC'], *curves['TTC'], offset=SCORE_CURVES['TTC']['offset']),
+    }
+
+
+def component_scores(arrays, curves):
+    """COMPONENT_SCORES of each row of mop_arrays, given the fitted curves."""
+    per_intercept = intercept_scores(arrays, curves)
+    # averages over a scenario's CM slots, with missing scores counted as 1
+    averages = {'Avg_' + name: np.nan_to_num(scores, nan=1.0).mean(axis=1) if scores.shape[1] else
+                np.ones(scores.shape[0]) for name, scores in per_intercept.items()}
+    b, tau = curves['AltDev_Integrated']
+    count = np.where(np.isnan(arrays['AltDev_Count']), 0.0, np.maximum(arrays['AltDev_Count'], 0.0))
+    return {
+        'Avg_Distance_Score': averages['Avg_Distance_Score'],
+        'Avg_Altitude_Score': averages['Avg_Altitude_Score'],
+        'Avg_Airspeed_Score': averages['Avg_Airspeed_Score'],
+        'Avg_Heading_Score': averages['Avg_Heading_Score'],
+        'Avg_TTI_Score': averages['Avg_TTI_Score'],
+        'Avg_TTC_Score': averages['Avg_Consent_Score'],
+        'SAM_ID_Proportion_Score': 1 + np.clip(np.nan_to_num(arrays['SAM_ID_Proportion'], nan=0.0), 0, 1),
+        'SAM_ID_Time_Score': exp_score(arrays['SAM_ID_Time'], *curves['SAM_ID_Time'],
+                                       offset=SCORE_CURVES['SAM_ID_Time']['offset']),
+        'AltDev_Integrated_Score': np.clip(1 + np.exp(-(arrays['AltDev_Integrated'] - b) / tau), 1, 2),
+        'AltDev_Count_Score': 1 + np.exp(-count * np.log(1 / (ALT_DEV_COUNT_SCORE_AT_1 - 1))),
+        'Correct_Target_Sort_Score': 1 + arrays['Correct_Sort'],
+        'Comms_Density_Score': exp_score(arrays['Comms'], *curves['Comms'], offset=SCORE_CURVES['Comms']['offset']),
+        'Pct_Intercepts_Completed_Score': 1 + np.clip(np.nan_to_num(arrays['Proportion_CMs_Intercepted'], nan=0.0), 0, 1),
+    }
+
+
+def combine_scores(scores):
+    """
+    Add COMBINED_SCORES to a dict (or DataFrame) of COMPONENT_SCORES. Components are clamped to [1, 2] and a
+    missing one counts as 1, as in scoring_fnxn_avgs.m.
+    """
+    part = {name: np.clip(np.nan_to_num(np.asarray(scores[name], dtype=float), nan=1.0), 1, 2)
+            for name in COMPONENT_SCORES}
+    # the integrated and count altitude scores are not clamped before their product
+    alt_dev = np.nan_to_num(np.asarray(scores['AltDev_Integrated_Score'], dtype=float)
+                            * np.asarray(scores['AltDev_Count_Score'], dtype=float), nan=1.0)
+    scores['Terminal_Condition_Score'] = part['Avg_Distance_Score'] * part['Avg_Altitude_Score'] \
+        * part['Avg_Airspeed_Score'] * part['Avg_Heading_Score']
+    scores['Time_Efficiency_Score'] = part['Avg_TTI_Score'] * part['Avg_TTC_Score']
+    scores['SAM_Identification_Score'] = np.asarray(scores['SAM_ID_Time_Score'], dtype=float) \
+        * np.asarray(scores['SAM_ID_Proportion_Score'], dtype=float)
+    scores['AltDev_Overall_Score'] = alt_dev
+    scores['Engagement_Wide_Score'] = alt_dev * part['Correct_Target_Sort_Score'] \
+        * part['Pct_Intercepts_Completed_Score'] * part['Comms_Density_Score']
+    scores['Configuration_Overall_Score'] = scores['Terminal_Condition_Score'] * scores['Time_Efficiency_Score'] \
+        * scores['SAM_Identification_Score'] * scores['Engagement_Wide_Score']
+    return scores
+
+
+def score_campaign(mops_df):
+    """
+    Score every C and D scenario of a (consolidated) MOP table, with the curves fitted to those scenarios.
+    Returns (scenario_scores, intercept_scores, curves): one row per scenario with its keys, COMPONENT_SCORES and
+    COMBINED_SCORES; one row per scenario and CM slot with the terminal conditions, times and INTERCEPT_SCORES;
+    and the fitted curves as {curve: (b, tau)}.
+    """
+    mops_df = scored_rows(mops_df)
+    arrays = mop_arrays(mops_df)
+    curves = fit_curves(arrays)
+    keys = mops_df[[col for col in ['Lead_Pilot', 'Flight_Number', 'Scenario_within_flight', 'Scenario_Type',
+                                    'Autonomy_Config'] if col in mops_df]].reset_index(drop=True)
+    scenario_scores = pd.concat([keys, pd.DataFrame(combine_scores(component_scores(arrays, curves)))], axis=1)
+
+    cms = cm_numbers(mops_df)
+    per_intercept = intercept_scores(arrays, curves)
+    columns = {'Distance_from_CM_at_Intercept_nm': arrays['Distance'],
+               'Altitude_Offset_at_Intercept_ft': arrays['Altitude'],
+               'Airspeed_Diff_at_Intercept_kt': arrays['Airspeed'], 'Heading_Diff_at_Intercept_deg': arrays['Heading'],
+               'MOP_Time_to_Intercept_s': arrays['TTI'], 'MOP_Time_to_Consent_s': arrays['TTC']}
+    columns.update(per_intercept)
+    intercepts = keys.loc[keys.index.repeat(len(cms))].reset_index(drop=True)
+    intercepts['Intercept_Num'] = np.tile(cms, len(keys))
+    for name, values in columns.items():
+        intercepts[name] = values.reshape(-1)
+    return scenario_scores, intercepts, curves
+
+
+def summarize_scores(scenario_scores):
+    """
+    Scores of each pilot in each scenario type and configuration, laid out like the SCORES summary workbooks:
+    component scores averaged over the pilot's scenarios, then combined. Sorted by scenario, configuration
+    (CONFIG_ORDER) and pilot.
+    """
+    summary = scenario_scores.groupby(SCORE_KEYS, sort=False)[COMPONENT_SCORES].mean().reset_index()
+    summary = combine_scores(summary)
+    order = summary['Autonomy_Config'].map({config: i for i, config in enumerate(CONFIG_ORDER)})
+    summary = summary.assign(_config=order, _pilot=summary['Lead_Pilot'].astype(str).str.lower())
+    summary = summary.sort_values(['Scenario_Type', '_config', '_pilot'], kind='stable')
+    return summary.drop(columns=['_config', '_pilot']).reset_index(drop=True)
+
+
+def config_means(arrays, strata, num_strata):
+    """Mean of every component and combined score over the rows of each stratum: (num_strata x scores)."""
+    scores = combine_scores(component_scores(arrays, fit_curves(arrays)))
+    counts = np.bincount(strata, minlength=num_strata)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.column_stack([np.bincount(strata, scores[name], minlength=num_strata) / counts
+                                for name in COMPONENT_SCORES + COMBINED_SCORES])
+
+
+def bootstrap_chunk(arrays, strata_rows, seed, num_boot):
+    """num_boot bootstrap replicates of config_means, resampling each stratum's rows with replacement."""
+    rng = np.random.default_rng(seed)
+    sizes = [rows.size for rows in strata_rows]
+    strata = np.repeat(np.arange(len(strata_rows)), sizes)
+    replicates = np.empty((num_boot, len(strata_rows), len(COMPONENT_SCORES + COMBINED_SCORES)))
+    for r in range(num_boot):
+        sample = np.concatenate([rows[rng.integers(0, rows.size, rows.size)] for rows in strata_rows])
+        replicates[r] = config_means(take_rows(arrays, sample), strata, len(strata_rows))
+    return replicates
+
+
+def bootstrap_scores(mops_df, num_boot=1000, level=0.95, seed=0, workers=None):
+    """
+    Percentile bootstrap confidence intervals of the mean scores of each scenario type and configuration.
+    Each replicate resamples the scenarios within every (Scenario_Type, Autonomy_Config) with replacement, refits the
+    campaign curves to the resample and re-scores it, so the intervals include the uncertainty of the fit.
+    Replicates run in chunks of BOOTSTRAP_CHUNK across a process pool (workers=1 runs them in this process), each
+    chunk with its own seed from seed, so the result does not depend on workers.
+    Returns a long-form DataFrame: Scenario_Type, Autonomy_Config, Num_Scenarios, Score, Mean, CI_Low, CI_High.
+    """
+    mops_df = scored_rows(mops_df)
+    arrays = mop_arrays(mops_df)
+    groups = mops_df.groupby(['Scenario_Type', 'Autonomy_Config'], sort=True).indices
+    strata_keys = list(groups)
+    strata_rows = [np.asarray(groups[key]) for key in strata_keys]
+    strata = np.repeat(np.arange(len(strata_rows)), [rows.size for rows in strata_rows])
+    point = config_means(take_rows(arrays, np.concatenate(strata_rows)), strata, len(strata_rows))
+
+    chunks = [min(BOOTSTRAP_CHUNK, num_boot - start) for start in range(0, num_boot, BOOTSTRAP_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    if workers == 1 or len(chunks) <= 1:
+        results = [bootstrap_chunk(arrays, strata_rows, chunk_seed, n) for chunk_seed, n in zip(seeds, chunks)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(bootstrap_chunk, [arrays] * len(chunks), [strata_rows] * len(chunks), seeds, chunks))
+    replicates = np.concatenate(results) if results else np.full((0,) + point.shape, np.nan)
+
+    alpha = (1 - level) / 2
+    with np.errstate(invalid='ignore'):
+        low, high = (np.nanquantile(replicates, [alpha, 1 - alpha], axis=0) if len(replicates)
+                     else (np.full(point.shape, np.nan),) * 2)
+    rows = []
+    for s, (scenario_type, config) in enumerate(strata_keys):
+        for j, name in enumerate(COMPONENT_SCORES + COMBINED_SCORES):
+            rows.append([scenario_type, config, strata_rows[s].size, name, point[s, j], low[s, j], high[s, j]])
+    return pd.DataFrame(rows, columns=['Scenario_Type', 'Autonomy_Config', 'Num_Scenarios', 'Score', 'Mean',
+                                       'CI_Low', 'CI_High'])
@@ -0,0 +1,144 @@
+# import libraries
+import os
+import numpy as np
+import pandas as pd
+from Utils.FlightCache import load_table, parse_sample_times
+from Utils.Exclusions import load_exclusions, apply_exclusions
+
+# pilot sensor streams joined to the scenario windows: file (by pilot and flight), cache table kind and value columns
+SENSOR_STREAMS = {
+    'Trust': {'path': os.path.join('Data', 'Trust', 'Trust_{}_{}.csv'), 'kind': 'trust', 'columns': ['RatingValue']},
+    'Workload': {'path': os.path.join('Data', 'Workload', 'Workload_{}_{}.csv'), 'kind': 'workload',
+                 'columns': ['ITPV', 'LogWorkload']},
+}
+WINDOW_STATS = ['Mean', 'Min', 'Max', 'Slope_per_min']
+# MOP columns added for each scenario: <stream>_Num_Samples and <stream>_<column>_<stat>
+SENSOR_STREAM_COLUMNS = []
+for _stream, _spec in SENSOR_STREAMS.items():
+    SENSOR_STREAM_COLUMNS.append(f'{_stream}_Num_Samples')
+    SENSOR_STREAM_COLUMNS.extend(f'{_stream}_{col}_{stat}' for col in _spec['columns'] for stat in WINDOW_STATS)
+
+
+def stream_path(stream, lead_pilot, flight_number, root='.'):
+    return os.path.join(root, SENSOR_STREAMS[stream]['path'].format(lead_pilot, flight_number))
+
+
+def load_stream(stream, lead_pilot, flight_number, root='.'):
+    """
+    A sortie's Trust or Workload table sorted by SampleTime, through the table cache and with the sortie's exclusion
+    windows dropped. Returns None if the sortie has no such file.
+    """
+    path = stream_path(stream, lead_pilot, flight_number, root)
+    if not os.path.exists(path):
+        return None
+    table = parse_sample_times(load_table(path, SENSOR_STREAMS[stream]['kind']))
+    table = apply_exclusions(table, load_exclusions(lead_pilot, flight_number, root))
+    return table.sort_values('SampleTime', kind='stable').reset_index(drop=True)
+
+
+def window_rows(times, starts, ends):
+    """Row range [lo, hi) of the sorted times (datetime64) inside each window [start, end], ends included."""
+    times = np.asarray(times).astype('datetime64[ns]')
+    lo = np.searchsorted(times, np.asarray(starts).astype('datetime64[ns]'), side='left')
+    hi = np.searchsorted(times, np.asarray(ends).astype('datetime64[ns]'), side='right')
+    return lo, np.maximum(hi, lo)
+
+
+def anchor_to_day(times, day):
+    """
+    The times of day of times (datetime64) on the date day, as exclusion_mask matches them. Lets windows from MOPs
+    written before SampleTime was anchored to SampleDate (which carry the reduction's run date) meet the stream.
+    """
+    times = np.asarray(times).astype('datetime64[ns]')
+    return np.datetime64(day, 'D').astype('datetime64[ns]') + (times - times.astype('datetime64[D]'))
+
+
+def interval_stats(times, values, lo, hi):
+    """
+    Mean, min, max and least-squares slope (per minute) of values over the row ranges [lo, hi) of each window, in
+    one pass over every window. times (datetime64) and values are aligned arrays sorted by time within each range;
+    NaN values are skipped. Windows without samples get NaN. Returns a dict of arrays keyed by WINDOW_STATS plus 'n'.
+    """
+    times = np.asarray(times).astype('datetime64[ns]').view('int64')
+    values = np.asarray(values, dtype=float)
+    num_windows = len(lo)
+    lengths = hi - lo
+    # gather the rows of every window back to back, each tagged with its window
+    offsets = np.cumsum(lengths) - lengths
+    rows = np.arange(lengths.sum()) - np.repeat(offsets - lo, lengths)
+    window = np.repeat(np.arange(num_windows), lengths)
+    keep = ~np.isnan(values[rows])
+    rows, window = rows[keep], window[keep]
+    v = values[rows]
+    n = np.bincount(window, minlength=num_windows)
+
+    stats = {'n': n}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(window, v, minlength=num_windows) / n
+        stats['Mean'] = mean
+        # the kept rows are still grouped by window, so reduceat over the first row of each non-empty window
+        firsts = np.flatnonzero(n)
+        starts = np.cumsum(n) - n
+        stats['Min'] = np.full(num_windows, np.nan)
+        stats['Max'] = np.full(num_windows, np.nan)
+        if firsts.size:
+            stats['Min'][firsts] = np.minimum.reduceat(v, starts[firsts])
+            stats['Max'][firsts] = np.maximum.reduceat(v, starts[firsts])
+        # slope from times relative to each window's first sample, centred on their mean, so precision is not lost
+        t = (times[rows] - times[rows][starts[window]]) / 1e9 if rows.size else np.zeros(0)
+        dt = t - (np.bincount(window, t, minlength=num_windows) / n)[window]
+        sxx = np.bincount(window, dt * dt, minlength=num_windows)
+        sxy = np.bincount(window, dt * (v - mean[window]), minlength=num_windows)
+        stats['Slope_per_min'] = np.where(sxx > 0, 60 * sxy / sxx, np.nan)
+    return stats
+
+
+def sensor_stream_mops(mops_df, root='.'):
+    """
+    Trust and workload MOPs of each scenario row of a MOP table (one flight's or several flights'), aggregated
+    over exactly the window SHADOW scored: Scenario_Start_Time to Scenario_End_Time, i.e. with the Delta 7:15 cap
+    and the end at the last CM. Every sample in the window is used. The windows are matched on time of day, on the
+    date of the flight's stream (anchor_to_day), so MOPs stamped with another date still find their samples.
+    Each stream is read once per flight and the windows of all flights are aggregated together (interval_stats).
+    Returns a DataFrame of SENSOR_STREAM_COLUMNS aligned with mops_df.
+    """
+    starts = pd.to_datetime(mops_df['Scenario_Start_Time']).values
+    ends = pd.to_datetime(mops_df['Scenario_End_Time']).values
+    flights = list(zip(mops_df['Lead_Pilot'].astype(str), mops_df['Flight_Number'].astype(str)))
+    stream_mops = pd.DataFrame(index=mops_df.index, columns=SENSOR_STREAM_COLUMNS, dtype=float)
+
+    for stream, spec in SENSOR_STREAMS.items():
+        # concatenate the flights' streams, with each window's row range offset into the combined arrays
+        times, values = [], {col: [] for col in spec['columns']}
+        lo = np.zeros(len(mops_df), dtype=int)
+        hi = np.zeros(len(mops_df), dtype=int)
+        has_stream = np.zeros(len(mops_df), dtype=bool)
+        offset = 0
+        for flight in dict.fromkeys(flights):
+            table = load_stream(stream, *flight, root)
+            if table is None:
+                continue
+            rows = np.array([f == flight for f in flights])
+            day = table['SampleTime'].values[0].astype('datetime64[D]')
+            flight_starts, flight_ends = anchor_to_day(starts[rows], day), anchor_to_day(ends[rows], day)
+            # a window running over midnight ends on the next day
+            flight_ends = np.where(flight_ends < flight_starts, flight_ends + np.timedelta64(1, 'D'), flight_ends)
+            lo[rows], hi[rows] = window_rows(table['SampleTime'].values, flight_starts, flight_ends)
+            lo[rows] += offset
+            hi[rows] += offset
+            has_stream |= rows
+            offset += len(table)
+            times.append(table['SampleTime'].values.astype('datetime64[ns]'))
+            for col in spec['columns']:
+                values[col].append(pd.to_numeric(table[col], errors='coerce').values)
+        if not times:
+            continue
+
+        times = np.concatenate(times)
+        # flights without the stream keep NaN rather than zero samples
+        stream_mops.loc[has_stream, f'{stream}_Num_Samples'] = (hi - lo)[has_stream]
+        for col in spec['columns']:
+            stats = interval_stats(times, np.concatenate(values[col]), lo, hi)
+            for stat in WINDOW_STATS:
+                stream_mops[f'{stream}_{col}_{stat}'] = stats[stat]
+    return stream_mops
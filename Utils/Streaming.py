@@ -0,0 +1,69 @@
+# import data analysis libraries
+import numpy as np
+import pandas as pd
+from Utils.FlightCache import TABLE_SPECS, parse_sample_times
+
+SCENARIO_KEYS = ['Scenario', 'Configuration']
+
+
+def scenario_extents(path, chunksize=200000):
+    """
+    Cheap first pass over a DIS CSV (only the Scenario/Configuration columns are parsed).
+    Returns a dict mapping (Scenario, Configuration) to the last row number of that window in the file.
+    """
+    last_row = {}
+    offset = 0
+    for chunk in pd.read_csv(path, usecols=SCENARIO_KEYS, chunksize=chunksize, low_memory=False):
+        rows = pd.Series(np.arange(offset, offset + len(chunk)))
+        for key, row in rows.groupby([chunk[col].values for col in SCENARIO_KEYS]).max().items():
+            last_row[key] = row
+        offset += len(chunk)
+    return last_row
+
+
+def stream_scenario_windows(path, keys=None, chunksize=200000, kind='flight'):
+    """
+    Read a DIS CSV in chunks and yield each scenario window as soon as its last row has been read. Inputs are:
+    path: DIS entity state CSV (rows in time order, as recorded)
+    keys: (Scenario, Configuration) windows to keep; rows of any other window are dropped as they are read
+    chunksize: rows per chunk
+    kind: TABLE_SPECS entry giving the columns to read
+    Rows are routed to their window chunk by chunk, so only the open windows (normally one) are held in memory,
+    never the whole sortie. A window that is flown in more than one piece stays open until its last piece.
+    Yields ((Scenario, Configuration), window DataFrame) in the order the windows end in the file.
+    """
+    last_row = scenario_extents(path, chunksize)
+    if keys is not None:
+        keys = set(keys)
+        last_row = {key: row for key, row in last_row.items() if key in keys}
+
+    wanted = TABLE_SPECS[kind]['columns']
+    usecols = None if wanted is None else (lambda col: col in wanted)
+    buffers = {}
+    offset = 0
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize, low_memory=False):
+        chunk = parse_sample_times(chunk)
+        for key, part in chunk.groupby(SCENARIO_KEYS, sort=False):
+            if key in last_row:
+                buffers.setdefault(key, []).append(part)
+        offset += len(chunk)
+        # windows whose last row has been read are complete
+        for key in [key for key in buffers if last_row[key] < offset]:
+            yield key, pd.concat(buffers.pop(key), ignore_index=True)
+
+
+def time_window(source, start_time, end_time, time_col='SampleTime'):
+    """
+    Rows of a time-sorted source table needed for a nearest-time join over [start_time, end_time]: every sample
+    inside the interval plus the nearest sample time on either side (with all of its duplicates).
+    """
+    times = source[time_col].values
+    if times.size == 0:
+        return source
+    lo = np.searchsorted(times, np.datetime64(start_time), side='left')
+    if lo > 0:
+        lo = np.searchsorted(times, times[lo - 1], side='left')
+    hi = np.searchsorted(times, np.datetime64(end_time), side='right')
+    if hi < times.size:
+        hi = np.searchsorted(times, times[hi], side='right')
+    return source.iloc[lo:hi]
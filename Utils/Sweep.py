@@ -0,0 +1,151 @@
+# import libraries
+import itertools
+import numpy as np
+import pandas as pd
+from Utils.DataReduction import INTERCEPT_CRITERIA, ROLE_PBU_SITES, view_pairs, finalize_intercept
+from Utils.Kinematics import relative_geometry
+
+# sentinels for masked times in int64 ns comparisons
+NAT = np.iinfo(np.int64).min
+LATEST = np.iinfo(np.int64).max
+
+
+def criteria_grid(**values):
+    """
+    Every combination of the given threshold values, keyed by INTERCEPT_CRITERIA name (e.g. distance_nm=[1, 1.5, 2]).
+    Thresholds that are not given keep their default. Returns a DataFrame with one row per threshold set.
+    """
+    unknown = set(values) - set(INTERCEPT_CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown intercept criteria: {sorted(unknown)}")
+    axes = [list(np.atleast_1d(values.get(name, INTERCEPT_CRITERIA[name]))) for name in INTERCEPT_CRITERIA]
+    return pd.DataFrame(list(itertools.product(*axes)), columns=list(INTERCEPT_CRITERIA))
+
+
+class ScenarioSweep:
+    """
+    Intercept scoring of one scenario under every threshold set of a grid (see criteria_grid).
+    The CM/aircraft samples are paired and their geometry computed once, at the widest match tolerance; a narrower
+    tolerance only drops pairs further apart than it, since each CM sample is always paired with its nearest aircraft
+    sample. Each CM/role track is then scored for all threshold sets at once with (set x sample) array comparisons,
+    giving the same events as ScenarioIntercepts built with each set's criteria.
+    """
+
+    def __init__(self, scenario_view, tasking_index, scenario_alts, cm_ids, grid):
+        """
+        scenario_view: ScenarioView (with kinematics) of the scenario as scored
+        tasking_index: TaskingIndex of the sortie
+        scenario_alts: assigned altitude of each role ('Lead'/'Wingman')
+        cm_ids: EntIds of the CMs to score
+        grid: DataFrame of threshold sets (criteria_grid)
+        """
+        self.grid = grid.reset_index(drop=True)
+        self.events = [{} for _ in range(len(grid))]
+        thresholds = {name: self.grid[name].values.astype(float) for name in INTERCEPT_CRITERIA}
+        tolerance_ns = (self.grid['match_tolerance_ms'].values.astype(float) * 1e6)[:, None]
+        start_time = scenario_view.start_time
+        data = scenario_view.data
+        times = data['Timestamp'].values.astype('datetime64[ns]').view('int64')
+        cm_ent_ids = data['EntId'].values
+
+        for role, scenario_alt in scenario_alts.items():
+            cm_rows, ac_rows = view_pairs(scenario_view, cm_ids, role, self.grid['match_tolerance_ms'].max())
+            matched = ac_rows >= 0
+            geometry = relative_geometry(scenario_view.kinematics.take(ac_rows), scenario_view.kinematics.take(cm_rows))
+            match_dt = np.where(matched, np.abs(times[cm_rows] - times[np.maximum(ac_rows, 0)]), LATEST)
+            ac_time = data['SampleTime'].values[np.maximum(ac_rows, 0)]
+            ac_time[~matched] = np.datetime64('NaT')
+
+            for cm_index in cm_ids:
+                track = np.flatnonzero(cm_ent_ids[cm_rows] == cm_index)
+                if track.size == 0:
+                    continue
+                # (set x sample): which pairs each set keeps, and where its intercept criteria are met
+                valid = match_dt[track][None, :] <= tolerance_ns
+                distance = geometry['distance_nm'][track]
+                criteria = valid & (distance[None, :] <= thresholds['distance_nm'][:, None]) \
+                    & (geometry['angle_between_pos'][track][None, :] <= thresholds['trailing_cone_deg'][:, None]) \
+                    & (geometry['angle_between_pos_nose'][track][None, :] <= thresholds['nose_cone_deg'][:, None])
+                met = criteria.any(axis=1)
+                if not met.any():
+                    continue
+
+                track_time = ac_time[track]
+                t_ac = track_time.astype('datetime64[ns]').view('int64')
+                cm_last_time = data['SampleTime'].iloc[cm_rows[track]].max()
+                kill_times = {window: tasking_index.kill_time(ROLE_PBU_SITES[role], cm_index, cm_last_time, window)
+                              for window in np.unique(thresholds['kill_window_s'][met])}
+                kill_ns = np.array([pd.Timestamp(kill_times[window]).value if window in kill_times else NAT
+                                    for window in thresholds['kill_window_s']])[:, None]
+
+                # samples up to the kill: the aircraft state at the kill is the last of them, the intercept time the
+                # last rise of the criteria among them (else the first time the criteria were met)
+                before = valid & (t_ac[None, :] <= kill_ns)
+                at_kill = np.where(before, t_ac[None, :], NAT).argmax(axis=1)
+                positions = np.broadcast_to(np.arange(track.size), before.shape)
+                last_before = np.maximum.accumulate(np.where(before, positions, -1), axis=1)
+                previous = np.concatenate([np.full((len(before), 1), -1), last_before[:, :-1]], axis=1)
+                previous_met = np.take_along_axis(criteria, np.maximum(previous, 0), axis=1) & (previous >= 0)
+                rising = before & criteria & ~previous_met
+                last_rise = np.where(rising, t_ac[None, :], NAT).argmax(axis=1)
+                first_met = np.where(criteria, t_ac[None, :], LATEST).argmin(axis=1)
+                intercept = np.where(rising.any(axis=1), last_rise, first_met)
+                in_meld = valid & (distance[None, :] <= thresholds['meld_range_nm'][:, None])
+                meld_entry = np.where(in_meld, t_ac[None, :], LATEST).argmin(axis=1)
+                aspect = geometry['angle_between_vel'][track]
+
+                for s in np.flatnonzero(met):
+                    cm_row, ac_row = cm_rows[track[at_kill[s]]], ac_rows[track[at_kill[s]]]
+                    cm_kill_time = kill_times[thresholds['kill_window_s'][s]]
+                    cm_int_time = pd.Timestamp(track_time[intercept[s]])
+                    airspeed_at_intercept = data['CalibratedAirspeed'].iloc[ac_row]
+                    heading_at_intercept = data['Heading'].iloc[ac_row]
+                    cm_heading_at_intercept = data['Heading'].iloc[cm_row]
+                    altitude_at_intercept = data['Altitude'].iloc[ac_row]
+                    lookback_time = track_time.copy()
+                    lookback_time[~valid[s]] = np.datetime64('NaT')
+                    self.events[s][(cm_index, role)] = {
+                        'Interceptor Role': role,
+                        'CM_Index': cm_index,
+                        'Intercept_Time': cm_int_time,
+                        'Time_to_Consent_s': max((cm_kill_time - cm_int_time).total_seconds(), 0),
+                        'Time_to_Intercept_s_from_start': (cm_kill_time - start_time).total_seconds(),
+                        'Airspeed_at_Intercept_kt': airspeed_at_intercept,
+                        'Airspeed_Diff_at_Intercept_kt': airspeed_at_intercept - data['CM_Airspeed'].iloc[ac_row],
+                        'Heading_at_Intercept_deg': heading_at_intercept,
+                        'CM_Heading_at_Intercept_deg': cm_heading_at_intercept,
+                        'Heading_Diff_at_Intercept_deg': (heading_at_intercept - cm_heading_at_intercept + 180) % 360 - 180,
+                        'Altitude_at_Intercept_ft': altitude_at_intercept,
+                        'Altitude_Offset_at_Intercept_ft': np.abs(altitude_at_intercept - scenario_alt),
+                        'Bank_Angle_at_Intercept_deg': data['Roll'].iloc[ac_row],
+                        'Distance_from_CM_at_Intercept_nm': geometry['distance_nm'][track[at_kill[s]]],
+                        'CM_Kill_Time': cm_kill_time,
+                        'CM_Int_Time': cm_int_time,
+                        'MELD_Entry_Time': pd.Timestamp(track_time[meld_entry[s]]) if in_meld[s].any() else pd.NaT,
+                        'Lookback_Time': lookback_time,
+                        'Lookback_Aspect': np.where(valid[s], aspect, np.nan),
+                    }
+
+    def intercepts(self, s):
+        """The scenario's intercepts under threshold set s, with the interface cm_intercept_mops reads."""
+        return SweepIntercepts(self.events[s])
+
+
+class SweepIntercepts:
+    """ScenarioIntercepts look-alike over the precomputed events of one threshold set."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def evaluate(self, cm_index, role):
+        return self.events.get((cm_index, role))
+
+    def interceptor_role(self, cm_index):
+        """Role credited with the intercept of this CM - the Lead takes precedence - or None if not intercepted."""
+        for role in ['Lead', 'Wingman']:
+            if self.evaluate(cm_index, role) is not None:
+                return role
+        return None
+
+    def event(self, cm_index, role, previous_int_time=None):
+        return finalize_intercept(self.evaluate(cm_index, role), previous_int_time)
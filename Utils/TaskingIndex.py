@@ -0,0 +1,80 @@
+# import data analysis libraries
+import numpy as np
+import pandas as pd
+from Utils.FlightCache import parse_sample_times
+
+
+class TaskingIndex:
+    """
+    Lookups over a sortie's DIS tasking PDUs (Data/Tasking/Tasking_<pilot>_<flight>.csv), built once per flight.
+    KILL PDUs are held by (firing site, target entity) and as a sorted time array per firing site, and REQUEST
+    PDUs as the first time each distinct (RequestID, RequestStatus) pair reached a receiving site in each
+    Scenario/Configuration (built on first use), so the reduction never rescans the tasking table.
+    KILL PDUs without a SampleTime are ignored.
+    """
+
+    def __init__(self, tasking_data):
+        self.tasking_data = tasking_data
+        self._request_times = None
+
+        # KILL PDUs are a handful of rows - index them with plain dicts
+        rows = np.flatnonzero((tasking_data['PduType'] == 'KILL').values)
+        times = sample_times(tasking_data, rows)
+        order = np.argsort(times, kind='stable')
+        order = order[~np.isnat(times[order])]
+        self.first_kill = {}
+        self.site_kill_times = {}
+        for kill_time, site, target in zip(times[order], tasking_data['FiringEntityID_Site'].values[rows[order]],
+                                           tasking_data['TargetEntityID_Entity'].values[rows[order]]):
+            self.first_kill.setdefault((site, target), kill_time)
+            self.site_kill_times.setdefault(site, []).append(kill_time)
+        self.site_kill_times = {site: np.array(times) for site, times in self.site_kill_times.items()}
+
+    @property
+    def request_times(self):
+        """First time each distinct (RequestID, RequestStatus) pair was received, keyed by (Scenario, Configuration, site)."""
+        if self._request_times is None:
+            keys = ['Scenario', 'Configuration', 'ReceivingEntityID_Site', 'RequestID', 'RequestStatus']
+            requests = self.tasking_data[keys].copy()
+            requests['SampleTime'] = sample_times(self.tasking_data, np.arange(len(self.tasking_data)))
+            requests = requests.groupby(keys, dropna=False, observed=True)['SampleTime'].min()
+            self._request_times = {key: np.sort(times.values)
+                                   for key, times in requests.groupby(level=[0, 1, 2], dropna=False, observed=True)}
+        return self._request_times
+
+    def kill_time(self, site, cm_index, cm_last_time, max_delay_s=10):
+        """
+        Kill time of a CM, resolved as score_intercept always has:
+        1. the first KILL from this site that targets the CM;
+        2. otherwise the site's KILL nearest to when the CM was last seen, if it is no more than max_delay_s after it;
+        3. otherwise the time the CM was last seen.
+        """
+        if (site, cm_index) in self.first_kill:
+            return pd.Timestamp(self.first_kill[(site, cm_index)])
+        times = self.site_kill_times.get(site)
+        if times is None or times.size == 0:
+            return cm_last_time
+        # nearest kill on either side of cm_last_time (the earlier one on a tie)
+        i = np.searchsorted(times, np.datetime64(cm_last_time), side='left')
+        candidates = times[max(i - 1, 0):i + 1]
+        nearest = pd.Timestamp(candidates[np.argmin(np.abs(candidates - np.datetime64(cm_last_time)))])
+        if (nearest - cm_last_time).total_seconds() <= max_delay_s:
+            return nearest
+        return cm_last_time
+
+    def request_count(self, scenario, config, site, end_time=None):
+        """Number of distinct (RequestID, RequestStatus) pairs received by site in a scenario window, up to end_time."""
+        times = self.request_times.get((scenario, config, site))
+        if times is None:
+            return 0
+        if end_time is None:
+            return len(times)
+        return int(np.searchsorted(times, np.datetime64(end_time), side='right'))
+
+
+def sample_times(tasking_data, rows):
+    """Parsed SampleTime (datetime64) of the given row positions of the tasking table."""
+    if pd.api.types.is_datetime64_any_dtype(tasking_data['SampleTime']):
+        return tasking_data['SampleTime'].values[rows]
+    time_cols = [col for col in ('SampleDate', 'SampleTime') if col in tasking_data.columns]
+    return parse_sample_times(tasking_data.iloc[rows][time_cols].copy())['SampleTime'].values
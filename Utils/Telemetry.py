@@ -0,0 +1,266 @@
+"""
+Run telemetry for the reduction pipeline. A RunReport records, for one flight, the wall time and memory high-water
+mark of each pipeline stage (overall and per scenario) and how often the intercept scoring functions were called,
+and writes them as JSON (<report_dir>/Run_<pilot>_Flight<n>.json). campaign_rollup sums the flight reports of a
+batch run into Campaign_Report.json. With profile=True the flight also runs under cProfile (the hottest functions
+go in the report and the full profile next to it as a .prof file) and tracemalloc (Python allocation peak per stage).
+
+SHADOW.py marks its stages with stage(); they cost nothing measurable when no report is active.
+Stages: load, parse_times, airspeed_merge, index, scenario_slice, altitude_deviation, intercept_evaluation,
+trace_write, sam_id, tasking, sensor_streams, write. Stages do not nest.
+
+Example:
+    with RunReport('Chan', 3) as report:
+        mops_df = reduce_flight('Chan', 3)
+    report.write('Output/Reports')
+    python -m Utils.Telemetry Output/Reports    # print the campaign rollup of the reports in a folder
+"""
+
+# import libraries
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import platform
+import contextlib
+import tracemalloc
+from datetime import datetime, timezone
+try:
+    import resource  # not available on Windows
+except ImportError:
+    resource = None
+
+REPORT_VERSION = 1
+ROLLUP_NAME = 'Campaign_Report.json'
+# number of functions (by cumulative time) kept from a cProfile run
+PROFILE_TOP = 30
+
+# the RunReport being recorded in this process, if any (each batch worker reduces one flight at a time)
+active_report = None
+
+
+def peak_rss_mb():
+    """High-water mark of the process's resident memory (MB), or None where the resource module is missing."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / 2**20 if sys.platform == 'darwin' else peak / 2**10, 1)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Record a pipeline stage in the active report (a no-op when there is none)."""
+    if active_report is None:
+        yield
+    else:
+        with active_report.stage(name):
+            yield
+
+
+@contextlib.contextmanager
+def scenario(scenario_num):
+    """Attribute the stages run inside to a scenario of the active report (a no-op when there is none)."""
+    if active_report is None:
+        yield
+    else:
+        previous = active_report.current_scenario
+        active_report.current_scenario = str(scenario_num)
+        try:
+            yield
+        finally:
+            active_report.current_scenario = previous
+
+
+def count_call(name):
+    """Count a call of name in the active report."""
+    if active_report is not None:
+        active_report.counts[name] = active_report.counts.get(name, 0) + 1
+
+
+def timed_iter(name, iterable):
+    """Iterate over iterable, recording the time spent producing each item as stage name (e.g. chunked reads)."""
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class RunReport:
+    """Stage timings, memory and call counts of one flight's reduction (see the module docstring)."""
+
+    def __init__(self, lead_pilot, flight_number, profile=False):
+        self.lead_pilot = lead_pilot
+        self.flight_number = flight_number
+        self.profile = profile
+        self.stages = {}
+        self.scenarios = {}
+        self.counts = {}
+        self.current_scenario = None
+        self.started = None
+        self.total_seconds = None
+        self.error = None
+        self.profiler = None
+        self.profile_stats = None
+        self._start = None
+        self._previous = None
+
+    def __enter__(self):
+        global active_report
+        self._previous, active_report = active_report, self
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        if self.profile:
+            tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global active_report
+        self.total_seconds = time.perf_counter() - self._start
+        if self.profile:
+            self.profiler.disable()
+            self.profile_stats = pstats.Stats(self.profiler)
+            tracemalloc.stop()
+        if exc_type is not None:
+            self.error = '{}: {}'.format(exc_type.__name__, exc)
+        active_report = self._previous
+        return False
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a stage; its totals accumulate over repeated calls (e.g. once per scenario)."""
+        tracing = self.profile and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            traced_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stats['calls'] += 1
+            stats['seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            stats['peak_rss_mb'] = peak_rss_mb()
+            if tracing:
+                traced_peak = (tracemalloc.get_traced_memory()[1] - traced_start) / 2**20
+                stats['traced_peak_mb'] = round(max(stats.get('traced_peak_mb', 0.0), traced_peak), 1)
+            if self.current_scenario is not None:
+                scenario_stages = self.scenarios.setdefault(self.current_scenario, {})
+                scenario_stages[name] = scenario_stages.get(name, 0.0) + elapsed
+
+    def hot_functions(self):
+        """The PROFILE_TOP functions with the most cumulative time in the cProfile run (empty without profile)."""
+        if self.profile_stats is None:
+            return []
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in self.profile_stats.stats.items():
+            rows.append({'function': '{}:{}({})'.format(os.path.basename(filename), line, function),
+                         'calls': calls, 'total_s': round(total, 4), 'cumulative_s': round(cumulative, 4)})
+        rows.sort(key=lambda row: row['cumulative_s'], reverse=True)
+        return rows[:PROFILE_TOP]
+
+    def to_dict(self):
+        total = self.total_seconds or 0.0
+        attributed = sum(stats['seconds'] for stats in self.stages.values())
+        return {
+            'version': REPORT_VERSION,
+            'lead_pilot': self.lead_pilot,
+            'flight_number': str(self.flight_number),
+            'started': self.started,
+            'ok': self.error is None,
+            'error': self.error,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_seconds': round(total, 4),
+            'unattributed_seconds': round(max(total - attributed, 0.0), 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': {name: dict(stats, seconds=round(stats['seconds'], 4), max_seconds=round(stats['max_seconds'], 4))
+                       for name, stats in self.stages.items()},
+            'scenarios': {num: {name: round(seconds, 4) for name, seconds in stages.items()}
+                          for num, stages in self.scenarios.items()},
+            'counts': dict(self.counts),
+            'profile': self.hot_functions(),
+        }
+
+    def write(self, report_dir='Output/Reports'):
+        """Write the report as JSON (and the full cProfile stats when profiling). Returns the JSON path."""
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, 'Run_{}_Flight{}.json'.format(self.lead_pilot, self.flight_number))
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        if self.profile_stats is not None:
+            self.profile_stats.dump_stats(path[:-len('.json')] + '.prof')
+        return path
+
+
+def read_reports(paths):
+    """Load flight reports from a list of JSON paths or a folder of Run_*.json files."""
+    if isinstance(paths, str):
+        paths = [os.path.join(paths, name) for name in sorted(os.listdir(paths))
+                 if name.startswith('Run_') and name.endswith('.json')]
+    reports = []
+    for path in paths:
+        with open(path) as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def campaign_rollup(reports):
+    """
+    Campaign summary of flight reports: stage totals with their share of the summed flight time, call counts,
+    and one line per flight, slowest first.
+    """
+    total = sum(report['total_seconds'] for report in reports)
+    stages, counts = {}, {}
+    for report in reports:
+        for name, stats in report['stages'].items():
+            rollup = stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            rollup['calls'] += stats['calls']
+            rollup['seconds'] += stats['seconds']
+            rollup['max_seconds'] = max(rollup['max_seconds'], stats['max_seconds'])
+        for name, calls in report['counts'].items():
+            counts[name] = counts.get(name, 0) + calls
+    for rollup in stages.values():
+        rollup['seconds'] = round(rollup['seconds'], 4)
+        rollup['share'] = round(rollup['seconds'] / total, 4) if total else 0.0
+    flights = [{'lead_pilot': report['lead_pilot'], 'flight_number': report['flight_number'], 'ok': report['ok'],
+                'total_seconds': report['total_seconds'], 'peak_rss_mb': report['peak_rss_mb'],
+                'num_scenarios': len(report['scenarios'])} for report in reports]
+    flights.sort(key=lambda flight: flight['total_seconds'], reverse=True)
+    return {'version': REPORT_VERSION, 'num_flights': len(reports),
+            'num_failed': sum(not report['ok'] for report in reports), 'total_seconds': round(total, 4),
+            'stages': dict(sorted(stages.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+            'counts': counts, 'flights': flights}
+
+
+def write_rollup(reports, report_dir='Output/Reports'):
+    """Write the campaign_rollup of reports to <report_dir>/Campaign_Report.json. Returns the rollup."""
+    rollup = campaign_rollup(reports)
+    os.makedirs(report_dir, exist_ok=True)
+    with open(os.path.join(report_dir, ROLLUP_NAME), 'w') as f:
+        json.dump(rollup, f, indent=1)
+    return rollup
+
+
+def print_rollup(rollup):
+    print('{:<22}{:>8}{:>11}{:>8}'.format('stage', 'calls', 'seconds', 'share'))
+    for name, stats in rollup['stages'].items():
+        print('{:<22}{:>8}{:>11.2f}{:>7.1f}%'.format(name, stats['calls'], stats['seconds'], 100 * stats['share']))
+    for name, calls in rollup['counts'].items():
+        print(f'{name}: {calls} calls')
+    print(f"{rollup['num_flights']} flights ({rollup['num_failed']} failed), {rollup['total_seconds']:.1f} s summed")
+
+
+if __name__ == "__main__":
+    report_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join('Output', 'Reports')
+    print_rollup(campaign_rollup(read_reports(report_dir)))
@@ -0,0 +1,208 @@
+"""
+Archive of the merged CM/aircraft intercept traces (the intercept_geometry table of each scenario), replacing the
+per-intercept CSV dumps in CM_Intercept_Data/. Layout under the archive root:
+    <pilot>/Flight<n>/<config>_<scenario>.parquet   every CM/role trace of one scenario, sorted by Role, EntId_cm, Timestamp
+    <pilot>/Flight<n>/index.parquet                 one row per trace: keys, row range in the scenario file and summary stats
+Reads filter the indexes first (the pilot and flight folders are pruned by name), then open only the scenario files
+that hold a matching trace and slice out its rows, so no text is parsed and unrelated files are never read.
+Without pyarrow the files are pickles (.pkl) instead of Parquet, as for the table cache.
+
+Example:
+    archive = TraceArchive('Output/Intercept_Traces')
+    archive.read(role='Wingman', config='HA', columns=['Timestamp', 'distance_nm', 'Intercept_Criteria'])
+    python -m Utils.TraceArchive CM_Intercept_Data Output/Intercept_Traces    # convert the old CSV dumps
+"""
+
+# import libraries
+import os
+import sys
+import numpy as np
+import pandas as pd
+from Utils.FlightCache import CACHE_FORMAT
+
+TRACE_EXT = '.parquet' if CACHE_FORMAT == 'parquet' else '.pkl'
+INDEX_NAME = 'index' + TRACE_EXT
+# trace columns kept in the archive; the scenario keys live in the index and the per-scenario constants in the MOPs
+TRACE_COLUMNS = ['Role', 'Timestamp', 'SampleTime_cm', 'SampleTime_ac', 'EntId_cm', 'EntId_ac'] + \
+    [col + suffix for suffix in ('_cm', '_ac')
+     for col in ['ECEF_X', 'ECEF_Y', 'ECEF_Z', 'LinVelX', 'LinVelY', 'LinVelZ', 'Latitude', 'Longitude', 'Altitude',
+                 'Heading', 'Roll', 'CalibratedAirspeed']] + \
+    ['Bank_Angle_Condition', 'distance_nm', 'angle_between_vel', 'angle_between_pos', 'angle_between_pos_nose',
+     'Distance_Condition', 'Cone_Condition', 'Nose_Cone_Condition', 'Intercept_Criteria']
+INDEX_COLUMNS = ['Pilot', 'Flight', 'Configuration', 'Scenario', 'Scenario_Num', 'Role', 'EntId', 'File', 'Start',
+                 'Stop', 'Start_Time', 'End_Time', 'Min_Distance_nm', 'Intercepted']
+# read()/index() keyword -> index column
+PREDICATES = {'pilot': 'Pilot', 'flight': 'Flight', 'config': 'Configuration', 'scenario': 'Scenario',
+              'scenario_num': 'Scenario_Num', 'role': 'Role', 'cm': 'EntId', 'intercepted': 'Intercepted'}
+
+
+def write_frame(df, path):
+    tmp = path + '.tmp'
+    if CACHE_FORMAT == 'parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+
+def read_frame(path, columns=None):
+    if CACHE_FORMAT == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df if columns is None else df[columns]
+
+
+def as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)) else [value]
+
+
+class TraceArchive:
+    """Partitioned store of intercept traces for a campaign (see the module docstring for the layout)."""
+
+    def __init__(self, root='Output/Intercept_Traces'):
+        self.root = root
+
+    def flight_dir(self, pilot, flight):
+        return os.path.join(self.root, str(pilot), 'Flight{}'.format(flight))
+
+    def write_scenario(self, pilot, flight, config, scenario, scenario_num, table):
+        """
+        Store a scenario's intercept traces, replacing whatever the archive held for it. Inputs are:
+        config / scenario: Configuration and Scenario (type letter) of the scenario window
+        scenario_num: scenario number within the flight (None if unknown)
+        table: intercept_geometry table of the scenario (ScenarioIntercepts.table), one row per CM sample per role
+        """
+        flight_dir = self.flight_dir(pilot, flight)
+        os.makedirs(flight_dir, exist_ok=True)
+        name = '{}_{}{}'.format(config, scenario, TRACE_EXT)
+        traces = table[[col for col in TRACE_COLUMNS if col in table.columns]]
+        traces = traces.sort_values(['Role', 'EntId_cm', 'Timestamp'], kind='stable').reset_index(drop=True)
+        traces['Role'] = traces['Role'].astype('category')
+
+        # traces are contiguous after the sort - the index records each one's row range
+        index = []
+        for (role, cm), rows in traces.groupby(['Role', 'EntId_cm'], sort=False, observed=True).indices.items():
+            trace = traces.iloc[rows[0]:rows[-1] + 1]
+            index.append({'Pilot': str(pilot), 'Flight': str(flight), 'Configuration': config, 'Scenario': scenario,
+                          'Scenario_Num': scenario_num, 'Role': role, 'EntId': int(cm), 'File': name,
+                          'Start': rows[0], 'Stop': rows[-1] + 1, 'Start_Time': trace['Timestamp'].min(),
+                          'End_Time': trace['Timestamp'].max(), 'Min_Distance_nm': trace['distance_nm'].min(),
+                          'Intercepted': bool(trace['Intercept_Criteria'].any())})
+        index = pd.DataFrame(index, columns=INDEX_COLUMNS)
+        if len(traces):
+            write_frame(traces, os.path.join(flight_dir, name))
+        elif os.path.exists(os.path.join(flight_dir, name)):
+            os.remove(os.path.join(flight_dir, name))
+
+        # swap this scenario's rows in the flight index
+        index_path = os.path.join(flight_dir, INDEX_NAME)
+        if os.path.exists(index_path):
+            old = read_frame(index_path)
+            old = old[old['File'] != name]
+            index = pd.concat([old, index], ignore_index=True) if len(index) else old
+        index['Scenario_Num'] = index['Scenario_Num'].astype('Int64')
+        index = index.sort_values(['Scenario_Num', 'File', 'Start'], kind='stable').reset_index(drop=True)
+        write_frame(index, index_path)
+
+    def clear_flight(self, pilot, flight):
+        """Remove every trace of a flight (before it is re-reduced from scratch)."""
+        flight_dir = self.flight_dir(pilot, flight)
+        if os.path.isdir(flight_dir):
+            for name in os.listdir(flight_dir):
+                if name.endswith(TRACE_EXT):
+                    os.remove(os.path.join(flight_dir, name))
+
+    def index(self, **predicates):
+        """
+        Index rows of the traces matching the predicates: pilot, flight, config, scenario, scenario_num, role, cm
+        and intercepted, each a value or a list of values. Only the indexes of matching pilots and flights are read.
+        """
+        unknown = set(predicates) - set(PREDICATES)
+        if unknown:
+            raise ValueError(f"Unknown trace predicate(s): {sorted(unknown)}")
+        pilots = as_list(predicates['pilot']) if 'pilot' in predicates else \
+            sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        tables = []
+        for pilot in pilots:
+            pilot_dir = os.path.join(self.root, str(pilot))
+            if 'flight' in predicates:
+                flight_dirs = ['Flight{}'.format(flight) for flight in as_list(predicates['flight'])]
+            else:
+                flight_dirs = sorted(os.listdir(pilot_dir)) if os.path.isdir(pilot_dir) else []
+            for flight_dir in flight_dirs:
+                index_path = os.path.join(pilot_dir, flight_dir, INDEX_NAME)
+                if os.path.exists(index_path):
+                    tables.append(read_frame(index_path))
+        if not tables:
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+        index = pd.concat(tables, ignore_index=True)
+
+        mask = np.ones(len(index), dtype=bool)
+        for key, value in predicates.items():
+            column = index[PREDICATES[key]]
+            values = as_list(value)
+            if key in ('pilot', 'flight'):
+                values = [str(v) for v in values]
+            mask &= column.isin(values).values
+        return index[mask].reset_index(drop=True)
+
+    def read(self, columns=None, **predicates):
+        """
+        Traces matching the predicates (see index) as one DataFrame, with the Pilot, Flight, Configuration, Scenario
+        and Scenario_Num of each row prepended. columns limits the trace columns read (Parquet only reads those).
+        """
+        index = self.index(**predicates)
+        keys = ['Pilot', 'Flight', 'Configuration', 'Scenario', 'Scenario_Num']
+        parts = []
+        for (pilot, flight, name), traces in index.groupby(['Pilot', 'Flight', 'File'], sort=False):
+            frame = read_frame(os.path.join(self.flight_dir(pilot, flight), name), columns)
+            rows = np.concatenate([np.arange(start, stop) for start, stop in zip(traces['Start'], traces['Stop'])])
+            part = frame.iloc[rows].reset_index(drop=True)
+            lengths = (traces['Stop'] - traces['Start']).values
+            for i, key in enumerate(keys):
+                part.insert(i, key, np.repeat(traces[key].values, lengths))
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=keys + (list(columns) if columns else TRACE_COLUMNS))
+        return pd.concat(parts, ignore_index=True)
+
+    def traces(self, columns=None, **predicates):
+        """Iterate over the matching traces one at a time, yielding (index row, trace DataFrame)."""
+        index = self.index(**predicates)
+        for (pilot, flight, name), traces in index.groupby(['Pilot', 'Flight', 'File'], sort=False):
+            frame = read_frame(os.path.join(self.flight_dir(pilot, flight), name), columns)
+            for _, row in traces.iterrows():
+                yield row, frame.iloc[row['Start']:row['Stop']].reset_index(drop=True)
+
+
+def import_csv_dumps(csv_dir, archive):
+    """
+    Convert the per-intercept CSVs that is_within_cone used to write (<pilot>_<flight>_<config>_<scenario>_<role>_CM<id>.csv,
+    config and scenario number sometimes blank) into the archive. Configuration and Scenario come from the traces
+    themselves; a CM/role traced more than once keeps its first file. Returns the number of files imported.
+    """
+    scenarios = {}
+    for name in sorted(os.listdir(csv_dir)):
+        if not name.endswith('.csv'):
+            continue
+        pilot, flight, _, scenario_num, role, cm = name[:-4].split('_')
+        trace = pd.read_csv(os.path.join(csv_dir, name), low_memory=False)
+        trace['Role'] = role
+        key = (pilot, flight, trace['Configuration_cm'].iloc[0], trace['Scenario_cm'].iloc[0])
+        entry = scenarios.setdefault(key, {'scenario_num': None, 'traces': {}})
+        entry['traces'].setdefault((role, cm), trace)
+        if scenario_num:
+            entry['scenario_num'] = int(scenario_num)
+
+    for (pilot, flight, config, scenario), entry in scenarios.items():
+        table = pd.concat(list(entry['traces'].values()), ignore_index=True)
+        for col in ('Timestamp', 'SampleTime_cm', 'SampleTime_ac'):
+            table[col] = pd.to_datetime(table[col])
+        archive.write_scenario(pilot, flight, config, scenario, entry['scenario_num'], table)
+    return sum(len(entry['traces']) for entry in scenarios.values())
+
+
+if __name__ == "__main__":
+    csv_dir = sys.argv[1] if len(sys.argv) > 1 else 'CM_Intercept_Data'
+    archive = TraceArchive(sys.argv[2] if len(sys.argv) > 2 else 'Output/Intercept_Traces')
+    print(f'Imported {import_csv_dumps(csv_dir, archive)} traces from {csv_dir} into {archive.root}')